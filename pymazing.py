@@ -4,4 +4,5 @@
 
 from pymazing import application
 
-application.run()
+if __name__ == "__main__":
+    application.run()
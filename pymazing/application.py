@@ -2,21 +2,32 @@
 # Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
 # License: MIT, see the LICENSE file.
 
+import argparse
 import configparser as cp
 import distutils.util as du
+import os
 
 import sfml as sf
 
-from pymazing import framebuffer, game_state_simple_cube, game_state_loaded_level, game_engine
+from pymazing import framebuffer, game_state_simple_cube, game_state_loaded_level, game_engine, fps_counter, profiler
 
 
 def run():
     """
-    Read settings from a file, initialize the components and run the game.
+    Read settings from a file and the command line, initialize the components and run the game.
     """
+    parser = argparse.ArgumentParser(description="Pymazing")
+    parser.add_argument("--headless", type=int, default=0, metavar="FRAMES", help="render the given number of frames without a window and print the frame time statistics")
+    parser.add_argument("--profile", type=int, default=0, metavar="FRAMES", help="profile the given number of frames of a headless run")
+    args = parser.parse_args()
+
     config = cp.ConfigParser()
     config.read("data/settings.ini")
 
+    if args.headless > 0:
+        run_headless(config, args.headless, args.profile)
+        return
+
     window_width = int(config["window"]["width"])
     window_height = int(config["window"]["height"])
 
@@ -47,3 +58,42 @@ def run():
     game_engine_.active_game_state = game_state_loaded_level_
 
     game_engine_.run()
+
+
+def run_headless(config, frame_count, profile_frame_count=0):
+    """
+    Render the loaded level from its start position a given number of times without opening a window.
+
+    :param int frame_count: How many frames to render.
+    :param int profile_frame_count: How many of the first frames to profile (zero disables profiling).
+    """
+    framebuffer_scale = float(config["window"]["framebuffer_scale"])
+    framebuffer_width = int(framebuffer_scale * int(config["window"]["width"]))
+    framebuffer_height = int(framebuffer_scale * int(config["window"]["height"]))
+    framebuffer_ = framebuffer.FrameBuffer(headless=True)
+    framebuffer_.resize(framebuffer_width, framebuffer_height)
+
+    game_state = game_state_loaded_level.GameStateLoadedLevel(config)
+    game_state.camera.update_projection_matrix(framebuffer_.width / framebuffer_.height)
+    game_state.camera.update_orientation_vectors()
+    game_state.camera.update_view()
+
+    fps_counter_ = fps_counter.FpsCounter(frame_count)
+    frame_profiler = profiler.FrameProfiler(config["profiling"]["output_directory"])
+
+    if profile_frame_count > 0:
+        level_name = os.path.splitext(os.path.basename(config["game"]["level_file"]))[0]
+        frame_profiler.start(profile_frame_count, level_name)
+
+    for _ in range(frame_count):
+        game_state.render(framebuffer_, 1.0)
+        framebuffer_.clear()
+        fps_counter_.tick()
+
+        if frame_profiler.profile is not None:
+            frame_profiler.tick()
+
+    if frame_profiler.profile is not None:
+        frame_profiler.stop()
+
+    print(fps_counter_.get_percentiles_string())
@@ -0,0 +1,316 @@
+"""Performance benchmarks of the level loading and rendering stages with stored baselines."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import argparse
+import configparser as cp
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from pymazing import benchmark_baseline, camera, color, euler_angle, framebuffer, level_generator, level_loader, rasterizer, renderer, world, light
+
+SIZES = [16, 32, 64, 128, 256, 512, 1024]
+FRAMEBUFFER_WIDTH = 320
+FRAMEBUFFER_HEIGHT = 200
+RASTERIZER_SHAPE_COUNT = 200
+RASTERIZER_Z_BUFFER_SHAPE_COUNT = 20
+
+
+def measure(function, repeat):
+    """
+    Run a function several times and return the fastest run time (the least disturbed by other processes).
+
+    :param int repeat: How many times to run the function.
+    :return: The run time in seconds.
+    """
+    best_time = float("inf")
+
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        best_time = min(best_time, time.perf_counter() - start_time)
+
+    return best_time
+
+
+def create_world(specular_lights_enabled=False):
+    """
+    Create a world with the same lights as the loaded level game state.
+
+    :param bool specular_lights_enabled: Whether the specular light is on (it is off by default in the game too).
+    """
+    world_ = world.World()
+    world_.ambient_light.color = color.from_int(255, 255, 255)
+    world_.ambient_light.intensity = 0.2
+
+    diffuse_light = light.Light()
+    diffuse_light.position[0] = 100
+    diffuse_light.position[1] = 150
+    diffuse_light.position[2] = 50
+    diffuse_light.color = color.from_int(255, 255, 255)
+    diffuse_light.intensity = 0.4
+    world_.diffuse_lights.append(diffuse_light)
+
+    specular_light = light.Light()
+    specular_light.position[0] = 100
+    specular_light.position[1] = 150
+    specular_light.position[2] = 59
+    specular_light.color = color.from_int(255, 255, 255)
+    specular_light.intensity = 0.4
+    specular_light.shininess = 8.0
+    world_.specular_lights.append(specular_light)
+    world_.specular_lights_enabled = specular_lights_enabled
+
+    return world_
+
+
+def create_camera(position, pitch, yaw, aspect_ratio=FRAMEBUFFER_WIDTH / FRAMEBUFFER_HEIGHT):
+    """
+    Create a camera with a fixed pose that does not depend on any input.
+
+    :param position: The camera position as a 3D vector.
+    :param float pitch: The pitch in degrees.
+    :param float yaw: The yaw in degrees.
+    :param float aspect_ratio: The aspect ratio of the framebuffer.
+    """
+    config = cp.ConfigParser()
+    config.read_dict({"game": {"mouse_sensitivity": "3.0"}})
+
+    camera_ = camera.Camera(config)
+    camera_.position = np.array(position, dtype=float)
+    camera_.euler_angle = euler_angle.EulerAngle(pitch, yaw, 0.0)
+    camera_.update_projection_matrix(aspect_ratio)
+    camera_.update_orientation_vectors()
+    camera_.update_view()
+
+    return camera_
+
+
+def get_camera_poses(width, height):
+    """
+    Fixed camera poses for a level of the given size.
+
+    :return: A dictionary of pose names mapped to (position, pitch, yaw) tuples.
+    """
+    return {
+        "inside": ([1.5, 0.5, -1.5], 0.0, -45.0),
+        "overview": ([width / 2.0, height / 2.0 + 3.0, 2.0], -45.0, 0.0)
+    }
+
+
+def create_framebuffer():
+    framebuffer_ = framebuffer.FrameBuffer(headless=True)
+    framebuffer_.resize(FRAMEBUFFER_WIDTH, FRAMEBUFFER_HEIGHT)
+
+    return framebuffer_
+
+
+def benchmark_level(size, directory, repeat):
+    """
+    Time the level loading, meshing and rendering stages of a generated maze level.
+
+    :param int size: The level width and height in blocks.
+    :param string directory: Where the generated level file is written to.
+    :param int repeat: How many times each stage is run.
+    :return: A dictionary of stage names mapped to run times in seconds.
+    """
+    file_name = os.path.join(directory, "maze_{0}.tga".format(size))
+    level_generator.write_tga(level_generator.generate_maze_pixels(size, size, seed=size), file_name)
+
+    results = dict()
+    results["generate_blocks_from_tga"] = measure(lambda: level_loader.generate_blocks_from_tga(file_name), repeat)
+
+    blocks = level_loader.generate_blocks_from_tga(file_name)
+    results["generate_partial_meshes"] = measure(lambda: level_loader.generate_partial_meshes(blocks), repeat)
+
+    results["generate_cube_instances"] = measure(lambda: level_loader.generate_cube_instances(blocks), repeat)
+
+    meshes = level_loader.generate_partial_meshes(blocks)
+    instances = level_loader.generate_cube_instances(blocks)
+    world_ = create_world()
+    framebuffer_ = create_framebuffer()
+
+    for pose_name, (position, pitch, yaw) in sorted(get_camera_poses(size, size).items()):
+        camera_ = create_camera(position, pitch, yaw)
+
+        for mode_name, render_wireframe in (("solid", False), ("wireframe", True)):
+            def render():
+                renderer.render_meshes(meshes[:1], world_, camera_, framebuffer_, render_wireframe=render_wireframe)
+                renderer.render_meshes(meshes[1:], world_, camera_, framebuffer_, render_wireframe=render_wireframe)
+                framebuffer_.clear()
+
+            results["render_meshes_{0}[{1}]".format(mode_name, pose_name)] = measure(render, repeat)
+
+            def render_instances():
+                renderer.render_meshes(meshes[:1], world_, camera_, framebuffer_, render_wireframe=render_wireframe)
+                renderer.render_cube_instances(instances, world_, camera_, framebuffer_, render_wireframe=render_wireframe)
+                framebuffer_.clear()
+
+            results["render_cube_instances_{0}[{1}]".format(mode_name, pose_name)] = measure(render_instances, repeat)
+
+    return results
+
+
+def benchmark_rasterizer(repeat):
+    """
+    Time each rasterizer function with a fixed set of random screen space shapes.
+
+    :return: A dictionary of rasterizer function names mapped to run times in seconds.
+    """
+    framebuffer_ = create_framebuffer()
+    random_state = np.random.RandomState(0)
+    color_ = color.from_int(255, 255, 255)
+    max_x = FRAMEBUFFER_WIDTH - 1
+    max_y = FRAMEBUFFER_HEIGHT - 1
+
+    points = random_state.randint(0, max_x + 1, size=(RASTERIZER_SHAPE_COUNT, 3)), random_state.randint(0, max_y + 1, size=(RASTERIZER_SHAPE_COUNT, 3))
+    shapes = [(int(xs[0]), int(ys[0]), int(xs[1]), int(ys[1]), int(xs[2]), int(ys[2])) for xs, ys in zip(*points)]
+
+    def draw_lines():
+        for x0, y0, x1, y1, _, _ in shapes:
+            rasterizer.draw_line(framebuffer_, x0, y0, x1, y1, color_)
+
+    def draw_triangles():
+        for x0, y0, x1, y1, x2, y2 in shapes:
+            rasterizer.draw_triangle(framebuffer_, x0, y0, x1, y1, x2, y2, color_)
+
+    def draw_triangles_z_buffer():
+        framebuffer_.depth_data.fill(framebuffer_.depth_clear_value)
+
+        for i, (x0, y0, x1, y1, x2, y2) in enumerate(shapes[:RASTERIZER_Z_BUFFER_SHAPE_COUNT]):
+            z = float(i)
+            rasterizer.draw_triangle_z_buffer(framebuffer_, x0, y0, z, x1, y1, z, x2, y2, z, color_)
+
+    return {
+        "draw_line": measure(draw_lines, repeat),
+        "draw_triangle": measure(draw_triangles, repeat),
+        "draw_triangle_z_buffer": measure(draw_triangles_z_buffer, repeat)
+    }
+
+
+def run_benchmarks(sizes, repeat=3):
+    """
+    Run all benchmarks.
+
+    :param sizes: A list of level sizes (in blocks) to benchmark.
+    :param int repeat: How many times each stage is run.
+    :return: A dictionary of benchmark groups ("rasterizer" and one per level size) mapped to stage results.
+    """
+    results = {"rasterizer": benchmark_rasterizer(repeat)}
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            results["{0}x{0}".format(size)] = benchmark_level(size, directory, repeat)
+
+    return results
+
+
+def get_memory_size(value, seen=None):
+    """
+    Approximate the memory used by an object and everything it references (lists, dictionaries, numpy arrays and
+    objects with attributes or slots). Objects referenced many times are counted once.
+
+    :return: The size in bytes.
+    """
+    if seen is None:
+        seen = set()
+
+    if id(value) in seen:
+        return 0
+
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+
+    if isinstance(value, np.ndarray):
+        # views do not own their data and object arrays only hold references
+        if value.base is not None:
+            size += value.nbytes
+
+        if value.dtype == object:
+            size += sum(get_memory_size(item, seen) for item in value.flat)
+    elif isinstance(value, (list, tuple)):
+        size += sum(get_memory_size(item, seen) for item in value)
+    elif isinstance(value, dict):
+        size += sum(get_memory_size(key, seen) + get_memory_size(item, seen) for key, item in value.items())
+    elif hasattr(value, "__dict__"):
+        size += get_memory_size(vars(value), seen)
+    elif hasattr(value, "__slots__"):
+        size += sum(get_memory_size(getattr(value, name), seen) for name in value.__slots__ if hasattr(value, name))
+
+    return size
+
+
+def report_memory(sizes):
+    """
+    Measure the memory used by the alternative level geometry representations of generated maze levels.
+
+    :param sizes: A list of level sizes (in blocks).
+    :return: A dictionary of level sizes mapped to dictionaries of representation names and sizes in bytes.
+    """
+    results = dict()
+
+    for size in sizes:
+        blocks = level_loader.generate_blocks_from_pixels(level_generator.generate_maze_pixels(size, size, seed=size))
+        meshes = level_loader.generate_partial_meshes(blocks)
+        seen = {id(blocks)} | {id(row) for row in blocks} | {id(color_) for row in blocks for color_ in row}
+        level_results = dict()
+
+        # the block colors are shared with the blocks, so they are not counted
+        level_results["partial_meshes"] = get_memory_size(meshes, set(seen))
+        level_results["compact_partial_meshes"] = get_memory_size([mesh_.compact() for mesh_ in meshes], set(seen))
+        level_results["chunks"] = get_memory_size(level_loader.generate_chunks(blocks), set(seen))
+        level_results["cube_instances"] = get_memory_size(level_loader.generate_cube_instances(blocks), set(seen))
+
+        results["{0}x{0}".format(size)] = level_results
+
+    return results
+
+
+def main():
+    """
+    Command line entry point: python -m pymazing.benchmark [--sizes 16 64] [--save | --baseline FILE | --memory].
+    """
+    parser = argparse.ArgumentParser(description="Pymazing benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="level sizes in blocks")
+    parser.add_argument("--repeat", type=int, default=3, help="how many times each stage is run")
+    parser.add_argument("--baseline", default=benchmark_baseline.DEFAULT_BASELINE_FILE, help="the baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=benchmark_baseline.DEFAULT_THRESHOLD, help="allowed relative slowdown")
+    parser.add_argument("--save", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--memory", action="store_true", help="report the memory used by the level geometry instead")
+    args = parser.parse_args()
+
+    if args.memory:
+        for group, representations in report_memory(args.sizes).items():
+            for name, size in sorted(representations.items()):
+                print("{0:>10} {1:<36} {2:10.1f} KiB".format(group, name, size / 1024.0))
+
+        return
+
+    results = run_benchmarks(args.sizes, args.repeat)
+
+    for group, stages in sorted(results.items()):
+        for stage, run_time in sorted(stages.items()):
+            print("{0:>10} {1:<36} {2:10.3f} ms".format(group, stage, run_time * 1000.0))
+
+    if args.save:
+        benchmark_baseline.save_baseline(results, args.baseline)
+        return
+
+    if not os.path.exists(args.baseline):
+        return
+
+    regressions = benchmark_baseline.compare_to_baseline(results, benchmark_baseline.load_baseline(args.baseline), args.threshold)
+
+    for group, stage, baseline_time, current_time in regressions:
+        print("REGRESSION {0} {1}: {2:.3f} ms -> {3:.3f} ms".format(group, stage, baseline_time * 1000.0, current_time * 1000.0))
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Storing benchmark results as baselines and finding the regressions against them."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import json
+import os
+
+DEFAULT_THRESHOLD = 0.25
+MIN_REGRESSION_TIME = 0.001
+
+# the same file for the command line and the test suite, wherever they are run from
+DEFAULT_BASELINE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "data", "benchmark_baseline.json")
+
+
+def load_baseline(file_name):
+    with open(file_name) as file:
+        return json.load(file)
+
+
+def save_baseline(results, file_name):
+    with open(file_name, "w") as file:
+        json.dump(results, file, indent=4, sort_keys=True)
+
+
+def compare_to_baseline(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Find the stages that have become slower than the baseline by more than the threshold.
+
+    Stages missing from either side are ignored, as are differences smaller than MIN_REGRESSION_TIME (timer noise).
+
+    :param float threshold: Allowed relative slowdown (0.25 means 25%).
+    :return: A list of (group, stage, baseline time, current time) tuples.
+    """
+    regressions = []
+
+    for group, stages in sorted(results.items()):
+        for stage, current_time in sorted(stages.items()):
+            baseline_time = baseline.get(group, dict()).get(stage)
+
+            if baseline_time is None:
+                continue
+
+            if current_time > baseline_time * (1.0 + threshold) and (current_time - baseline_time) > MIN_REGRESSION_TIME:
+                regressions.append((group, stage, baseline_time, current_time))
+
+    return regressions
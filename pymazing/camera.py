@@ -39,6 +39,16 @@ class Camera:
         self.aspect_ratio = aspect_ratio
         self.projection_matrix = matrix.create_projection_matrix(self.vertical_fov, self.aspect_ratio, self.near_z, self.far_z)
 
+    def set_far_z(self, far_z):
+        """
+        Move the far plane, which limits both the frustum culling and the clipping of the rendered geometry.
+
+        :param float far_z: The new far plane distance.
+        """
+        self.far_z = far_z
+        self.update_projection_matrix(self.aspect_ratio)
+        self.frustum.setup_from_camera(self)
+
     def update(self, time_step, mouse_delta):
         """
         Do all the internal processing of the camera.
@@ -55,11 +65,7 @@ class Camera:
         if self.euler_angle.pitch < -89.0:
             self.euler_angle.pitch = -89.0
 
-        self.forward_vector = self.euler_angle.get_direction_vector()
-        self.right_vector = np.cross(self.forward_vector, [0.0, 1.0, 0.0])
-        self.right_vector /= np.linalg.norm(self.right_vector)
-        self.up_vector = np.cross(self.right_vector, self.forward_vector)
-        self.up_vector /= np.linalg.norm(self.up_vector)
+        self.update_orientation_vectors()
 
         if sf.Keyboard.is_key_pressed(sf.Keyboard.L_SHIFT) or sf.Keyboard.is_key_pressed(sf.Keyboard.R_SHIFT):
             movement_speed = self.fast_movement_speed
@@ -86,6 +92,22 @@ class Camera:
         if sf.Keyboard.is_key_pressed(sf.Keyboard.Q):
             self.position -= self.up_vector * movement_speed * time_step
 
+        self.update_view()
+
+    def update_orientation_vectors(self):
+        """
+        Calculate the forward, right and up vectors from the euler angle.
+        """
+        self.forward_vector = self.euler_angle.get_direction_vector()
+        self.right_vector = np.cross(self.forward_vector, [0.0, 1.0, 0.0])
+        self.right_vector /= np.linalg.norm(self.right_vector)
+        self.up_vector = np.cross(self.right_vector, self.forward_vector)
+        self.up_vector /= np.linalg.norm(self.up_vector)
+
+    def update_view(self):
+        """
+        Update the frustum and the view matrix from the current position and orientation.
+        """
         self.frustum.setup_from_camera(self)
 
         rotation_x_matrix = matrix.create_rotation_matrix_x(-self.euler_angle.get_pitch_radians())
@@ -0,0 +1,253 @@
+"""Fixed size square chunks of level blocks with merged meshes."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import numpy as np
+
+from pymazing import greedy_meshing, mesh
+
+CUBE_VERTICES = np.array(mesh.create_cube(None).vertices)[:, :3]
+CUBE_TRIANGLES = np.array([triangle for _, triangles in mesh.SIDE_TRIANGLES for triangle in triangles])
+CUBE_TRIANGLE_SIDES = np.array([side for side, triangles in mesh.SIDE_TRIANGLES for _ in triangles])
+
+
+def get_cube_triangle_normals():
+    """
+    Calculate the unit normals of the cube triangles like Mesh.calculate_triangle_data would for a block. The vertex
+    differences of a block are exact wherever the block is, so the normals of all the blocks are the same.
+    """
+    triangles = (CUBE_VERTICES * 0.5)[CUBE_TRIANGLES]
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+
+    return normals / np.linalg.norm(normals, axis=1)[:, np.newaxis]
+
+
+CUBE_TRIANGLE_NORMALS = get_cube_triangle_normals()
+
+
+class Chunk:
+    def __init__(self, x, y, size):
+        """
+        :param int x: The chunk column.
+        :param int y: The chunk row.
+        :param int size: The chunk width and height in blocks.
+        """
+        self.x = x
+        self.y = y
+        self.size = size
+        self.mesh = None
+        self.min_corner = np.zeros(3)
+        self.max_corner = np.zeros(3)
+        self.triangle_count = 0
+
+    def get_block_range(self, width, height):
+        """
+        Get the blocks covered by the chunk in a level of the given size.
+
+        :return: A tuple of (x0, y0, x1, y1) - the end coordinates are exclusive.
+        """
+        x0 = self.x * self.size
+        y0 = self.y * self.size
+
+        return x0, y0, min(x0 + self.size, width), min(y0 + self.size, height)
+
+    def build_mesh(self, side_masks, color_values, greedy=False):
+        """
+        Merge the sides of all blocks of the chunk into one mesh and update the bounding box.
+
+        :param side_masks: A numpy array of shape (height, width) containing mesh side flags.
+        :param color_values: A numpy array of shape (height, width) of packed block colors.
+        :param bool greedy: Whether to merge coplanar sides of the same color (see greedy_meshing).
+        """
+        height, width = side_masks.shape
+        x0, y0, x1, y1 = self.get_block_range(width, height)
+
+        if greedy:
+            self.build_greedy_mesh(side_masks[y0:y1, x0:x1], color_values[y0:y1, x0:x1], x0, y0)
+            return
+
+        block_y, block_x = np.nonzero(side_masks[y0:y1, x0:x1])
+        block_x += x0
+        block_y += y0
+
+        if len(block_x) == 0:
+            self.mesh = None
+            self.triangle_count = 0
+            return
+
+        block_colors = color_values[block_y, block_x]
+        block_centers = np.column_stack((block_x + 0.5, np.full(len(block_x), 0.5), -block_y - 0.5))
+        block_triangles = (side_masks[block_y, block_x, np.newaxis] & CUBE_TRIANGLE_SIDES) != 0
+
+        self.mesh = create_merged_block_mesh(block_centers, block_colors, block_triangles)
+        self.min_corner = np.min(block_centers, axis=0) - 0.5
+        self.max_corner = np.max(block_centers, axis=0) + 0.5
+        self.triangle_count = len(self.mesh.indices)
+
+    def build_greedy_mesh(self, side_masks, color_values, x0, y0):
+        """
+        Build the mesh from merged faces, side_masks and color_values cover only the chunk which starts at block (x0, y0).
+        """
+        sides, rectangles = greedy_meshing.generate_faces(color_values, side_masks)
+
+        if len(rectangles) == 0:
+            self.mesh = None
+            self.triangle_count = 0
+            return
+
+        colors = color_values[rectangles[:, 1], rectangles[:, 0]]
+        rectangles += [x0, y0, x0, y0]
+
+        self.mesh = greedy_meshing.create_face_mesh(sides, rectangles, colors)
+        self.min_corner = np.array([np.min(rectangles[:, 0]), 0.0, -np.max(rectangles[:, 3])], dtype=float)
+        self.max_corner = np.array([np.max(rectangles[:, 2]), 1.0, -np.min(rectangles[:, 1])], dtype=float)
+        self.triangle_count = len(self.mesh.indices)
+
+
+def create_merged_block_mesh(block_centers, block_colors, block_triangles):
+    """
+    Create one mesh out of many unit blocks (with sides of length one), in the same triangle order as separate
+    partial cube meshes would have.
+
+    The vertices are stored relative to the center of the blocks, which is the mesh position, so that the bounding
+    sphere of the mesh stays tight for culling.
+
+    :param block_centers: A numpy array of shape (N, 3).
+    :param block_colors: A numpy array of N packed colors.
+    :param block_triangles: A boolean numpy array of shape (N, 12) selecting the cube triangles of each block.
+    :return: A mesh instance.
+    """
+    position = (np.min(block_centers, axis=0) + np.max(block_centers, axis=0)) / 2.0
+    vertices = (block_centers[:, np.newaxis, :] - position + CUBE_VERTICES * 0.5).reshape(-1, 3)
+
+    block_indices, triangle_indices = np.nonzero(block_triangles)
+    indices = block_indices[:, np.newaxis] * len(CUBE_VERTICES) + CUBE_TRIANGLES[triangle_indices]
+
+    # drop the vertices no triangle uses
+    used_vertices, indices = np.unique(indices, return_inverse=True)
+    indices = indices.reshape(-1, 3)
+
+    mesh_ = mesh.Mesh()
+    mesh_.vertices = np.column_stack((vertices[used_vertices], np.ones(len(used_vertices))))
+    mesh_.indices = indices
+    mesh_.colors = np.asarray(block_colors, dtype=np.uint32)[block_indices]
+    mesh_.position = list(position)
+    mesh_.calculate_triangle_data()
+    mesh_.calculate_bounding_radius()
+
+    return mesh_.compact()
+
+
+def build_chunk_grid(side_masks, color_values, chunk_size):
+    """
+    Build the meshes of all the chunks of a level at once, the same meshes as Chunk.build_mesh builds one chunk at a
+    time (without greedy meshing). The chunk meshes are views of shared arrays, like the meshes of mesh_cache.
+
+    :param side_masks: A numpy array of shape (height, width) containing mesh side flags.
+    :param color_values: A numpy array of shape (height, width) of packed block colors.
+    :param int chunk_size: The chunk width and height in blocks.
+    :return: A numpy object array of shape (chunk rows, chunk columns) containing the chunks (None for empty chunks).
+    """
+    height, width = side_masks.shape
+    columns = (width + chunk_size - 1) // chunk_size
+    chunk_grid = np.empty(((height + chunk_size - 1) // chunk_size, columns), dtype=object)
+    block_y, block_x = np.nonzero(side_masks)
+
+    if len(block_x) == 0:
+        return chunk_grid
+
+    # the blocks of each chunk together, in the same row-major order as inside a single chunk
+    block_chunk_indices = (block_y // chunk_size) * columns + block_x // chunk_size
+    order = np.argsort(block_chunk_indices, kind="stable")
+    block_x = block_x[order]
+    block_y = block_y[order]
+    block_chunk_indices = block_chunk_indices[order]
+
+    chunk_starts = np.flatnonzero(np.concatenate(([True], block_chunk_indices[1:] != block_chunk_indices[:-1])))
+    chunk_indices = block_chunk_indices[chunk_starts]
+    chunk_count = len(chunk_starts)
+    block_chunks = np.repeat(np.arange(chunk_count), np.diff(np.append(chunk_starts, len(block_x))))
+
+    block_centers = np.column_stack((block_x + 0.5, np.full(len(block_x), 0.5), -block_y - 0.5))
+    min_centers = np.minimum.reduceat(block_centers, chunk_starts, axis=0)
+    max_centers = np.maximum.reduceat(block_centers, chunk_starts, axis=0)
+    positions = (min_centers + max_centers) / 2.0
+
+    block_triangles = (side_masks[block_y, block_x][:, np.newaxis] & CUBE_TRIANGLE_SIDES) != 0
+    used_vertices = np.zeros((len(block_x), len(CUBE_VERTICES)), dtype=bool)
+
+    for triangle_index, triangle in enumerate(CUBE_TRIANGLES):
+        used_vertices[:, triangle] |= block_triangles[:, triangle_index, np.newaxis]
+
+    # only the used vertices are kept, numbered in the order of the blocks and the cube vertices
+    vertex_numbers = np.cumsum(used_vertices.ravel(), dtype=np.int32) - 1
+    vertex_blocks, vertex_corners = np.nonzero(used_vertices)
+    vertex_chunks = block_chunks[vertex_blocks]
+    vertex_offsets = np.searchsorted(vertex_chunks, np.arange(chunk_count + 1))
+    block_offsets = block_centers - np.take(positions, block_chunks, axis=0)
+    vertices = np.take(block_offsets, vertex_blocks, axis=0) + np.take(CUBE_VERTICES * 0.5, vertex_corners, axis=0)
+
+    triangle_blocks, triangle_numbers = np.nonzero(block_triangles)
+    triangle_chunks = block_chunks[triangle_blocks]
+    triangle_offsets = np.searchsorted(triangle_chunks, np.arange(chunk_count + 1))
+    level_indices = np.take(vertex_numbers, triangle_blocks[:, np.newaxis] * len(CUBE_VERTICES) + np.take(CUBE_TRIANGLES, triangle_numbers, axis=0))
+
+    # the same results as Mesh.calculate_triangle_data and Mesh.calculate_bounding_radius (the coordinates are
+    # multiples of a quarter, so the sums are exact in any order)
+    centroids = np.take(vertices, level_indices[:, 0], axis=0)
+    centroids += np.take(vertices, level_indices[:, 1], axis=0)
+    centroids += np.take(vertices, level_indices[:, 2], axis=0)
+    centroids /= 3.0
+    bounding_radii = np.sqrt(np.maximum.reduceat(np.einsum("ij,ij->i", vertices, vertices), vertex_offsets[:-1]))
+
+    all_vertices = np.ones((len(vertices), 4), dtype=np.float32)
+    all_vertices[:, :3] = vertices
+    all_indices = level_indices - np.take(vertex_offsets.astype(np.int32), triangle_chunks)[:, np.newaxis]
+    all_colors = np.take(np.asarray(color_values[block_y, block_x], dtype=np.uint32), triangle_blocks)
+    all_normals = np.take(CUBE_TRIANGLE_NORMALS.astype(np.float32), triangle_numbers, axis=0)
+    all_centroids = centroids.astype(np.float32)
+
+    for i, chunk_index in enumerate(chunk_indices.tolist()):
+        vertex_start, vertex_end = vertex_offsets[i], vertex_offsets[i + 1]
+        triangle_start, triangle_end = triangle_offsets[i], triangle_offsets[i + 1]
+
+        mesh_ = mesh.Mesh()
+        mesh_.vertices = all_vertices[vertex_start:vertex_end]
+        mesh_.indices = all_indices[triangle_start:triangle_end]
+        mesh_.colors = all_colors[triangle_start:triangle_end]
+        mesh_.normals = all_normals[triangle_start:triangle_end]
+        mesh_.centroids = all_centroids[triangle_start:triangle_end]
+        mesh_.position = list(positions[i])
+        mesh_.bounding_radius = float(bounding_radii[i])
+
+        chunk_ = Chunk(chunk_index % columns, chunk_index // columns, chunk_size)
+        chunk_.mesh = mesh_
+        chunk_.min_corner = min_centers[i] - 0.5
+        chunk_.max_corner = max_centers[i] + 0.5
+        chunk_.triangle_count = int(triangle_end - triangle_start)
+        chunk_grid[chunk_.y, chunk_.x] = chunk_
+
+    return chunk_grid
+
+
+def get_chunk_coordinates(x, y, chunk_size, grid_shape, area_size=1):
+    """
+    Find the chunks that overlap square areas of blocks (single blocks or e.g. PVS clusters).
+
+    :param x: A numpy array of area columns.
+    :param y: A numpy array of area rows.
+    :param int chunk_size: The chunk width and height in blocks.
+    :param grid_shape: The shape of the chunk grid (chunk rows, chunk columns).
+    :param int area_size: The area width and height in blocks.
+    :return: A tuple of unique chunk row and column arrays (for indexing the chunk grid).
+    """
+    rows, columns = grid_shape
+
+    # stepping by the chunk size does not skip chunks and the last block of the area is always included
+    offsets = np.unique(np.append(np.arange(0, area_size, chunk_size), area_size - 1))
+    chunk_x = ((np.asarray(x)[:, np.newaxis] * area_size + offsets) // chunk_size)[:, :, np.newaxis]
+    chunk_y = ((np.asarray(y)[:, np.newaxis] * area_size + offsets) // chunk_size)[:, np.newaxis, :]
+    chunk_x, chunk_y = [coordinates.ravel() for coordinates in np.broadcast_arrays(chunk_x, chunk_y)]
+    inside = (chunk_x < columns) & (chunk_y < rows)
+
+    return np.divmod(np.unique(chunk_y[inside] * columns + chunk_x[inside]), columns)
@@ -0,0 +1,191 @@
+"""Coarser levels of detail for distant level chunks."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+from math import *
+
+import numpy as np
+
+from pymazing import greedy_meshing, level_loader
+
+DEFAULT_HYSTERESIS = 4.0
+
+
+def downsample_blocks(occupancy, color_values, factor):
+    """
+    Merge square groups of blocks to single cells. A cell is solid if at least half of its blocks are, and gets the
+    most common color of its blocks.
+
+    :param occupancy: A boolean numpy array of shape (height, width), both divisible by the factor.
+    :param color_values: A numpy array of shape (height, width) of packed block colors.
+    :param int factor: The cell width and height in blocks.
+    :return: A tuple of the occupancy and the packed colors (zero for empty cells) of the cells.
+    """
+    height, width = occupancy.shape
+    shape = (height // factor, factor, width // factor, factor)
+    counts = np.sum(occupancy.reshape(shape), axis=(1, 3))
+    cell_occupancy = counts * 2 >= factor * factor
+
+    # the color that appears most often among the blocks of each cell (empty blocks do not count)
+    cell_colors = color_values.reshape(shape).transpose(0, 2, 1, 3).reshape(-1, factor * factor)
+    color_counts = np.sum(cell_colors[:, :, np.newaxis] == cell_colors[:, np.newaxis, :], axis=2) * (cell_colors != 0)
+    dominant_colors = cell_colors[np.arange(len(cell_colors)), np.argmax(color_counts, axis=1)]
+
+    return cell_occupancy, np.where(cell_occupancy, dominant_colors.reshape(cell_occupancy.shape), 0).astype(np.uint32)
+
+
+def build_lod_mesh(occupancy, color_values, chunk_x, chunk_y, chunk_size, factor):
+    """
+    Build a coarse mesh of a chunk: the blocks are merged to cells of factor x factor blocks (see downsample_blocks)
+    and the cell sides are merged to as few faces as possible (see greedy_meshing).
+
+    :param occupancy: A boolean numpy array of shape (height, width) of the whole level.
+    :param color_values: A numpy array of shape (height, width) of packed block colors of the whole level.
+    :param int factor: The cell size in blocks, chunk_size has to be divisible by it.
+    :return: A mesh instance or None if the chunk is empty at this level of detail.
+    """
+    height, width = occupancy.shape
+    x0 = chunk_x * chunk_size
+    y0 = chunk_y * chunk_size
+
+    # one cell around the chunk for the neighbor checks, the area outside the level is empty
+    window_x0 = x0 - factor
+    window_y0 = y0 - factor
+    window_size = chunk_size + 2 * factor
+    window_occupancy = np.zeros((window_size, window_size), dtype=bool)
+    window_colors = np.zeros((window_size, window_size), dtype=np.uint32)
+    source_x0, source_x1 = max(window_x0, 0), min(window_x0 + window_size, width)
+    source_y0, source_y1 = max(window_y0, 0), min(window_y0 + window_size, height)
+
+    if source_x1 > source_x0 and source_y1 > source_y0:
+        window_occupancy[source_y0 - window_y0:source_y1 - window_y0, source_x0 - window_x0:source_x1 - window_x0] = occupancy[source_y0:source_y1, source_x0:source_x1]
+        window_colors[source_y0 - window_y0:source_y1 - window_y0, source_x0 - window_x0:source_x1 - window_x0] = color_values[source_y0:source_y1, source_x0:source_x1]
+
+    cell_occupancy, cell_colors = downsample_blocks(window_occupancy, window_colors, factor)
+    side_masks = level_loader.generate_side_masks_from_occupancy(cell_occupancy)[1:-1, 1:-1]
+    cell_colors = cell_colors[1:-1, 1:-1]
+    sides, rectangles = greedy_meshing.generate_faces(cell_colors, side_masks)
+
+    if len(rectangles) == 0:
+        return None
+
+    colors = cell_colors[rectangles[:, 1], rectangles[:, 0]]
+
+    # from cells to blocks, cells on the level edges are cut to the level
+    rectangles = rectangles * factor + [x0, y0, x0, y0]
+    rectangles[:, 2] = np.minimum(rectangles[:, 2], width)
+    rectangles[:, 3] = np.minimum(rectangles[:, 3], height)
+
+    return greedy_meshing.create_face_mesh(sides, rectangles, colors)
+
+
+class ChunkLod:
+    def __init__(self, occupancy, color_values, chunk_size, lod_distances, hysteresis=DEFAULT_HYSTERESIS):
+        """
+        Replace the meshes of distant chunks with coarser ones: beyond the first distance the blocks are merged to
+        cells of 2x2 blocks, beyond the second to 4x4 and so on, up to one cell per chunk.
+
+        A chunk switches to a coarser level only after it is the hysteresis farther than the distance, and back only
+        after it is the hysteresis closer, so that chunks near a boundary do not flicker between the levels.
+
+        :param occupancy: A boolean numpy array of shape (height, width), read when the coarse meshes are built.
+        :param color_values: A numpy array of shape (height, width) of packed block colors.
+        :param int chunk_size: The chunk width and height in blocks (a power of two).
+        :param lod_distances: A list of increasing distances.
+        :param float hysteresis: The distance margin for switching between the levels.
+        """
+        self.occupancy = occupancy
+        self.color_values = color_values
+        self.chunk_size = chunk_size
+        self.hysteresis = hysteresis
+
+        # merging cells larger than the chunk is not possible
+        level_count = int(log2(chunk_size)) if chunk_size > 1 else 0
+        self.lod_distances = np.array(sorted(lod_distances)[:level_count], dtype=float)
+
+        self.levels = dict()
+        self.meshes = dict()
+
+    def get_level(self, x, y, distance):
+        """
+        Update the level of detail of a chunk from its distance, with the hysteresis.
+
+        :return: The level (0 for the full mesh).
+        """
+        level = self.levels.get((x, y), 0)
+        coarser_level = int(np.count_nonzero(self.lod_distances + self.hysteresis < distance))
+        finer_level = int(np.count_nonzero(self.lod_distances - self.hysteresis < distance))
+
+        if level < coarser_level:
+            level = coarser_level
+        elif level > finer_level:
+            level = finer_level
+
+        self.levels[(x, y)] = level
+
+        return level
+
+    def get_lod_mesh(self, x, y, level, source_mesh):
+        """
+        Get the coarse mesh of a chunk, building it if the chunk has no mesh for the level yet or its full mesh has
+        been replaced (the chunk has been edited) after the coarse mesh was built.
+        """
+        source_mesh_, lod_mesh = self.meshes.get((x, y, level), (None, None))
+
+        if source_mesh_ is not source_mesh:
+            lod_mesh = build_lod_mesh(self.occupancy, self.color_values, x, y, self.chunk_size, 2 ** level)
+            self.meshes[(x, y, level)] = (source_mesh, lod_mesh)
+
+        return lod_mesh
+
+    def prune(self, chunk_grid):
+        """
+        Forget the chunks that are not in the chunk grid any more (e.g. dropped by the chunk streamer) and the coarse
+        meshes built from replaced full meshes, so that their meshes can be freed.
+
+        :param chunk_grid: A numpy object array of chunks (None for chunks that are empty or not loaded).
+        """
+        for x, y in list(self.levels):
+            if chunk_grid[y, x] is None:
+                del self.levels[(x, y)]
+
+        for (x, y, level), (source_mesh, _) in list(self.meshes.items()):
+            chunk_ = chunk_grid[y, x]
+
+            if chunk_ is None or chunk_.mesh is not source_mesh:
+                del self.meshes[(x, y, level)]
+
+    def select_meshes(self, meshes, camera_position):
+        """
+        Replace the chunk meshes with the meshes of their current levels of detail.
+
+        :param meshes: A list of full chunk meshes (see chunk.Chunk).
+        :return: A list of meshes, the chunks that are empty at their level of detail are left out.
+        """
+        if len(meshes) == 0 or len(self.lod_distances) == 0:
+            return meshes
+
+        positions = np.array([mesh.position for mesh in meshes], dtype=float)
+
+        # the mesh positions are inside the chunks
+        chunk_x = np.floor(positions[:, 0] / self.chunk_size).astype(int)
+        chunk_y = np.floor(-positions[:, 2] / self.chunk_size).astype(int)
+
+        # the distances from the camera to the nearest points of the chunk boxes
+        box_min = np.column_stack((chunk_x * self.chunk_size, np.zeros(len(meshes)), -(chunk_y + 1) * self.chunk_size))
+        box_max = np.column_stack(((chunk_x + 1) * self.chunk_size, np.ones(len(meshes)), -chunk_y * self.chunk_size))
+        offsets = np.maximum(np.maximum(box_min - camera_position[:3], camera_position[:3] - box_max), 0.0)
+        distances = np.sqrt(np.sum(offsets * offsets, axis=1))
+
+        selected_meshes = []
+
+        for mesh, x, y, distance in zip(meshes, chunk_x.tolist(), chunk_y.tolist(), distances.tolist()):
+            level = self.get_level(x, y, distance)
+
+            if level > 0:
+                mesh = self.get_lod_mesh(x, y, level, mesh)
+
+            if mesh is not None:
+                selected_meshes.append(mesh)
+
+        return selected_meshes
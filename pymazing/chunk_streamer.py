@@ -0,0 +1,213 @@
+"""Background meshing of the level chunks around the camera for levels too large to mesh at once."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import threading
+
+import numpy as np
+
+from pymazing import chunk
+
+DEFAULT_LOAD_DISTANCE = 64.0
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+
+
+def get_mesh_memory_size(mesh_):
+    """
+    Count the bytes of the geometry arrays of a compact mesh.
+    """
+    return sum(array.nbytes for array in (mesh_.vertices, mesh_.indices, mesh_.colors, mesh_.normals, mesh_.centroids))
+
+
+class ChunkStreamer:
+    def __init__(self, side_masks, color_values, chunk_size=16, greedy=False, load_distance=DEFAULT_LOAD_DISTANCE, memory_budget=DEFAULT_MEMORY_BUDGET):
+        """
+        Build chunk meshes on demand in a worker thread, the nearest chunks to the camera first.
+
+        The chunks are placed in chunk_grid as they are finished, so the render loop never waits for them. When the
+        meshes take more memory than the budget, the chunks farthest from the camera and outside the load distance are
+        dropped, and no new chunks are built until there is room again.
+
+        :param side_masks: A numpy array of shape (height, width) containing mesh side flags (can be memory mapped).
+        :param color_values: A numpy array of shape (height, width) of packed block colors (can be memory mapped).
+        :param int chunk_size: The chunk width and height in blocks.
+        :param bool greedy: Whether to merge coplanar sides of the same color inside each chunk (see greedy_meshing).
+        :param float load_distance: Chunks closer than this to the camera (in the horizontal plane) are built.
+        :param int memory_budget: The number of bytes the chunk meshes may take.
+        """
+        self.side_masks = side_masks
+        self.color_values = color_values
+        self.chunk_size = chunk_size
+        self.greedy = greedy
+        self.load_distance = load_distance
+        self.memory_budget = memory_budget
+
+        height, width = side_masks.shape
+        shape = ((height + chunk_size - 1) // chunk_size, (width + chunk_size - 1) // chunk_size)
+
+        # the same layout as level_loader.generate_chunks, chunks that are not built (or are empty) are None
+        self.chunk_grid = np.empty(shape, dtype=object)
+        self.loaded = np.zeros(shape, dtype=bool)
+        self.memory_sizes = np.zeros(shape, dtype=np.int64)
+        self.memory_size = 0
+
+        # edited chunks get a new version, builds of older versions are discarded
+        self.versions = np.zeros(shape, dtype=np.int64)
+        self.built_versions = np.zeros(shape, dtype=np.int64)
+
+        # the chunks (x, y) to build, nearest first
+        self.requests = []
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+
+    def start(self):
+        """
+        Start building the requested chunks in a background thread.
+        """
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="ChunkStreamer", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stop the background thread after the chunk it is building.
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.running and (len(self.requests) == 0 or self.memory_size >= self.memory_budget):
+                    self.condition.wait()
+
+                if not self.running:
+                    return
+
+                x, y = self.requests.pop(0)
+
+            self.build_chunk(x, y)
+
+    def get_chunk_distances(self, x, y, camera_position):
+        """
+        Calculate the horizontal distances from the camera to the nearest points of the chunks.
+
+        :param x: A numpy array of chunk columns.
+        :param y: A numpy array of chunk rows.
+        :return: A numpy array of distances.
+        """
+        camera_x = camera_position[0]
+        camera_y = -camera_position[2]
+        distance_x = np.maximum(np.maximum(x * self.chunk_size - camera_x, camera_x - (x + 1) * self.chunk_size), 0.0)
+        distance_y = np.maximum(np.maximum(y * self.chunk_size - camera_y, camera_y - (y + 1) * self.chunk_size), 0.0)
+
+        return np.sqrt(distance_x * distance_x + distance_y * distance_y)
+
+    def update(self, camera_position):
+        """
+        Request the missing chunks around the camera (replacing the previous requests) and drop distant chunks if the
+        memory budget is exceeded. Does not build anything itself, so it is cheap enough to call every update.
+        """
+        rows, columns = self.chunk_grid.shape
+        reach = self.load_distance / self.chunk_size
+        center_x = camera_position[0] / self.chunk_size
+        center_y = -camera_position[2] / self.chunk_size
+
+        # only the chunks inside the square around the load circle can be requested
+        x0 = min(max(int(center_x - reach) - 1, 0), columns)
+        x1 = min(max(int(center_x + reach) + 2, 0), columns)
+        y0 = min(max(int(center_y - reach) - 1, 0), rows)
+        y1 = min(max(int(center_y + reach) + 2, 0), rows)
+        y, x = np.mgrid[y0:y1, x0:x1]
+        x = x.ravel()
+        y = y.ravel()
+
+        with self.condition:
+            distances = self.get_chunk_distances(x, y, camera_position)
+            requested = (distances <= self.load_distance) & (~self.loaded[y, x] | (self.built_versions[y, x] != self.versions[y, x]))
+            order = np.argsort(distances[requested], kind="stable")
+            self.requests = list(zip(x[requested][order].tolist(), y[requested][order].tolist()))
+
+            if self.memory_size > self.memory_budget:
+                self.evict(camera_position)
+
+            self.condition.notify_all()
+
+    def evict(self, camera_position):
+        """
+        Drop the chunks outside the load distance, the farthest first, until the meshes fit the memory budget.
+        """
+        y, x = np.nonzero(self.loaded)
+        distances = self.get_chunk_distances(x, y, camera_position)
+
+        for i in np.argsort(-distances, kind="stable"):
+            if self.memory_size <= self.memory_budget or distances[i] <= self.load_distance:
+                break
+
+            self.chunk_grid[y[i], x[i]] = None
+            self.loaded[y[i], x[i]] = False
+            self.memory_size -= int(self.memory_sizes[y[i], x[i]])
+            self.memory_sizes[y[i], x[i]] = 0
+
+    def invalidate_chunk(self, x, y):
+        """
+        Rebuild a chunk after its blocks have been edited. A built chunk stays visible until the new one replaces it.
+        """
+        with self.condition:
+            self.versions[y, x] += 1
+
+            if self.loaded[y, x] and (x, y) not in self.requests:
+                self.requests.insert(0, (x, y))
+                self.condition.notify_all()
+
+    def build_chunk(self, x, y):
+        """
+        Build the mesh of a chunk and make it available, unless the same version was built already or the chunk was
+        edited during the build.
+        """
+        with self.condition:
+            version = self.versions[y, x]
+
+        chunk_ = chunk.Chunk(x, y, self.chunk_size)
+        chunk_.build_mesh(self.side_masks, self.color_values, self.greedy)
+        memory_size = get_mesh_memory_size(chunk_.mesh) if chunk_.mesh is not None else 0
+
+        with self.condition:
+            if self.versions[y, x] != version or (self.loaded[y, x] and self.built_versions[y, x] == version):
+                return
+
+            self.chunk_grid[y, x] = chunk_ if chunk_.mesh is not None else None
+            self.loaded[y, x] = True
+            self.built_versions[y, x] = version
+            self.memory_size += memory_size - int(self.memory_sizes[y, x])
+            self.memory_sizes[y, x] = memory_size
+
+    def build_requests(self):
+        """
+        Build all the requested chunks in the calling thread (when the worker thread is not used).
+        """
+        while True:
+            with self.condition:
+                if len(self.requests) == 0 or self.memory_size >= self.memory_budget:
+                    return
+
+                x, y = self.requests.pop(0)
+
+            self.build_chunk(x, y)
+
+    def get_meshes(self):
+        """
+        Get the meshes of the chunks that have been built so far.
+
+        :return: A list of meshes.
+        """
+        with self.condition:
+            chunks = self.chunk_grid[self.loaded]
+
+        return [chunk_.mesh for chunk_ in chunks if chunk_ is not None]
@@ -17,6 +17,7 @@ class Color:
         self.g = g
         self.b = b
         self.a = a
+        self.uint32_value = None
         self.assert_values()
 
     def get_vector(self):
@@ -28,9 +29,14 @@ class Color:
     def get_uint32_value(self):
         """
         Convert color data into a 32 bit integer (in the format 0xAABBGGRR).
+
+        The value is computed once and cached, so the channels should not be changed after it has been asked for.
         """
-        self.assert_values()
-        return np.uint32(int(self.a * 255.0 + 0.5) << 24 | int(self.b * 255.0 + 0.5) << 16 | int(self.g * 255.0 + 0.5) << 8 | int(self.r * 255.0 + 0.5))
+        if self.uint32_value is None:
+            self.assert_values()
+            self.uint32_value = np.uint32(to_uint32_value((self.r, self.g, self.b, self.a)))
+
+        return self.uint32_value
 
     def assert_values(self):
         assert self.r >= 0.0 and self.r <= 1.0 and self.g >= 0.0 and self.g <= 1.0 and self.b >= 0.0 and self.b <= 1.0 and self.a >= 0.0 and self.a <= 1.0
@@ -48,3 +54,83 @@ def from_vector(rgba):
     Create a new color instance from a four dimensional vector.
     """
     return Color(rgba[0], rgba[1], rgba[2], rgba[3])
+
+
+def from_uint32_value(value):
+    """
+    Create a new color instance from a 32 bit integer (in the format 0xAABBGGRR). The packed value is known already,
+    so it is cached instead of computed again from the channels.
+    """
+    value = int(value)
+    color = from_int(value & 0xff, value >> 8 & 0xff, value >> 16 & 0xff, value >> 24)
+    color.uint32_value = np.uint32(value)
+
+    return color
+
+
+def to_uint32_value(rgba):
+    """
+    Pack a four dimensional RGBA vector (channels from 0.0 to 1.0) into a 32 bit integer (in the format 0xAABBGGRR).
+    """
+    return int(rgba[3] * 255.0 + 0.5) << 24 | int(rgba[2] * 255.0 + 0.5) << 16 | int(rgba[1] * 255.0 + 0.5) << 8 | int(rgba[0] * 255.0 + 0.5)
+
+
+def to_uint32_values(vectors):
+    """
+    Pack RGBA vectors (channels from 0.0 to 1.0) into 32 bit integers (in the format 0xAABBGGRR).
+
+    :param vectors: A numpy array of shape (N, 4).
+    :return: A numpy uint32 array of N values.
+    """
+    channels = (np.asarray(vectors, dtype=float).reshape(-1, 4) * 255.0 + 0.5).astype(np.uint32)
+
+    return np.bitwise_or.reduce(channels << np.array([0, 8, 16, 24], dtype=np.uint32), axis=1)
+
+
+def from_uint32_values(values):
+    """
+    Unpack 32 bit integer colors (in the format 0xAABBGGRR) to RGBA vectors.
+
+    :param values: A numpy array of N integers.
+    :return: A numpy array of shape (N, 4).
+    """
+    values = np.asarray(values, dtype=np.uint32)
+    channels = (values[:, np.newaxis] >> np.array([0, 8, 16, 24], dtype=np.uint32)) & 0xff
+
+    return channels / 255.0
+
+
+class Palette:
+    def __init__(self):
+        """
+        A set of shared color instances for levels built from a limited number of colors - every block of the same color
+        uses the same instance, so the packed value is computed only once per color.
+        """
+        self.colors = []
+        self.indices = dict()
+
+    def __len__(self):
+        return len(self.colors)
+
+    def get_index(self, value):
+        """
+        Get the palette index of a packed color value, adding the color to the palette if it is new.
+
+        :param int value: A 32 bit integer in the format 0xAABBGGRR.
+        """
+        index = self.indices.get(value)
+
+        if index is None:
+            index = len(self.colors)
+            self.colors.append(from_vector(from_uint32_values([value])[0]))
+            self.indices[value] = index
+
+        return index
+
+    def get_color(self, value):
+        """
+        Get the shared color instance of a packed color value.
+
+        :param int value: A 32 bit integer in the format 0xAABBGGRR.
+        """
+        return self.colors[self.get_index(value)]
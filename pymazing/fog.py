@@ -0,0 +1,90 @@
+"""Distance fog and a governor that adapts the fog distance to a frame time target."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import numpy as np
+
+from pymazing import color
+
+
+class Fog:
+    def __init__(self):
+        """
+        Linear fog: nothing before the start distance, only the fog color after the end distance.
+        """
+        self.color = color.from_int(0, 0, 0)
+        self.start = 40.0
+        self.end = 100.0
+
+    def get_amount(self, distance):
+        """
+        Calculate how much of the fog color is blended to a color at the given view distance.
+
+        :param distance: A distance or a numpy array of distances.
+        :return: The amount from 0.0 to 1.0 (a numpy array for an array of distances).
+        """
+        return np.clip((distance - self.start) / max(self.end - self.start, 1e-6), 0.0, 1.0)
+
+    def apply(self, color_vector, distance):
+        """
+        Blend an RGBA color vector toward the fog color.
+
+        :return: A numpy vector of the fogged RGBA color (the alpha is kept).
+        """
+        amount = self.get_amount(distance)
+        fogged_color = color_vector + (self.color.get_vector() - color_vector) * amount
+        fogged_color[3] = color_vector[3]
+
+        return fogged_color
+
+
+class FogGovernor:
+    def __init__(self, fog, target_frame_time, min_end, max_end, step=2.0, tolerance=0.1, smoothing=0.1):
+        """
+        Move the fog (and so the far plane) closer when the frames take longer than the target and farther when they
+        are faster. Within the tolerance around the target the distance is left alone, so that it does not oscillate.
+
+        The start distance keeps its ratio to the end distance.
+
+        :param fog: The Fog instance to adjust.
+        :param float target_frame_time: The frame time target in seconds.
+        :param float min_end: The closest allowed fog end distance.
+        :param float max_end: The farthest allowed fog end distance.
+        :param float step: How much the end distance changes per frame.
+        :param float tolerance: The relative frame time difference from the target that is accepted.
+        :param float smoothing: The weight of the latest frame time in the moving average.
+        """
+        self.fog = fog
+        self.target_frame_time = target_frame_time
+        self.min_end = min_end
+        self.max_end = max_end
+        self.step = step
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.start_ratio = fog.start / fog.end if fog.end > 0.0 else 0.0
+        self.average_frame_time = target_frame_time
+
+    def update(self, frame_time):
+        """
+        Record a frame time and adjust the fog distances.
+
+        :param float frame_time: The rendering time of the latest frame in seconds (without waiting for the display).
+        :return: True if the distances changed.
+        """
+        self.average_frame_time += (frame_time - self.average_frame_time) * self.smoothing
+        end = self.fog.end
+
+        if self.average_frame_time > self.target_frame_time * (1.0 + self.tolerance):
+            end -= self.step
+        elif self.average_frame_time < self.target_frame_time * (1.0 - self.tolerance):
+            end += self.step
+
+        end = min(max(end, self.min_end), self.max_end)
+
+        if end == self.fog.end:
+            return False
+
+        self.fog.end = end
+        self.fog.start = end * self.start_ratio
+
+        return True
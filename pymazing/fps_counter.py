@@ -1,13 +1,22 @@
-"""FPS counter with smooth averaging."""
+"""FPS counter with smooth averaging and frame time statistics."""
 # Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
 # License: MIT, see the LICENSE file.
 
+import csv
+import json
 import time
 
+import numpy as np
+
+PERCENTILES = [50.0, 95.0, 99.0]
+
 
 class FpsCounter:
-    def __init__(self):
-        self.last_update_time = time.clock()
+    def __init__(self, sample_count=1000):
+        """
+        :param int sample_count: How many of the latest frame times are kept for the statistics.
+        """
+        self.last_update_time = time.perf_counter()
         self.frame_time_sum = 0.0
         self.frame_time_sum_counter = 0
         self.last_moving_average_calculation_time = 0.0
@@ -15,14 +24,21 @@ class FpsCounter:
         self.previous_moving_average_frame_time = 1.0 / 30
         self.fps_string = "0"
 
+        # ring buffer of unfiltered frame times in seconds
+        self.frame_times = np.zeros(sample_count)
+        self.frame_time_index = 0
+        self.frame_time_count = 0
+
     def tick(self):
         """
         Record a single frame.
         """
-        current_time = time.clock()
+        current_time = time.perf_counter()
         frame_time = current_time - self.last_update_time
         self.last_update_time = current_time
 
+        self.record_frame_time(frame_time)
+
         # filter out too large changes in the frametime
         if frame_time > (2 * self.moving_average_frame_time):
             frame_time = 2 * self.moving_average_frame_time
@@ -43,8 +59,90 @@ class FpsCounter:
 
             self.fps_string = str(int(1.0 / self.moving_average_frame_time))
 
+    def record_frame_time(self, frame_time):
+        """
+        Store a raw frame time to the ring buffer (the oldest sample is overwritten when full).
+
+        :param float frame_time: The frame time in seconds.
+        """
+        self.frame_times[self.frame_time_index] = frame_time
+        self.frame_time_index = (self.frame_time_index + 1) % len(self.frame_times)
+        self.frame_time_count = min(self.frame_time_count + 1, len(self.frame_times))
+
+    def get_frame_times(self):
+        """
+        Get the recorded frame times in the order they were recorded.
+
+        :return: A numpy array of frame times in seconds.
+        """
+        if self.frame_time_count < len(self.frame_times):
+            return self.frame_times[:self.frame_time_count].copy()
+
+        return np.roll(self.frame_times, -self.frame_time_index)
+
+    def get_percentiles(self):
+        """
+        Calculate the frame time percentiles and the maximum from the recorded frame times.
+
+        :return: A dictionary with the keys p50, p95, p99 and max - values are in milliseconds.
+        """
+        frame_times = self.get_frame_times() * 1000.0
+
+        if len(frame_times) == 0:
+            frame_times = np.zeros(1)
+
+        values = np.percentile(frame_times, PERCENTILES)
+        percentiles = {"p{0}".format(int(p)): float(v) for p, v in zip(PERCENTILES, values)}
+        percentiles["max"] = float(frame_times.max())
+
+        return percentiles
+
+    def get_histogram(self, bin_count=20):
+        """
+        Calculate a histogram of the recorded frame times.
+
+        :param int bin_count: The number of equal width bins.
+        :return: A tuple of bin counts and bin edges (in milliseconds).
+        """
+        return np.histogram(self.get_frame_times() * 1000.0, bins=bin_count)
+
     def get_fps(self):
         """
         Get the FPS as a preformatted string.
         """
         return self.fps_string
+
+    def get_percentiles_string(self):
+        """
+        Get the FPS and the frame time percentiles as a preformatted string.
+        """
+        percentiles = self.get_percentiles()
+
+        return "{0} fps | p50 {p50:.1f} p95 {p95:.1f} p99 {p99:.1f} max {max:.1f} ms".format(self.fps_string, **percentiles)
+
+    def export_csv(self, file_name):
+        """
+        Write the recorded frame times to a CSV file (one frame per row).
+        """
+        with open(file_name, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["frame", "frame_time_ms"])
+
+            for i, frame_time in enumerate(self.get_frame_times()):
+                writer.writerow([i, "{0:.6f}".format(frame_time * 1000.0)])
+
+    def export_json(self, file_name):
+        """
+        Write the frame time percentiles, the histogram and the raw frame times to a JSON file.
+        """
+        counts, bin_edges = self.get_histogram()
+
+        data = {
+            "sample_count": self.frame_time_count,
+            "percentiles_ms": self.get_percentiles(),
+            "histogram": {"counts": counts.tolist(), "bin_edges_ms": bin_edges.tolist()},
+            "frame_times_ms": (self.get_frame_times() * 1000.0).tolist()
+        }
+
+        with open(file_name, "w") as file:
+            json.dump(data, file, indent=4)
@@ -2,12 +2,22 @@
 # Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
 # License: MIT, see the LICENSE file.
 
+import collections
+
 import numpy as np
 import OpenGL.GL as gl
 
 
+# how many sizes of pixel and depth arrays are kept for switching back without reallocating
+MAX_CACHED_BUFFERS = 8
+
+
 class FrameBuffer:
-    def __init__(self):
+    def __init__(self, headless=False):
+        """
+        :param bool headless: Keep the pixels only in memory and never touch OpenGL (no window is needed).
+        """
+        self.headless = headless
         self.pixel_data = None
         self.depth_data = None
         self.width = 0
@@ -15,9 +25,18 @@ class FrameBuffer:
         self.half_width = 0
         self.half_height = 0
         self.depth_clear_value = np.finfo(np.float32).max
-        self.textureId = gl.glGenTextures(1)
+        self.clear_color = 0
+        self.textureId = None
         self.use_smoothing = True
 
+        # (width, height) -> (pixel data, depth data), the most recently used last
+        self.buffer_cache = collections.OrderedDict()
+
+        if self.headless:
+            return
+
+        self.textureId = gl.glGenTextures(1)
+
         gl.glEnable(gl.GL_TEXTURE_2D)
         gl.glBindTexture(gl.GL_TEXTURE_2D, self.textureId)
         gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_WRAP_S, gl.GL_CLAMP_TO_EDGE)
@@ -27,26 +46,38 @@ class FrameBuffer:
 
     def resize(self, width, height):
         """
-        Resize the framebuffer to the given dimensions.
+        Resize the framebuffer to the given dimensions. The arrays of the recently used sizes are kept, so switching
+        between a few sizes (see resolution_governor) does not allocate.
         """
         self.width = width
         self.height = height
         self.half_width = ((self.width - 1.0) / 2.0)
         self.half_height = ((self.height - 1.0) / 2.0)
 
-        self.pixel_data = np.empty(self.width * self.height, np.uint32)
-        self.depth_data = np.empty(self.width * self.height, np.float32)
+        buffers = self.buffer_cache.pop((width, height), None)
+
+        if buffers is None:
+            buffers = (np.empty(self.width * self.height, np.uint32), np.empty(self.width * self.height, np.float32))
+
+        self.buffer_cache[(width, height)] = buffers
+        self.pixel_data, self.depth_data = buffers
+
+        while len(self.buffer_cache) > MAX_CACHED_BUFFERS:
+            self.buffer_cache.popitem(last=False)
 
         self.clear()
 
+        if self.headless:
+            return
+
         # this needs to be called once before using glTexSubImage2D
         gl.glTexImage2D(gl.GL_TEXTURE_2D, 0, gl.GL_RGBA, self.width, self.height, 0, gl.GL_RGBA, gl.GL_UNSIGNED_INT_8_8_8_8_REV, self.pixel_data)
 
     def clear(self):
         """
-        Clear the framebuffer to black.
+        Clear the framebuffer to the clear color (a packed color, black by default).
         """
-        self.pixel_data.fill(0)
+        self.pixel_data.fill(self.clear_color)
         #self.depth_data.fill(self.depth_clear_value)
 
     def set_smoothing(self, state):
@@ -55,6 +86,9 @@ class FrameBuffer:
         """
         self.use_smoothing = state
 
+        if self.headless:
+            return
+
         if self.use_smoothing:
             gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MIN_FILTER, gl.GL_LINEAR)
             gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MAG_FILTER, gl.GL_LINEAR)
@@ -66,6 +100,9 @@ class FrameBuffer:
         """
         Render the framebuffer data to the screen as a texture.
         """
+        if self.headless:
+            return
+
         gl.glTexSubImage2D(gl.GL_TEXTURE_2D, 0, 0, 0, self.width, self.height, gl.GL_RGBA, gl.GL_UNSIGNED_INT_8_8_8_8_REV, self.pixel_data)
 
         gl.glBegin(gl.GL_QUADS)
@@ -4,6 +4,8 @@
 
 from math import *
 
+import numpy as np
+
 from pymazing import plane
 
 TOP = 0
@@ -13,11 +15,20 @@ RIGHT = 3
 NEAR = 4
 FAR = 5
 
+ALL_PLANES = 0b111111
+
+OUTSIDE = 0
+INTERSECTING = 1
+INSIDE = 2
+
 
 class Frustum:
     def __init__(self):
         self.planes = [plane.Plane() for _ in range(6)]
 
+        # the planes as rows of (normal x, normal y, normal z, distance) for testing many objects at once
+        self.plane_array = np.zeros((6, 4))
+
     def setup_from_camera(self, camera):
         """
         Construct the bounding planes from the camera orientation data.
@@ -55,6 +66,10 @@ class Frustum:
         self.planes[NEAR].setup_from_points(ntl, ntr, nbr)
         self.planes[FAR].setup_from_points(ftr, ftl, fbl)
 
+        for i, plane_ in enumerate(self.planes):
+            self.plane_array[i, :3] = plane_.normal
+            self.plane_array[i, 3] = plane_.distance
+
     def point_is_inside(self, p):
         """
         Test if a point is inside the frustum.
@@ -74,3 +89,56 @@ class Frustum:
                 return False
 
         return True
+
+    def get_plane_rows(self, plane_mask):
+        """
+        Select the plane array rows of the planes whose bits are set in the plane mask.
+        """
+        if plane_mask == ALL_PLANES:
+            return self.plane_array
+
+        return self.plane_array[[i for i in range(6) if plane_mask & (1 << i)]]
+
+    def spheres_are_inside(self, centers, radii, plane_mask=ALL_PLANES):
+        """
+        Test many spheres against the frustum at once (a sphere is inside even if it is only partially inside).
+
+        :param centers: A numpy array of shape (N, 3).
+        :param radii: A numpy array of shape (N,).
+        :param int plane_mask: Bits of the planes to test against (others are known to be passed already).
+        :return: A boolean numpy array of shape (N,).
+        """
+        plane_rows = self.get_plane_rows(plane_mask)
+        distances = np.dot(centers, plane_rows[:, :3].T) + plane_rows[:, 3]
+
+        return np.all((distances + radii[:, np.newaxis]) >= 0.0, axis=1)
+
+    def box_is_inside(self, min_corner, max_corner, plane_mask=ALL_PLANES):
+        """
+        Test an axis aligned bounding box against the frustum planes given by the plane mask.
+
+        :param min_corner: The minimum corner of the box as a 3D vector.
+        :param max_corner: The maximum corner of the box as a 3D vector.
+        :param int plane_mask: Bits of the planes to test against (others are known to be passed already).
+        :return: A tuple of the result (OUTSIDE, INTERSECTING or INSIDE) and the mask of the planes the box still crosses.
+        """
+        plane_indices = [i for i in range(6) if plane_mask & (1 << i)]
+        plane_rows = self.plane_array[plane_indices]
+        normals = plane_rows[:, :3]
+        positive_normals = normals >= 0.0
+
+        # the box corners furthest along and against each plane normal
+        positive_vertices = np.where(positive_normals, max_corner, min_corner)
+        negative_vertices = np.where(positive_normals, min_corner, max_corner)
+
+        if np.any(np.sum(normals * positive_vertices, axis=1) + plane_rows[:, 3] < 0.0):
+            return OUTSIDE, 0
+
+        crossing = np.sum(normals * negative_vertices, axis=1) + plane_rows[:, 3] < 0.0
+        plane_mask = 0
+
+        for plane_index, is_crossing in zip(plane_indices, crossing):
+            if is_crossing:
+                plane_mask |= 1 << plane_index
+
+        return (INTERSECTING if plane_mask != 0 else INSIDE), plane_mask
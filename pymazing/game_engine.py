@@ -2,13 +2,14 @@
 # Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
 # License: MIT, see the LICENSE file.
 
+import os
 import time
 import distutils.util as du
 
 import sfml as sf
 import OpenGL.GL as gl
 
-from pymazing import fps_counter
+from pymazing import fps_counter, profiler, resolution_governor
 
 
 class GameEngine:
@@ -18,6 +19,11 @@ class GameEngine:
         self.framebuffer_scale = float(config["window"]["framebuffer_scale"])
         self.update_frequency = float(config["game"]["update_frequency"])
         self.show_fps = du.strtobool(config["game"]["show_fps"])
+        self.show_frame_times = du.strtobool(config["profiling"]["show_frame_times"])
+        self.export_frame_times_on_exit = du.strtobool(config["profiling"]["export_frame_times_on_exit"])
+        self.profiling_output_directory = config["profiling"]["output_directory"]
+        self.profile_frame_count = int(config["profiling"]["profile_frame_count"])
+        self.level_name = os.path.splitext(os.path.basename(config["game"]["level_file"]))[0]
 
         self.should_run = True
         self.game_states = []
@@ -27,13 +33,27 @@ class GameEngine:
         self.calculate_mouse_delta()
         self.mouse_delta = sf.Vector2()
 
-        self.fps_counter = fps_counter.FpsCounter()
+        self.fps_counter = fps_counter.FpsCounter(int(config["profiling"]["frame_time_sample_count"]))
         self.fps_font = sf.Font.from_file("data/fonts/dejavu-sans-mono-bold.ttf")
         self.fps_text = sf.Text("56", self.fps_font, 16)
         self.fps_text.position = (4, 2)
         self.fps_text.style = sf.Text.REGULAR
         self.fps_text.color = sf.Color(255, 255, 255, 255)
 
+        self.frame_profiler = profiler.FrameProfiler(self.profiling_output_directory)
+
+        # the framebuffer scale follows the frame times if the dynamic resolution is enabled
+        self.resolution_governor = None
+        target_frame_time = float(config["window"]["target_frame_time"]) / 1000.0
+
+        if du.strtobool(config["window"]["dynamic_resolution"]) and target_frame_time > 0.0:
+            self.resolution_governor = resolution_governor.ResolutionGovernor(target_frame_time, self.framebuffer_scale, float(config["window"]["min_framebuffer_scale"]), float(config["window"]["max_framebuffer_scale"]))
+
+            # the framebuffer was created with the configured scale before rounding it to the governor steps
+            if self.resolution_governor.scale != self.framebuffer_scale:
+                self.framebuffer_scale = self.resolution_governor.scale
+                self.resize_framebuffer()
+
     def run(self):
         """
         The main game loop.
@@ -41,7 +61,7 @@ class GameEngine:
         Details: http://gafferongames.com/game-physics/fix-your-timestep/
         """
         time_step = 1.0 / self.update_frequency
-        previous_time = time.clock()
+        previous_time = time.perf_counter()
         time_accumulator = 0.0
 
         # make sure that at least one update happens before rendering
@@ -50,7 +70,7 @@ class GameEngine:
             game_state.update(time_step, self.mouse_delta)
 
         while self.should_run:
-            current_time = time.clock()
+            current_time = time.perf_counter()
             frame_time = current_time - previous_time
             previous_time = current_time
 
@@ -63,7 +83,20 @@ class GameEngine:
                 self.update(time_step)
                 time_accumulator -= time_step
 
-            self.render(time_accumulator / time_step)
+            update_time = time.perf_counter() - current_time
+            render_time = self.render(time_accumulator / time_step)
+
+            # with the vertical sync no frame is faster than the refresh rate, so the governor gets the time spent
+            # updating and rendering instead of the whole frame time
+            if self.resolution_governor is not None:
+                scale = self.resolution_governor.update(update_time + render_time)
+
+                if scale is not None:
+                    self.framebuffer_scale = scale
+                    self.resize_framebuffer()
+
+        if self.export_frame_times_on_exit:
+            self.export_frame_times()
 
     def update(self, time_step):
         """
@@ -80,21 +113,42 @@ class GameEngine:
         Render everything (no fixed time step).
 
         :param float interpolation: Interpolation value between the fixed physics update steps.
+        :return: The rendering time in seconds, without waiting for the display.
         """
+        start_time = time.perf_counter()
         self.active_game_state.render(self.framebuffer, interpolation)
         self.window.clear(sf.Color.RED)
         self.framebuffer.render()
 
         if self.show_fps:
-            self.fps_text.string = self.fps_counter.get_fps()
+            if self.show_frame_times:
+                self.fps_text.string = self.fps_counter.get_percentiles_string()
+            else:
+                self.fps_text.string = self.fps_counter.get_fps()
+
             self.window.push_GL_states()
             self.window.draw(self.fps_text)
             self.window.pop_GL_states()
 
+        render_time = time.perf_counter() - start_time
         self.window.display()
         self.framebuffer.clear()
         self.fps_counter.tick()
 
+        if self.frame_profiler.profile is not None:
+            self.frame_profiler.tick()
+
+        return render_time
+
+    def export_frame_times(self):
+        """
+        Write the recorded frame times and their statistics to timestamped CSV and JSON files.
+        """
+        os.makedirs(self.profiling_output_directory, exist_ok=True)
+        file_name = os.path.join(self.profiling_output_directory, "frame_times-" + time.strftime("%Y%m%d-%H%M%S"))
+        self.fps_counter.export_csv(file_name + ".csv")
+        self.fps_counter.export_json(file_name + ".json")
+
     def calculate_mouse_delta(self):
         """
         Calculate the mouse movement amount from the previous position.
@@ -110,6 +164,24 @@ class GameEngine:
         for game_state in self.game_states:
             game_state.camera.update_projection_matrix(self.framebuffer.width / self.framebuffer.height)
 
+    def resize_framebuffer(self):
+        """
+        Resize the framebuffer to the window size times the framebuffer scale.
+        """
+        self.framebuffer.resize(int(self.window.size.x * self.framebuffer_scale + 0.5), int(self.window.size.y * self.framebuffer_scale + 0.5))
+        self.update_cameras()
+
+    def set_framebuffer_scale(self, scale):
+        """
+        Change the framebuffer scale manually (the governor continues from it).
+        """
+        self.framebuffer_scale = scale
+
+        if self.resolution_governor is not None:
+            self.framebuffer_scale = self.resolution_governor.set_scale(scale)
+
+        self.resize_framebuffer()
+
     def handle_events(self):
         """
         Handle all events related to the os and the window.
@@ -120,33 +192,32 @@ class GameEngine:
 
             if type(event) is sf.ResizeEvent:
                 gl.glViewport(0, 0, event.size.x, event.size.y)
-                self.framebuffer.resize(int(self.window.size.x * self.framebuffer_scale + 0.5), int(self.window.size.y * self.framebuffer_scale + 0.5))
-                self.update_cameras()
+                self.resize_framebuffer()
 
             if type(event) is sf.KeyEvent and event.pressed:
                 if event.code == sf.Keyboard.ESCAPE:
                     self.should_run = False
 
                 if event.code == sf.Keyboard.F12:
-                    self.framebuffer_scale *= 2.0
-
-                    if self.framebuffer_scale > 1.0:
-                        self.framebuffer_scale = 1.0
-
-                    self.framebuffer.resize(int(self.window.size.x * self.framebuffer_scale + 0.5), int(self.window.size.y * self.framebuffer_scale + 0.5))
-                    self.update_cameras()
+                    self.set_framebuffer_scale(min(self.framebuffer_scale * 2.0, 1.0))
 
                 if event.code == sf.Keyboard.F11:
-                    self.framebuffer_scale *= 0.5
-
-                    if self.framebuffer_scale < 0.01:
-                        self.framebuffer_scale = 0.01
-
-                    self.framebuffer.resize(int(self.window.size.x * self.framebuffer_scale + 0.5), int(self.window.size.y * self.framebuffer_scale + 0.5))
-                    self.update_cameras()
+                    self.set_framebuffer_scale(max(self.framebuffer_scale * 0.5, 0.01))
 
                 if event.code == sf.Keyboard.F10:
                     self.framebuffer.set_smoothing(not self.framebuffer.use_smoothing)
 
                 if event.code == sf.Keyboard.F9:
                     self.show_fps = not self.show_fps
+
+                if event.code == sf.Keyboard.T:
+                    self.show_frame_times = not self.show_frame_times
+
+                    if self.show_frame_times:
+                        self.show_fps = True
+
+                if event.code == sf.Keyboard.X:
+                    self.export_frame_times()
+
+                if event.code == sf.Keyboard.P:
+                    self.frame_profiler.start(self.profile_frame_count, self.level_name)
@@ -2,9 +2,12 @@
 # Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
 # License: MIT, see the LICENSE file.
 
+import time
+import distutils.util as du
+
 import sfml as sf
 
-from pymazing import world, level_loader, color, light, camera, coordinate_grid, renderer, matrix
+from pymazing import world, level_loader, color, light, camera, coordinate_grid, renderer, matrix, quadtree, visibility, pvs, chunk, chunk_streamer, level_editor, mesh_cache, parallel_meshing, chunk_lod, fog
 
 
 class GameStateLoadedLevel:
@@ -36,8 +39,106 @@ class GameStateLoadedLevel:
         self.camera.position[1] = 3
         self.camera.position[2] = 6
 
-        blocks = level_loader.generate_blocks_from_tga(config["game"]["level_file"])
-        self.meshes = level_loader.generate_partial_meshes(blocks)
+        # the fog hides the far plane, so the geometry beyond the fog end is culled and clipped away
+        self.world.fog_enabled = du.strtobool(config["game"]["fog"])
+        self.fog_governor = None
+
+        if self.world.fog_enabled:
+            self.world.fog.color = color.from_int(*[int(value) for value in config["game"]["fog_color"].split(",")])
+            self.world.fog.start = float(config["game"]["fog_start"])
+            self.world.fog.end = float(config["game"]["fog_end"])
+            self.camera.set_far_z(self.world.fog.end)
+
+            # a zero target keeps the fog distance fixed
+            fog_frame_time_target = float(config["game"]["fog_frame_time_target"]) / 1000.0
+
+            if fog_frame_time_target > 0.0:
+                # both governors would react to the same slow frames, so the frame time has only one owner
+                if du.strtobool(config["window"]["dynamic_resolution"]):
+                    raise Exception("The fog frame time target and the dynamic resolution can not be enabled at the same time")
+
+                self.fog_governor = fog.FogGovernor(self.world.fog, fog_frame_time_target, float(config["game"]["fog_min_end"]), self.world.fog.end)
+
+        level_file = config["game"]["level_file"]
+        greedy = du.strtobool(config["game"]["greedy_meshing"])
+        blocks = None
+        occupancy = None
+        side_masks = None
+
+        # a chunk size of zero uses a separate mesh for every block
+        self.chunk_size = int(config["game"]["chunk_size"])
+        meshing_processes = int(config["game"]["meshing_processes"])
+        self.chunk_grid = None
+        self.mesh_grid = None
+
+        palette = color.Palette() if du.strtobool(config["game"]["color_palette"]) else None
+
+        # streaming meshes the chunks around the camera in the background instead of all chunks before the first frame
+        streaming = self.chunk_size > 0 and du.strtobool(config["game"]["streaming"])
+        self.chunk_streamer = None
+
+        if self.chunk_size > 0 and not streaming and du.strtobool(config["game"]["mesh_cache"]):
+            # the chunks come from the cache (and the visibility data of the native levels from the level file), the blocks are not needed
+            self.chunk_grid, occupancy, color_values, side_masks = mesh_cache.load_or_generate_chunks(level_file, self.chunk_size, greedy, meshing_processes)
+        elif level_loader.is_level_file(level_file):
+            # the native format is memory mapped (copy-on-write for editing) and already has the side masks
+            occupancy, color_values, side_masks = level_loader.open_level(level_file, "c")
+
+            if self.chunk_size == 0:
+                blocks = level_loader.generate_blocks_from_color_values(color_values, palette)
+        elif streaming:
+            occupancy, color_values = level_loader.load_level_arrays(level_file)
+            side_masks = level_loader.generate_side_masks_from_occupancy(occupancy)
+        else:
+            blocks = level_loader.generate_blocks_from_tga(level_file, palette)
+            occupancy = level_loader.generate_occupancy(blocks)
+            color_values = level_loader.generate_color_values(blocks)
+
+        height, width = occupancy.shape
+        self.level_size = (width, height)
+        self.floor_mesh = level_loader.create_floor_mesh(width, height)
+
+        if streaming:
+            memory_budget = int(float(config["game"]["streaming_memory_budget"]) * 1024 * 1024)
+            self.chunk_streamer = chunk_streamer.ChunkStreamer(side_masks, color_values, self.chunk_size, greedy, float(config["game"]["streaming_load_distance"]), memory_budget)
+            self.chunk_streamer.update(self.camera.position)
+            self.chunk_streamer.start()
+            self.chunk_grid = self.chunk_streamer.chunk_grid
+            self.mesh_index = None
+        elif self.chunk_size > 0:
+            if self.chunk_grid is None and meshing_processes > 1:
+                self.chunk_grid, side_masks = parallel_meshing.generate_chunks_parallel(occupancy, color_values, self.chunk_size, greedy, meshing_processes)
+            elif self.chunk_grid is None:
+                if side_masks is None:
+                    side_masks = level_loader.generate_side_masks_from_occupancy(occupancy)
+
+                self.chunk_grid = level_loader.generate_chunks_from_arrays(side_masks, color_values, self.chunk_size, greedy)
+
+            self.mesh_index = quadtree.QuadTree([chunk_.mesh for chunk_ in self.chunk_grid.flat if chunk_ is not None])
+        else:
+            meshes = level_loader.generate_partial_meshes(blocks)
+            self.mesh_grid = level_loader.generate_mesh_grid(blocks, meshes)
+            self.mesh_index = quadtree.QuadTree(meshes[1:])
+
+        self.use_raycast_visibility = du.strtobool(config["game"]["raycast_visibility"])
+        self.grid_visibility = visibility.GridVisibility(blocks, int(config["game"]["raycast_ray_count"]), occupancy=occupancy, side_masks=side_masks)
+
+        # the editor shares the level arrays with the visibility, the streamer rebuilds its own chunks
+        editor_chunk_grid = self.chunk_grid if self.chunk_streamer is None else None
+        self.level_editor = level_editor.LevelEditor(self.grid_visibility.occupancy, color_values, self.grid_visibility.side_masks, editor_chunk_grid, self.chunk_size, greedy, blocks, self.mesh_grid)
+
+        # distant chunks are rendered with coarser meshes, built from the edited arrays when needed
+        self.chunk_lod = None
+        lod_distances = [float(value) for value in config["game"]["lod_distances"].split(",") if value.strip() != ""]
+
+        if self.chunk_size > 0 and len(lod_distances) > 0:
+            self.chunk_lod = chunk_lod.ChunkLod(self.grid_visibility.occupancy, color_values, self.chunk_size, lod_distances, float(config["game"]["lod_hysteresis"]))
+
+        self.pvs = None
+
+        # a cluster size of zero is chosen from the level size so that the bitsets fit in memory
+        if du.strtobool(config["game"]["pvs"]):
+            self.pvs = pvs.load_or_generate_pvs(level_file, self.grid_visibility.occupancy, int(config["game"]["pvs_cluster_size"]))
 
         self.coordinate_grid = coordinate_grid.CoordinateGrid()
 
@@ -62,9 +163,43 @@ class GameStateLoadedLevel:
 
         return False
 
+    def edit_block(self, x, y, color_value):
+        """
+        Add, recolor or remove a block while the level is running, only the meshes around the block are rebuilt.
+
+        :param int x: The block column.
+        :param int y: The block row.
+        :param int color_value: The packed color of the block (see Color.get_uint32_value), zero removes the block.
+        """
+        for old_mesh, new_mesh in self.level_editor.set_block(x, y, color_value):
+            if self.mesh_index is not None:
+                self.mesh_index.replace_mesh(old_mesh, new_mesh)
+
+        if self.chunk_streamer is not None:
+            for chunk_x, chunk_y in self.level_editor.get_affected_chunks(x, y):
+                self.chunk_streamer.invalidate_chunk(chunk_x, chunk_y)
+
+        if self.chunk_lod is not None:
+            self.chunk_lod.prune(self.chunk_grid)
+
+        height, width = self.grid_visibility.occupancy.shape
+
+        for cell_x, cell_y in level_editor.get_neighborhood(x, y, width, height):
+            self.grid_visibility.clear_mesh_cache(cell_x, cell_y)
+
+        # the PVS was precomputed for the level as it was loaded
+        self.pvs = None
+
     def update(self, time_step, mouse_delta):
         self.camera.update(time_step, mouse_delta)
 
+        if self.chunk_streamer is not None:
+            self.chunk_streamer.update(self.camera.position)
+
+            # the coarse meshes of the dropped chunks would keep them in memory
+            if self.chunk_lod is not None:
+                self.chunk_lod.prune(self.chunk_grid)
+
         if self.rotate_lights:
             light_rotation_matrix = matrix.create_rotation_matrix_y(0.5 * time_step)
             self.world.diffuse_lights[0].position = light_rotation_matrix.dot(self.world.diffuse_lights[0].position)
@@ -94,10 +229,77 @@ class GameStateLoadedLevel:
         if self.is_key_pressed_once(sf.Keyboard.F8):
             self.rotate_lights = not self.rotate_lights
 
+    def find_visible_meshes(self):
+        """
+        Select the block or chunk meshes to render: inside the maze use the raycast visibility or the PVS of the camera
+        cell, everywhere else (and as the final step) cull against the view frustum.
+
+        :return: A list of meshes.
+        """
+        visible_meshes = None
+        visible_chunks = None
+
+        # the visible cells are only looked up up to the far plane, not over the whole level
+        if self.use_raycast_visibility:
+            if self.chunk_grid is not None:
+                visible_cells = self.grid_visibility.find_visible_sides(self.camera)
+
+                if visible_cells is not None:
+                    visible_chunks = chunk.get_chunk_coordinates(visible_cells[0], visible_cells[1], self.chunk_size, self.chunk_grid.shape)
+            else:
+                visible_meshes = self.grid_visibility.find_visible_meshes(self.camera)
+
+        if visible_meshes is None and visible_chunks is None and self.pvs is not None and 0.0 < self.camera.position[1] < visibility.WALL_HEIGHT:
+            if self.chunk_grid is not None:
+                visible_clusters = self.pvs.find_visible_clusters(self.camera, self.camera.far_z)
+
+                if visible_clusters is not None:
+                    visible_chunks = chunk.get_chunk_coordinates(visible_clusters[0], visible_clusters[1], self.chunk_size, self.chunk_grid.shape, self.pvs.cluster_size)
+            else:
+                visible_blocks = self.pvs.find_visible_blocks(self.camera, self.camera.far_z)
+
+                if visible_blocks is not None:
+                    visible_meshes = [mesh_ for mesh_ in self.mesh_grid[visible_blocks[1], visible_blocks[0]] if mesh_ is not None]
+
+        if visible_chunks is not None:
+            visible_meshes = [chunk_.mesh for chunk_ in self.chunk_grid[visible_chunks] if chunk_ is not None]
+
+        if visible_meshes is None:
+            if self.chunk_streamer is not None:
+                visible_meshes = self.chunk_streamer.get_meshes()
+            else:
+                return self.mesh_index.find_visible(self.camera.frustum)
+
+        if len(visible_meshes) == 0:
+            return visible_meshes
+
+        return renderer.cull_meshes(visible_meshes, self.camera.frustum)
+
     def render(self, framebuffer, interpolation):
+        render_start_time = time.perf_counter()
+
+        # the background is the fog color, so the clipped far plane does not show
+        framebuffer.clear_color = self.world.fog.color.get_uint32_value() if self.world.fog_enabled else 0
+
         if self.render_coordinate_grid:
             self.coordinate_grid.render(self.camera, framebuffer)
 
         if self.render_meshes:
-            renderer.render_meshes(self.meshes[:1], self.world, self.camera, framebuffer, do_backface_culling=self.do_backface_culling, render_wireframe=self.render_wireframe)
-            renderer.render_meshes(self.meshes[1:], self.world, self.camera, framebuffer, do_backface_culling=self.do_backface_culling, render_wireframe=self.render_wireframe)
+            if self.world.fog_enabled:
+                # the fog is applied per triangle, so the fogged floor is split to tiles that fade out toward the far plane
+                width, height = self.level_size
+                floor_tiles = level_loader.create_floor_tiles(width, height, self.camera.position[0], -self.camera.position[2], self.camera.far_z)
+                renderer.render_cube_instances(floor_tiles, self.world, self.camera, framebuffer, do_backface_culling=self.do_backface_culling, render_wireframe=self.render_wireframe)
+            else:
+                renderer.render_meshes([self.floor_mesh], self.world, self.camera, framebuffer, do_backface_culling=self.do_backface_culling, render_wireframe=self.render_wireframe)
+
+            meshes = self.find_visible_meshes()
+
+            if self.chunk_lod is not None:
+                meshes = self.chunk_lod.select_meshes(meshes, self.camera.position)
+
+            renderer.render_meshes(meshes, self.world, self.camera, framebuffer, do_frustum_culling=False, do_backface_culling=self.do_backface_culling, render_wireframe=self.render_wireframe)
+
+        # the governor follows the rendering work, not the time between the frames (which includes the vertical sync)
+        if self.fog_governor is not None and self.fog_governor.update(time.perf_counter() - render_start_time):
+            self.camera.set_far_z(self.world.fog.end)
@@ -0,0 +1,197 @@
+"""Greedy meshing: merge adjacent coplanar block sides of the same color into larger rectangles."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import argparse
+import glob
+
+import numpy as np
+
+from pymazing import level_generator, level_loader, mesh
+
+SIZES = [64, 256, 1024]
+
+# the corners of each side in the vertex order of create_cube, wound like the cube triangles
+SIDE_QUADS = [(side, triangles[0] + triangles[1][2:]) for side, triangles in mesh.SIDE_TRIANGLES]
+CUBE_VERTICES = np.array(mesh.create_cube(None).vertices)[:, :3]
+
+
+def find_runs(keys):
+    """
+    Find the runs of equal non-zero keys on each row.
+
+    :param keys: A two dimensional numpy array.
+    :return: A tuple of row, start column, end column (exclusive) and key arrays.
+    """
+    padded_keys = np.zeros((keys.shape[0], keys.shape[1] + 2), dtype=keys.dtype)
+    padded_keys[:, 1:-1] = keys
+    rows, columns = np.nonzero(padded_keys[:, 1:] != padded_keys[:, :-1])
+
+    # every change of value on a row ends a run and starts the next one
+    same_row = rows[:-1] == rows[1:]
+    rows = rows[:-1][same_row]
+    starts = columns[:-1][same_row]
+    ends = columns[1:][same_row]
+    run_keys = keys[rows, starts]
+    is_run = run_keys != 0
+
+    return rows[is_run], starts[is_run], ends[is_run], run_keys[is_run]
+
+
+def find_rectangles(keys):
+    """
+    Cover the non-zero keys with rectangles of equal keys: take the first uncovered cell in row-major order, grow it
+    along the row as far as possible and then downwards while the whole row span matches.
+
+    :param keys: A two dimensional numpy array.
+    :return: A numpy array of shape (N, 4) of rectangles (x0, y0, x1, y1) with exclusive ends.
+    """
+    height, width = keys.shape
+    covered = keys == 0
+    rectangles = []
+
+    for y in range(height):
+        x = 0
+
+        while x < width:
+            if covered[y, x]:
+                x += 1
+                continue
+
+            key = keys[y, x]
+            run = (keys[y, x:] == key) & ~covered[y, x:]
+            x1 = x + (len(run) if np.all(run) else int(np.argmin(run)))
+            y1 = y + 1
+
+            while y1 < height and np.all(keys[y1, x:x1] == key) and not np.any(covered[y1, x:x1]):
+                y1 += 1
+
+            covered[y:y1, x:x1] = True
+            rectangles.append((x, y, x1, y1))
+            x = x1
+
+    return np.array(rectangles, dtype=int).reshape(-1, 4)
+
+
+def generate_faces(color_values, side_masks):
+    """
+    Merge the block sides to rectangular faces. Top sides are merged in two dimensions, the walls only along their
+    length as they are one block high.
+
+    :param color_values: A numpy array of shape (height, width) of packed colors from level_loader.generate_color_values.
+    :param side_masks: A numpy array of shape (height, width) of mesh side flags.
+    :return: A tuple of side flag and block rectangle (x0, y0, x1, y1) arrays.
+    """
+    sides = []
+    rectangles = []
+
+    for side, _ in SIDE_QUADS:
+        keys = np.where((side_masks & side) != 0, color_values, 0)
+
+        if side == mesh.TOP or side == mesh.BOTTOM:
+            side_rectangles = find_rectangles(keys)
+        elif side == mesh.FRONT or side == mesh.BACK:
+            y, x0, x1, _ = find_runs(keys)
+            side_rectangles = np.column_stack((x0, y, x1, y + 1))
+        else:
+            x, y0, y1, _ = find_runs(keys.T)
+            side_rectangles = np.column_stack((x, y0, x + 1, y1))
+
+        sides.append(np.full(len(side_rectangles), side, dtype=np.uint8))
+        rectangles.append(side_rectangles.reshape(-1, 4))
+
+    return np.concatenate(sides), np.concatenate(rectangles)
+
+
+def create_face_mesh(sides, rectangles, colors):
+    """
+    Create one mesh of merged block faces with two triangles per face.
+
+    The vertices are stored relative to the center of the faces, which is the mesh position.
+
+    :param sides: A numpy array of side flags.
+    :param rectangles: A numpy array of shape (N, 4) of block rectangles (x0, y0, x1, y1).
+    :param colors: A numpy array of N packed colors.
+    :return: A mesh instance.
+    """
+    # the world space boxes the rectangles cover
+    box_min = np.column_stack((rectangles[:, 0], np.zeros(len(rectangles)), -rectangles[:, 3])).astype(float)
+    box_max = np.column_stack((rectangles[:, 2], np.ones(len(rectangles)), -rectangles[:, 1])).astype(float)
+
+    quads = np.zeros((len(rectangles), 4), dtype=int)
+
+    for side, quad in SIDE_QUADS:
+        quads[sides == side] = quad
+
+    corner_signs = CUBE_VERTICES[quads]
+    vertices = np.where(corner_signs < 0.0, box_min[:, np.newaxis, :], box_max[:, np.newaxis, :]).reshape(-1, 3)
+    position = (np.min(box_min, axis=0) + np.max(box_max, axis=0)) / 2.0
+
+    first_vertices = 4 * np.arange(len(rectangles))[:, np.newaxis, np.newaxis]
+
+    mesh_ = mesh.Mesh()
+    mesh_.vertices = np.column_stack((vertices - position, np.ones(len(vertices))))
+    mesh_.indices = (first_vertices + [[0, 1, 2], [0, 2, 3]]).reshape(-1, 3)
+    mesh_.colors = np.repeat(np.asarray(colors, dtype=np.uint32), 2)
+    mesh_.position = list(position)
+    mesh_.calculate_triangle_data()
+    mesh_.calculate_bounding_radius()
+
+    return mesh_.compact()
+
+
+def generate_greedy_meshes(blocks):
+    """
+    Generate mesh data from the block data with the visible sides merged to as few faces as possible.
+
+    :param blocks: A two dimensional array of colors.
+    :return: A list of meshes: the floor plane and one mesh of all the merged faces (if there are blocks).
+    """
+    height = len(blocks)
+    width = len(blocks[0])
+    meshes = [level_loader.create_floor_mesh(width, height)]
+
+    color_values = level_loader.generate_color_values(blocks)
+    sides, rectangles = generate_faces(color_values, level_loader.generate_side_masks(blocks))
+
+    if len(rectangles) > 0:
+        meshes.append(create_face_mesh(sides, rectangles, color_values[rectangles[:, 1], rectangles[:, 0]]))
+
+    return meshes
+
+
+def get_triangle_counts(blocks):
+    """
+    Count the block side triangles without and with greedy meshing.
+
+    :return: A tuple of (partial mesh triangle count, greedy mesh triangle count).
+    """
+    side_masks = level_loader.generate_side_masks(blocks)
+    sides, _ = generate_faces(level_loader.generate_color_values(blocks), side_masks)
+    side_count = int(np.sum(np.unpackbits(side_masks[:, :, np.newaxis], axis=2)))
+
+    return 2 * side_count, 2 * len(sides)
+
+
+def main():
+    """
+    Command line entry point: python -m pymazing.greedy_meshing [--sizes 64 256] - reports the triangle count reduction.
+    """
+    parser = argparse.ArgumentParser(description="Greedy meshing triangle count report")
+    parser.add_argument("--levels", nargs="*", default=sorted(glob.glob("data/levels/*.tga")), help="TGA level files")
+    parser.add_argument("--sizes", type=int, nargs="*", default=SIZES, help="generated maze sizes in blocks")
+    args = parser.parse_args()
+
+    levels = [(file_name, level_loader.generate_blocks_from_tga(file_name)) for file_name in args.levels]
+    levels.extend(("maze{0}".format(size), level_loader.generate_blocks_from_pixels(level_generator.generate_maze_pixels(size, size))) for size in args.sizes)
+
+    print("{0:<24} {1:>12} {2:>12} {3:>10}".format("level", "partial", "greedy", "reduction"))
+
+    for name, blocks in levels:
+        partial_count, greedy_count = get_triangle_counts(blocks)
+        reduction = 1.0 - greedy_count / partial_count if partial_count > 0 else 0.0
+        print("{0:<24} {1:>12} {2:>12} {3:>9.1f}%".format(name, partial_count, greedy_count, reduction * 100.0))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Adding and removing blocks of a loaded level with only the affected geometry rebuilt."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+from pymazing import chunk, color, level_loader
+
+
+def get_neighborhood(x, y, width, height):
+    """
+    Get the block and its four neighbors that are inside the level.
+
+    :return: A list of (x, y) tuples, the block itself first.
+    """
+    cells = [(x, y), (x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)]
+
+    return [(cell_x, cell_y) for cell_x, cell_y in cells if 0 <= cell_x < width and 0 <= cell_y < height]
+
+
+def update_side_masks(occupancy, side_masks, x, y):
+    """
+    Recalculate the side masks of a block and its four neighbors after the block has been added or removed.
+
+    Only a window of two blocks around the block is looked at, so the time does not depend on the level size.
+
+    :param occupancy: A boolean numpy array of shape (height, width) with the block already changed.
+    :param side_masks: A numpy array of shape (height, width) of side flags (modified in place).
+    """
+    height, width = occupancy.shape
+    x0 = max(x - 2, 0)
+    y0 = max(y - 2, 0)
+    window_side_masks = level_loader.generate_side_masks_from_occupancy(occupancy[y0:y + 3, x0:x + 3])
+
+    # the window edges count as empty, but the neighbors of the updated blocks are all inside the window or the level
+    for cell_x, cell_y in get_neighborhood(x, y, width, height):
+        side_masks[cell_y, cell_x] = window_side_masks[cell_y - y0, cell_x - x0]
+
+
+class LevelEditor:
+    def __init__(self, occupancy, color_values, side_masks, chunk_grid=None, chunk_size=16, greedy=False, blocks=None, mesh_grid=None):
+        """
+        Edit the level arrays in place and rebuild the meshes that show the edited blocks. The arrays are usually shared
+        with the visibility, so they have to be writable (copy-on-write for memory mapped levels).
+
+        :param occupancy: A boolean numpy array of shape (height, width).
+        :param color_values: A numpy array of shape (height, width) of packed block colors.
+        :param side_masks: A numpy array of shape (height, width) of side flags.
+        :param chunk_grid: A numpy object array of chunks (see level_loader.generate_chunks) to keep up to date, or None.
+        :param int chunk_size: The chunk width and height in blocks.
+        :param bool greedy: Whether the chunks merge coplanar sides of the same color (see greedy_meshing).
+        :param blocks: A two dimensional array of colors to keep up to date, or None.
+        :param mesh_grid: A numpy object array of block meshes (see level_loader.generate_mesh_grid) to keep up to date, or None.
+        """
+        self.occupancy = occupancy
+        self.color_values = color_values
+        self.side_masks = side_masks
+        self.chunk_grid = chunk_grid
+        self.chunk_size = chunk_size
+        self.greedy = greedy
+        self.blocks = blocks
+        self.mesh_grid = mesh_grid
+
+    def set_block(self, x, y, color_value):
+        """
+        Add a block, change its color or remove it.
+
+        :param int x: The block column.
+        :param int y: The block row.
+        :param int color_value: The packed color of the block (see Color.get_uint32_value), zero removes the block.
+        :return: A list of (old mesh, new mesh) tuples of the replaced meshes, either one can be None.
+        """
+        self.occupancy[y, x] = color_value != 0
+        self.color_values[y, x] = color_value
+        update_side_masks(self.occupancy, self.side_masks, x, y)
+
+        if self.blocks is not None:
+            self.blocks[y][x] = color.from_uint32_value(color_value) if color_value != 0 else None
+
+        changed_meshes = []
+
+        if self.chunk_grid is not None:
+            for chunk_x, chunk_y in self.get_affected_chunks(x, y):
+                changed_meshes.append(self.rebuild_chunk(chunk_x, chunk_y))
+
+        if self.mesh_grid is not None:
+            height, width = self.occupancy.shape
+
+            for cell_x, cell_y in get_neighborhood(x, y, width, height):
+                changed_meshes.append(self.rebuild_block_mesh(cell_x, cell_y))
+
+        return changed_meshes
+
+    def clear_block(self, x, y):
+        """
+        Remove a block (see set_block).
+        """
+        return self.set_block(x, y, 0)
+
+    def get_affected_chunks(self, x, y):
+        """
+        Find the chunks whose meshes change when the block is edited - the block can be on the edge of a chunk.
+
+        :return: A sorted list of chunk (x, y) tuples.
+        """
+        height, width = self.occupancy.shape
+        neighborhood = get_neighborhood(x, y, width, height)
+
+        return sorted(set((cell_x // self.chunk_size, cell_y // self.chunk_size) for cell_x, cell_y in neighborhood))
+
+    def rebuild_chunk(self, x, y):
+        """
+        Replace a chunk of the chunk grid with a rebuilt one. The old chunk is not modified, so it can still be in use.
+
+        :return: A tuple of the old and the new chunk mesh.
+        """
+        old_chunk = self.chunk_grid[y, x]
+        new_chunk = chunk.Chunk(x, y, self.chunk_size)
+        new_chunk.build_mesh(self.side_masks, self.color_values, self.greedy)
+        self.chunk_grid[y, x] = new_chunk if new_chunk.mesh is not None else None
+
+        return (old_chunk.mesh if old_chunk is not None else None), new_chunk.mesh
+
+    def rebuild_block_mesh(self, x, y):
+        """
+        Replace a block mesh of the mesh grid.
+
+        :return: A tuple of the old and the new block mesh.
+        """
+        old_mesh = self.mesh_grid[y, x]
+        sides = int(self.side_masks[y, x])
+        new_mesh = None
+
+        if sides != 0:
+            color_ = self.blocks[y][x] if self.blocks is not None else color.from_uint32_value(self.color_values[y, x])
+            new_mesh = level_loader.create_block_mesh(color_, sides, x, y)
+
+        self.mesh_grid[y, x] = new_mesh
+
+        return old_mesh, new_mesh
@@ -0,0 +1,140 @@
+"""Procedural generation of maze levels."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import random
+
+import numpy as np
+
+WALL_COLORS = [(200, 60, 60), (60, 160, 60), (60, 90, 200), (220, 200, 60)]
+
+
+def generate_maze_pixels(width, height, seed=0):
+    """
+    Generate a maze using the recursive backtracker algorithm - walls are opaque pixels and passages transparent ones.
+
+    :param int width: The level width in blocks.
+    :param int height: The level height in blocks.
+    :param int seed: The random seed, same seed always produces the same maze.
+    :return: A numpy array of shape (height, width, 4) containing RGBA values.
+    """
+    random_ = random.Random(seed)
+    walls = np.ones((height, width), dtype=bool)
+    cell_width = (width - 1) // 2
+    cell_height = (height - 1) // 2
+
+    if cell_width > 0 and cell_height > 0:
+        visited = np.zeros((cell_height, cell_width), dtype=bool)
+        stack = [(0, 0)]
+        visited[0, 0] = True
+        walls[1, 1] = False
+
+        while stack:
+            cx, cy = stack[-1]
+            neighbors = []
+
+            for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+                nx = cx + dx
+                ny = cy + dy
+
+                if 0 <= nx < cell_width and 0 <= ny < cell_height and not visited[ny, nx]:
+                    neighbors.append((nx, ny))
+
+            if not neighbors:
+                stack.pop()
+                continue
+
+            nx, ny = random_.choice(neighbors)
+            visited[ny, nx] = True
+            walls[2 * ny + 1, 2 * nx + 1] = False
+            walls[cy + ny + 1, cx + nx + 1] = False
+            stack.append((nx, ny))
+
+    colors = np.array(WALL_COLORS, dtype=np.uint8)
+    color_indices = np.random.RandomState(seed).randint(len(WALL_COLORS), size=(height, width))
+
+    pixels = np.zeros((height, width, 4), dtype=np.uint8)
+    pixels[:, :, :3] = colors[color_indices]
+    pixels[:, :, 3] = np.where(walls, 255, 0)
+
+    return pixels
+
+
+def write_tga(pixels, file_name, depth=32, rle=False):
+    """
+    Write RGBA pixel data to a true-color TGA file that the level loader can read.
+
+    :param pixels: A numpy array of shape (height, width, 4) containing RGBA values.
+    :param string file_name: The output file path.
+    :param int depth: Bits per pixel, 32 or 24 (without the alpha channel, transparent pixels should be black).
+    :param bool rle: Whether to run-length encode the pixels.
+    """
+    height, width = pixels.shape[:2]
+    pixel_size = depth // 8
+
+    header = bytearray(18)
+    header[2] = 10 if rle else 2  # (run-length encoded) true-color image
+    header[12:14] = width.to_bytes(2, byteorder="little")
+    header[14:16] = height.to_bytes(2, byteorder="little")
+    header[16] = depth  # bits per pixel
+    header[17] = 8 if depth == 32 else 0  # alpha channel depth
+
+    # TGA stores the pixels in BGRA order
+    bgra_pixels = pixels[:, :, [2, 1, 0, 3][:pixel_size]].astype(np.uint8)
+
+    if depth == 24:
+        bgra_pixels[pixels[:, :, 3] == 0] = 0
+
+    with open(file_name, "wb") as file:
+        file.write(bytes(header))
+
+        if rle:
+            file.write(encode_tga_rle(bgra_pixels.reshape(-1, pixel_size)))
+        else:
+            file.write(bgra_pixels.tobytes())
+
+
+def encode_tga_rle(pixels):
+    """
+    Run-length encode TGA pixel data: runs of equal pixels become repeat packets and the rest raw packets, at most 128
+    pixels each.
+
+    :param pixels: A numpy uint8 array of shape (N, pixel size).
+    :return: The encoded bytes.
+    """
+    # the start of every run of equal pixels
+    is_new = np.ones(len(pixels), dtype=bool)
+    is_new[1:] = np.any(pixels[1:] != pixels[:-1], axis=1)
+    run_starts = np.flatnonzero(is_new)
+    run_ends = np.append(run_starts[1:], len(pixels))
+
+    output = bytearray()
+    raw_start = None
+
+    for run_start, run_end in zip(run_starts, run_ends):
+        if run_end - run_start == 1:
+            if raw_start is None:
+                raw_start = run_start
+
+            if run_end - raw_start < 128:
+                continue
+
+        if raw_start is not None:
+            raw_end = run_end if run_end - run_start == 1 else run_start
+            output.append(raw_end - raw_start - 1)
+            output.extend(pixels[raw_start:raw_end].tobytes())
+            raw_start = None
+
+            if run_end - run_start == 1:
+                continue
+
+        for packet_start in range(run_start, run_end, 128):
+            packet_length = min(128, run_end - packet_start)
+            output.append(0x80 | (packet_length - 1))
+            output.extend(pixels[run_start].tobytes())
+
+    if raw_start is not None:
+        output.append(len(pixels) - raw_start - 1)
+        output.extend(pixels[raw_start:].tobytes())
+
+    return bytes(output)
@@ -2,60 +2,253 @@
 # Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
 # License: MIT, see the LICENSE file.
 
-from pymazing import color, mesh
+import argparse
+import os
+import struct
+
+import numpy as np
+
+from pymazing import chunk, color, mesh
 
 
 # http://en.wikipedia.org/wiki/Truevision_TGA
-def generate_blocks_from_tga(file_name):
+TGA_UNCOMPRESSED = 2
+TGA_RLE = 10
+
+# the native level format: a header followed by the packed colors, the occupancy and the side masks of the blocks, in
+# row order and little-endian
+LEVEL_MAGIC = b"PMZL"
+LEVEL_VERSION = 1
+LEVEL_HEADER = struct.Struct("<4sIII")
+
+FLOOR_COLOR = (80, 80, 80)
+FLOOR_MARGIN = 2.0
+FLOOR_TILE_SIZE = 16
+
+
+def read_tga(file_name):
     """
-    Generate block data from a TGA formatted image file - each pixels corresponds to one block.
+    Read a true-color TGA image file, uncompressed or run-length encoded, with 24 or 32 bits per pixel.
+
+    The rows are returned in the order they are stored in the file, like the levels have always been read. Images
+    without an alpha channel (24 bits per pixel) have their black pixels made transparent.
 
     :param string file_name: A path to the image file.
-    :return: A two dimensional array of colors representing the blocks.
+    :return: A numpy uint8 array of shape (height, width, 4) containing RGBA values.
     """
-    blocks = None
-
     with open(file_name, "rb") as file:
-        file.read(1)  # image ID length
-        file.read(1)  # color map type
+        data = file.read()
+
+    if len(data) < 18:
+        raise Exception("Invalid file format")
+
+    image_id_length = data[0]
+    color_map_type = data[1]
+    image_type = data[2]
+    color_map_length = int.from_bytes(data[5:7], byteorder="little")
+    color_map_depth = data[7]
+    width = int.from_bytes(data[12:14], byteorder="little")
+    height = int.from_bytes(data[14:16], byteorder="little")
+    depth = data[16]
+
+    if image_type not in (TGA_UNCOMPRESSED, TGA_RLE) or width < 1 or height < 1 or depth not in (24, 32):
+        raise Exception("Invalid file format")
+
+    pixel_size = depth // 8
+    pixel_count = width * height
+    offset = 18 + image_id_length
+
+    # true-color images can still carry an unused color map
+    if color_map_type != 0:
+        offset += color_map_length * ((color_map_depth + 7) // 8)
+
+    if image_type == TGA_RLE:
+        pixel_data = decode_tga_rle(data, offset, pixel_count, pixel_size)
+    elif len(data) - offset >= pixel_count * pixel_size:
+        pixel_data = np.frombuffer(data, dtype=np.uint8, count=pixel_count * pixel_size, offset=offset)
+    else:
+        raise Exception("Invalid file format")
+
+    # TGA stores the pixels in BGR(A) order
+    pixel_data = pixel_data.reshape(height, width, pixel_size)
+    pixels = np.empty((height, width, 4), dtype=np.uint8)
+    pixels[:, :, :3] = pixel_data[:, :, 2::-1]
+
+    if pixel_size == 4:
+        pixels[:, :, 3] = pixel_data[:, :, 3]
+    else:
+        pixels[:, :, 3] = np.where(np.any(pixel_data > 0, axis=2), 255, 0)
+
+    return pixels
+
+
+def decode_tga_rle(data, offset, pixel_count, pixel_size):
+    """
+    Decode run-length encoded TGA pixel data: each packet is either one pixel repeated or a number of raw pixels.
+
+    :return: A numpy uint8 array of pixel_count * pixel_size bytes.
+    """
+    output = bytearray(pixel_count * pixel_size)
+    position = offset
+    count = 0
 
-        # image type
-        if file.read(1) != b"\x02":
+    while count < pixel_count:
+        if position >= len(data):
             raise Exception("Invalid file format")
 
-        # color map specification
-        file.read(2)
-        file.read(2)
-        file.read(1)
+        packet_header = data[position]
+        position += 1
+        packet_length = (packet_header & 0x7f) + 1
+        packet_size = packet_length * pixel_size
+        output_position = count * pixel_size
 
-        file.read(2)  # x-origin
-        file.read(2)  # y-origin
+        if count + packet_length > pixel_count:
+            raise Exception("Invalid file format")
 
-        width = int.from_bytes(file.read(2), byteorder="little")
-        height = int.from_bytes(file.read(2), byteorder="little")
-        depth = file.read(1)[0]
+        if (packet_header & 0x80) != 0:
+            packet_data = data[position:position + pixel_size] * packet_length
+            position += pixel_size
+        else:
+            packet_data = data[position:position + packet_size]
+            position += packet_size
 
-        if width < 1 or height < 1 or depth != 32:
+        if len(packet_data) != packet_size:
             raise Exception("Invalid file format")
 
-        file.read(1)  # image descriptor
+        output[output_position:output_position + packet_size] = packet_data
+        count += packet_length
+
+    return np.frombuffer(bytes(output), dtype=np.uint8)
+
+
+def get_pixel_values(pixels):
+    """
+    Pack RGBA pixels to 32 bit integers (in the format 0xAABBGGRR, see Color.get_uint32_value).
+
+    :param pixels: A numpy uint8 array of shape (height, width, 4).
+    :return: A numpy uint32 array of shape (height, width).
+    """
+    channels = pixels.astype(np.uint32)
+
+    return channels[:, :, 0] | channels[:, :, 1] << 8 | channels[:, :, 2] << 16 | channels[:, :, 3] << 24
 
-        blocks = [[None] * width for _ in range(height)]
 
-        for y in range(0, height):
-            for x in range(0, width):
-                pixel_data = file.read(4)
+def is_level_file(file_name):
+    """
+    Check if the file is in the native level format (see open_level) instead of TGA.
+    """
+    with open(file_name, "rb") as file:
+        return file.read(len(LEVEL_MAGIC)) == LEVEL_MAGIC
 
-                if len(pixel_data) != 4:
-                    raise Exception("Invalid file format")
 
-                r = pixel_data[2]
-                g = pixel_data[1]
-                b = pixel_data[0]
-                a = pixel_data[3]
+def open_level(file_name, mode="r"):
+    """
+    Open a level file in the native format. The arrays are memory mapped, so only the parts that are used are read
+    from the disk.
 
-                if a > 0:
-                    blocks[y][x] = color.from_int(r, g, b, a)
+    :param string file_name: A path to the level file.
+    :param string mode: The np.memmap mode, "r" for read-only or "c" for copy-on-write arrays that can be edited in memory.
+    :return: A tuple of occupancy, packed color and side mask arrays, all of shape (height, width).
+    """
+    with open(file_name, "rb") as file:
+        header = file.read(LEVEL_HEADER.size)
+
+    if len(header) < LEVEL_HEADER.size:
+        raise Exception("Invalid file format")
+
+    magic, version, width, height = LEVEL_HEADER.unpack(header)
+
+    if magic != LEVEL_MAGIC or version != LEVEL_VERSION or width < 1 or height < 1:
+        raise Exception("Invalid file format")
+
+    if os.path.getsize(file_name) < LEVEL_HEADER.size + width * height * 6:
+        raise Exception("Invalid file format")
+
+    shape = (height, width)
+    color_values = np.memmap(file_name, dtype="<u4", mode=mode, offset=LEVEL_HEADER.size, shape=shape)
+    occupancy = np.memmap(file_name, dtype=bool, mode=mode, offset=LEVEL_HEADER.size + color_values.nbytes, shape=shape)
+    side_masks = np.memmap(file_name, dtype=np.uint8, mode=mode, offset=LEVEL_HEADER.size + color_values.nbytes + occupancy.nbytes, shape=shape)
+
+    return occupancy, color_values, side_masks
+
+
+def write_level(file_name, color_values):
+    """
+    Write a level file in the native format (see open_level).
+
+    :param color_values: A numpy array of shape (height, width) of packed colors (zero for empty blocks).
+    """
+    height, width = color_values.shape
+    occupancy = color_values != 0
+
+    with open(file_name, "wb") as file:
+        file.write(LEVEL_HEADER.pack(LEVEL_MAGIC, LEVEL_VERSION, width, height))
+        np.ascontiguousarray(color_values, dtype="<u4").tofile(file)
+        occupancy.tofile(file)
+        generate_side_masks_from_occupancy(occupancy).tofile(file)
+
+
+def load_level_arrays(file_name):
+    """
+    Load a level file as arrays instead of a list of colors. Files in the native format are memory mapped.
+
+    :param string file_name: A path to the TGA image file or the native level file.
+    :return: A tuple of a boolean occupancy array and an array of packed colors (zero for empty blocks), both of shape (height, width).
+    """
+    if is_level_file(file_name):
+        occupancy, color_values, _ = open_level(file_name)
+        return occupancy, color_values
+
+    pixels = read_tga(file_name)
+    occupancy = pixels[:, :, 3] > 0
+
+    return occupancy, np.where(occupancy, get_pixel_values(pixels), 0).astype(np.uint32)
+
+
+def generate_blocks_from_tga(file_name, palette=None):
+    """
+    Generate block data from a TGA formatted image file - each pixels corresponds to one block. Files in the native
+    level format are read as well.
+
+    :param string file_name: A path to the image file.
+    :param palette: A color.Palette instance to share one color instance between blocks of the same color, or None.
+    :return: A two dimensional array of colors representing the blocks.
+    """
+    if is_level_file(file_name):
+        return generate_blocks_from_color_values(open_level(file_name)[1], palette)
+
+    return generate_blocks_from_pixels(read_tga(file_name), palette)
+
+
+def generate_blocks_from_pixels(pixels, palette=None):
+    """
+    Generate block data from RGBA pixel data - each pixel with a non-zero alpha is a block.
+
+    :param pixels: A numpy array of shape (height, width, 4).
+    :param palette: A color.Palette instance to share one color instance between blocks of the same color, or None.
+    :return: A two dimensional array of colors representing the blocks.
+    """
+    return generate_blocks_from_color_values(np.where(pixels[:, :, 3] > 0, get_pixel_values(pixels), 0), palette)
+
+
+def generate_blocks_from_color_values(color_values, palette=None):
+    """
+    Generate block data from packed colors (see Color.get_uint32_value) - each non-zero value is a block.
+
+    :param color_values: A numpy array of shape (height, width).
+    :param palette: A color.Palette instance to share one color instance between blocks of the same color, or None.
+    :return: A two dimensional array of colors representing the blocks.
+    """
+    height, width = color_values.shape
+    blocks = [[None] * width for _ in range(height)]
+
+    y, x = np.nonzero(color_values)
+
+    for block_y, block_x, value in zip(y.tolist(), x.tolist(), color_values[y, x].tolist()):
+        if palette is not None:
+            blocks[block_y][block_x] = palette.get_color(value)
+        else:
+            blocks[block_y][block_x] = color.from_uint32_value(value)
 
     return blocks
 
@@ -92,6 +285,147 @@ def generate_full_meshes(blocks):
     return meshes
 
 
+def generate_occupancy(blocks):
+    """
+    Generate a grid telling which blocks exist.
+
+    :param blocks: A two dimensional array of colors.
+    :return: A boolean numpy array of shape (height, width).
+    """
+    return np.array([[color_ is not None for color_ in row] for row in blocks], dtype=bool)
+
+
+def generate_color_values(blocks):
+    """
+    Pack the block colors to comparable integers (see Color.get_uint32_value).
+
+    :param blocks: A two dimensional array of colors.
+    :return: A numpy uint32 array of shape (height, width) (zero for empty blocks, blocks have a non-zero alpha).
+    """
+    height = len(blocks)
+    width = len(blocks[0])
+    values = (0 if color_ is None else color_.get_uint32_value() for row in blocks for color_ in row)
+
+    return np.fromiter(values, dtype=np.uint32, count=width * height).reshape(height, width)
+
+
+def generate_side_masks(blocks):
+    """
+    Find out which sides of each block are not hidden by the neighboring blocks.
+
+    :param blocks: A two dimensional array of colors.
+    :return: A numpy array of shape (height, width) containing mesh side flags (zero for empty blocks).
+    """
+    return generate_side_masks_from_occupancy(generate_occupancy(blocks))
+
+
+def generate_side_masks_from_occupancy(occupancy):
+    """
+    Find out which sides of each block are not hidden by the neighboring blocks by comparing the occupancy grid to
+    itself shifted by one block to each direction. The level edges count as empty.
+
+    :param occupancy: A boolean numpy array of shape (height, width).
+    :return: A numpy array of shape (height, width) containing mesh side flags (zero for empty blocks).
+    """
+    height, width = occupancy.shape
+    padded = np.zeros((height + 2, width + 2), dtype=bool)
+    padded[1:-1, 1:-1] = occupancy
+
+    side_masks = np.full((height, width), mesh.TOP, dtype=np.uint8)
+    side_masks |= np.where(padded[1:-1, :-2], 0, mesh.LEFT).astype(np.uint8)
+    side_masks |= np.where(padded[1:-1, 2:], 0, mesh.RIGHT).astype(np.uint8)
+    side_masks |= np.where(padded[:-2, 1:-1], 0, mesh.FRONT).astype(np.uint8)
+    side_masks |= np.where(padded[2:, 1:-1], 0, mesh.BACK).astype(np.uint8)
+    side_masks[~occupancy] = 0
+
+    return side_masks
+
+
+def create_floor_mesh(width, height):
+    """
+    Create the floor plane under a level of the given size.
+    """
+    mesh_ = mesh.create_partial_cube(color.from_int(*FLOOR_COLOR), mesh.TOP)
+    mesh_.scale = [width / 2.0 + FLOOR_MARGIN, 1.0, height / 2.0 + FLOOR_MARGIN]
+    mesh_.position = [width / 2.0, -1.0, -height / 2.0]
+
+    return mesh_
+
+
+def create_floor_tiles(width, height, center_x, center_y, reach, tile_size=FLOOR_TILE_SIZE):
+    """
+    Create the part of the floor plane (see create_floor_mesh) around a point as square tiles. The fog is applied per
+    triangle, so a fogged floor has to be split to fade out toward the far plane instead of ending at it.
+
+    The tiles are aligned to the floor corner, so they stay in place when the point moves.
+
+    :param float center_x: The point x coordinate (world x).
+    :param float center_y: The point y coordinate (negated world z).
+    :param float reach: The tiles farther away than this are left out.
+    :param int tile_size: The tile width and height in blocks.
+    :return: A CubeInstances instance of the top sides of the tiles.
+    """
+    x0 = max(center_x - reach, -FLOOR_MARGIN)
+    x1 = min(center_x + reach, width + FLOOR_MARGIN)
+    y0 = max(center_y - reach, -FLOOR_MARGIN)
+    y1 = min(center_y + reach, height + FLOOR_MARGIN)
+
+    tile_x0 = np.arange(np.floor((x0 + FLOOR_MARGIN) / tile_size) * tile_size - FLOOR_MARGIN, x1, tile_size)
+    tile_y0 = np.arange(np.floor((y0 + FLOOR_MARGIN) / tile_size) * tile_size - FLOOR_MARGIN, y1, tile_size)
+    tile_x0, tile_y0 = [coordinates.ravel() for coordinates in np.meshgrid(tile_x0, tile_y0)]
+
+    # the tiles on the far edges are cut to the floor
+    tile_x1 = np.minimum(tile_x0 + tile_size, width + FLOOR_MARGIN)
+    tile_y1 = np.minimum(tile_y0 + tile_size, height + FLOOR_MARGIN)
+
+    # the distances to the nearest points of the tiles
+    distance_x = np.maximum(np.maximum(tile_x0 - center_x, center_x - tile_x1), 0.0)
+    distance_y = np.maximum(np.maximum(tile_y0 - center_y, center_y - tile_y1), 0.0)
+    near = distance_x * distance_x + distance_y * distance_y <= reach * reach
+    tile_x0, tile_x1, tile_y0, tile_y1 = tile_x0[near], tile_x1[near], tile_y0[near], tile_y1[near]
+
+    tile_count = len(tile_x0)
+    positions = np.column_stack(((tile_x0 + tile_x1) / 2.0, np.full(tile_count, -1.0), -(tile_y0 + tile_y1) / 2.0))
+    scales = np.column_stack(((tile_x1 - tile_x0) / 2.0, np.ones(tile_count), (tile_y1 - tile_y0) / 2.0))
+    colors = np.tile(color.from_int(*FLOOR_COLOR).get_vector(), (tile_count, 1))
+
+    return mesh.CubeInstances(positions, scales, colors, np.full(tile_count, mesh.TOP, dtype=np.uint8))
+
+
+def create_block_mesh(color_, sides, x, y):
+    """
+    Create the mesh of a single block. Blocks with the same sides share their geometry arrays, so they should be
+    replaced instead of modified.
+
+    :param int sides: Flags describing which sides to generate.
+    :param int x: The block column.
+    :param int y: The block row.
+    """
+    template = partial_cube_templates.get(sides)
+
+    if template is None:
+        template = mesh.create_partial_cube(None, sides)
+        template.colors = np.zeros(len(template.indices), dtype=np.uint32)
+        partial_cube_templates[sides] = template.compact()
+
+    mesh_ = mesh.Mesh()
+    mesh_.vertices = template.vertices
+    mesh_.indices = template.indices
+    mesh_.colors = [color_] * len(template.indices)
+    mesh_.normals = template.normals
+    mesh_.centroids = template.centroids
+    mesh_.triangle_sides = template.triangle_sides
+    mesh_.bounding_radius = template.bounding_radius
+    mesh_.scale = [0.5, 0.5, 0.5]
+    mesh_.position = [1.0 * x + 0.5, 0.5, -1.0 * y - 0.5]
+
+    return mesh_
+
+
+# the shared block geometry of each side combination
+partial_cube_templates = dict()
+
+
 def generate_partial_meshes(blocks):
     """
     Generate mesh data from the block data - but leave out sides that are not visible.
@@ -99,40 +433,112 @@ def generate_partial_meshes(blocks):
     :param blocks: A two dimensional array of colors.
     :return: A list of meshes.
     """
-    meshes = []
     height = len(blocks)
     width = len(blocks[0])
+    side_masks = generate_side_masks(blocks)
+    y, x = np.nonzero(side_masks)
 
     # add the floor plane
-    mesh_ = mesh.create_partial_cube(color.from_int(80, 80, 80), mesh.TOP)
-    mesh_.scale = [width / 2.0 + 2.0, 1.0, height / 2.0 + 2.0]
-    mesh_.position = [width / 2.0, -1.0, -height / 2.0]
-    meshes.append(mesh_)
+    meshes = [create_floor_mesh(width, height)]
+    meshes.extend(create_block_mesh(blocks[block_y][block_x], sides, block_x, block_y) for block_y, block_x, sides in zip(y.tolist(), x.tolist(), side_masks[y, x].tolist()))
 
-    for y in range(height):
-        for x in range(width):
-            color_ = blocks[y][x]
+    return meshes
 
-            if color_ is not None:
-                sides = mesh.TOP
 
-                if x == 0 or (blocks[y][x - 1] is None):
-                    sides |= mesh.LEFT
+def generate_cube_instances(blocks):
+    """
+    Generate cube instances of the blocks with the same sides as generate_partial_meshes (without the floor plane).
 
-                if x == (width - 1) or (blocks[y][x + 1] is None):
-                    sides |= mesh.RIGHT
+    :param blocks: A two dimensional array of colors.
+    :return: A CubeInstances instance.
+    """
+    side_masks = generate_side_masks(blocks)
+    y, x = np.nonzero(side_masks)
 
-                if y == 0 or (blocks[y - 1][x] is None):
-                    sides |= mesh.FRONT
+    positions = np.column_stack((x + 0.5, np.full(len(x), 0.5), -y - 0.5))
+    scales = np.full((len(x), 3), 0.5)
+    colors = color.from_uint32_values(generate_color_values(blocks)[y, x])
 
-                if y == (height - 1) or (blocks[y + 1][x] is None):
-                    sides |= mesh.BACK
+    return mesh.CubeInstances(positions, scales, colors, side_masks[y, x])
 
-                mesh_ = mesh.create_partial_cube(color_, sides)
-                mesh_.scale = [0.5, 0.5, 0.5]
-                mesh_.position[0] = 1.0 * x + 0.5
-                mesh_.position[1] = 0.5
-                mesh_.position[2] = -1.0 * y - 0.5
-                meshes.append(mesh_)
 
-    return meshes
+def generate_mesh_grid(blocks, meshes):
+    """
+    Arrange the block meshes from generate_full_meshes or generate_partial_meshes to the grid positions of the blocks.
+
+    :param blocks: The two dimensional array of colors the meshes were generated from.
+    :param meshes: The generated list of meshes (with the floor plane first).
+    :return: A numpy object array of shape (height, width) containing the meshes (None for empty blocks).
+    """
+    occupancy = generate_occupancy(blocks)
+    mesh_grid = np.empty(occupancy.shape, dtype=object)
+    block_meshes = np.empty(len(meshes) - 1, dtype=object)
+    block_meshes[:] = meshes[1:]
+    mesh_grid[occupancy] = block_meshes
+
+    return mesh_grid
+
+
+def generate_chunks(blocks, chunk_size=16, greedy=False):
+    """
+    Partition the level to square chunks of blocks, each with one merged mesh of the same block sides as
+    generate_partial_meshes would create.
+
+    :param blocks: A two dimensional array of colors.
+    :param int chunk_size: The chunk width and height in blocks.
+    :param bool greedy: Whether to merge coplanar sides of the same color inside each chunk (see greedy_meshing).
+    :return: A numpy object array of shape (chunk rows, chunk columns) containing the chunks (None for empty chunks).
+    """
+    return generate_chunks_from_arrays(generate_side_masks(blocks), generate_color_values(blocks), chunk_size, greedy)
+
+
+def generate_chunks_from_arrays(side_masks, color_values, chunk_size=16, greedy=False):
+    """
+    Partition the level to chunks like generate_chunks, from the side masks and packed colors of the blocks.
+
+    :param side_masks: A numpy array of shape (height, width) containing mesh side flags.
+    :param color_values: A numpy array of shape (height, width) of packed block colors.
+    :return: A numpy object array of shape (chunk rows, chunk columns) containing the chunks (None for empty chunks).
+    """
+    if not greedy:
+        return chunk.build_chunk_grid(side_masks, color_values, chunk_size)
+
+    height, width = side_masks.shape
+    chunk_grid = np.empty(((height + chunk_size - 1) // chunk_size, (width + chunk_size - 1) // chunk_size), dtype=object)
+
+    # the greedy meshing merges the faces chunk by chunk
+    for y in range(chunk_grid.shape[0]):
+        for x in range(chunk_grid.shape[1]):
+            chunk_ = chunk.Chunk(x, y, chunk_size)
+            chunk_.build_mesh(side_masks, color_values, greedy)
+
+            if chunk_.mesh is not None:
+                chunk_grid[y, x] = chunk_
+
+    return chunk_grid
+
+
+def convert_tga_level(tga_file_name, level_file_name):
+    """
+    Convert a TGA level to the native level format.
+    """
+    write_level(level_file_name, load_level_arrays(tga_file_name)[1])
+
+
+def main():
+    """
+    Command line entry point: python -m pymazing.level_loader level.tga [...] - converts TGA levels to the native
+    level format (level.lvl next to level.tga).
+    """
+    parser = argparse.ArgumentParser(description="TGA to native level format converter")
+    parser.add_argument("files", nargs="+", help="TGA level files")
+    args = parser.parse_args()
+
+    for tga_file_name in args.files:
+        level_file_name = os.path.splitext(tga_file_name)[0] + ".lvl"
+        convert_tga_level(tga_file_name, level_file_name)
+        print("{0} -> {1}".format(tga_file_name, level_file_name))
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,9 @@ from pymazing import color, matrix
 
 
 class Mesh:
+    __slots__ = ("vertices", "colors", "indices", "scale", "rotation", "position", "world_matrix", "normal_matrix", "normal_matrix_key",
+                 "bounding_radius", "normals", "centroids", "triangle_sides")
+
     def __init__(self):
         self.vertices = []
         self.colors = []
@@ -18,22 +21,57 @@ class Mesh:
         self.rotation = [0.0, 0.0, 0.0]
         self.position = [0.0, 0.0, 0.0]
         self.world_matrix = np.identity(4)
+        self.normal_matrix = None
+        self.normal_matrix_key = None
         self.bounding_radius = 1.0
 
+        # object space triangle data, see calculate_triangle_data
+        self.normals = None
+        self.centroids = None
+
+        # the cube side flag of each triangle, set only for cube meshes (the sides are axis-aligned without rotation)
+        self.triangle_sides = None
+
     def calculate_bounding_radius(self):
         """
         Calculate a minimum radius for a mesh bounding sphere.
         """
-        max_distance_squared = 0.0
+        if len(self.vertices) == 0:
+            self.bounding_radius = 0.0
+            return
+
+        scaled_vertices = np.asarray(self.vertices)[:, :3] * self.scale
+        self.bounding_radius = sqrt(np.max(np.sum(scaled_vertices * scaled_vertices, axis=1)))
+
+    def compact(self):
+        """
+        Convert the mesh data in place to a compact form: float32 vertices, an int32 (M, 3) index array, packed uint32
+        colors (see Color.get_uint32_value) and float32 triangle data. Renders the same as long as the colors have 8 bit
+        channels and the coordinates fit float32 exactly.
+
+        :return: The mesh itself.
+        """
+        if self.normals is None:
+            self.calculate_triangle_data()
+
+        # arrays that already are in the compact form are kept as they are, they may be shared between meshes
+        self.vertices = np.asarray(self.vertices, dtype=np.float32)
+        self.indices = np.asarray(self.indices, dtype=np.int32)
 
-        for vertex in self.vertices:
-            x = vertex[0] * self.scale[0]
-            y = vertex[1] * self.scale[1]
-            z = vertex[2] * self.scale[2]
+        if self.indices.ndim != 2:
+            self.vertices = self.vertices.reshape(-1, 4)
+            self.indices = self.indices.reshape(-1, 3)
 
-            max_distance_squared = max(max_distance_squared, x * x + y * y + z * z)
+        self.normals = np.asarray(self.normals, dtype=np.float32)
+        self.centroids = np.asarray(self.centroids, dtype=np.float32)
 
-        self.bounding_radius = sqrt(max_distance_squared)
+        if not isinstance(self.colors, np.ndarray):
+            self.colors = np.array([color_.get_uint32_value() for color_ in self.colors[:len(self.indices)]], dtype=np.uint32)
+
+        if self.triangle_sides is not None:
+            self.triangle_sides = np.asarray(self.triangle_sides, dtype=np.uint8)
+
+        return self
 
     def calculate_world_matrix(self):
         """
@@ -47,6 +85,53 @@ class Mesh:
 
         self.world_matrix = translation_matrix.dot(rotation_z_matrix).dot(rotation_y_matrix).dot(rotation_x_matrix).dot(scale_matrix)
 
+    def calculate_normal_matrix(self):
+        """
+        Update the matrix that transforms normals to world space (the inverse transpose of the world matrix without the
+        translation) - only when the scale or rotation has changed. Calculate the world matrix first.
+
+        The matrix is None when the mesh is not scaled or rotated and the normals can be used as they are.
+        """
+        key = (tuple(self.scale), tuple(self.rotation))
+
+        if key == self.normal_matrix_key:
+            return
+
+        if key == ((1.0, 1.0, 1.0), (0.0, 0.0, 0.0)):
+            self.normal_matrix = None
+        else:
+            self.normal_matrix = np.linalg.inv(self.world_matrix[:3, :3]).T
+
+        self.normal_matrix_key = key
+
+    def calculate_triangle_data(self):
+        """
+        Calculate the object space unit normal and the centroid of every triangle. Needs to be called again if the
+        vertices or indices change.
+        """
+        vertices = np.asarray(self.vertices, dtype=float).reshape(-1, 4)[:, :3]
+        triangles = vertices[np.asarray(self.indices, dtype=int).reshape(-1, 3)]
+
+        normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+        self.normals = normals / np.linalg.norm(normals, axis=1)[:, np.newaxis]
+        self.centroids = np.mean(triangles, axis=1)
+
+    def get_world_normals(self):
+        """
+        Transform the triangle normals to world space with the normal matrix.
+
+        :return: A numpy array of shape (triangle count, 3) of unit normals.
+        """
+        if self.normals is None:
+            self.calculate_triangle_data()
+
+        if self.normal_matrix is None:
+            return self.normals
+
+        normals = self.normals.dot(self.normal_matrix.T)
+
+        return normals / np.linalg.norm(normals, axis=1)[:, np.newaxis]
+
 
 def create_cube(color):
     """
@@ -77,6 +162,8 @@ def create_cube(color):
                     [3, 2, 1],
                     [3, 1, 0]]
 
+    mesh.triangle_sides = [side for side, triangles in SIDE_TRIANGLES for _ in triangles]
+    mesh.calculate_triangle_data()
     mesh.calculate_bounding_radius()
 
     return mesh
@@ -90,6 +177,15 @@ FRONT = 16
 BACK = 32
 
 
+# the triangles of each side in the vertex order of create_cube
+SIDE_TRIANGLES = [(FRONT, [[0, 1, 5], [0, 5, 4]]),
+                  (RIGHT, [[1, 2, 6], [1, 6, 5]]),
+                  (BACK, [[2, 3, 7], [2, 7, 6]]),
+                  (LEFT, [[7, 3, 0], [7, 0, 4]]),
+                  (TOP, [[4, 5, 6], [4, 6, 7]]),
+                  (BOTTOM, [[3, 2, 1], [3, 1, 0]])]
+
+
 def create_partial_cube(color, sides):
     """
     Create an unit cube of given color, given sides, and centered at the origin.
@@ -98,32 +194,35 @@ def create_partial_cube(color, sides):
     """
     mesh = create_cube(color)
     mesh.indices = []
+    mesh.triangle_sides = []
 
-    if (sides & FRONT) != 0:
-        mesh.indices.append([0, 1, 5])
-        mesh.indices.append([0, 5, 4])
+    for side, triangles in SIDE_TRIANGLES:
+        if (sides & side) != 0:
+            mesh.indices.extend([list(triangle) for triangle in triangles])
+            mesh.triangle_sides.extend([side] * len(triangles))
 
-    if (sides & RIGHT) != 0:
-        mesh.indices.append([1, 2, 6])
-        mesh.indices.append([1, 6, 5])
+    mesh.calculate_triangle_data()
 
-    if (sides & BACK) != 0:
-        mesh.indices.append([2, 3, 7])
-        mesh.indices.append([2, 7, 6])
+    return mesh
 
-    if (sides & LEFT) != 0:
-        mesh.indices.append([7, 3, 0])
-        mesh.indices.append([7, 0, 4])
 
-    if (sides & TOP) != 0:
-        mesh.indices.append([4, 5, 6])
-        mesh.indices.append([4, 6, 7])
+class CubeInstances:
+    def __init__(self, positions, scales, colors, side_masks):
+        """
+        Copies of the shared cube template (CUBE_TEMPLATE) stored as contiguous arrays instead of separate meshes.
 
-    if (sides & BOTTOM) != 0:
-        mesh.indices.append([3, 2, 1])
-        mesh.indices.append([3, 1, 0])
+        :param positions: A numpy array of shape (N, 3) of cube centers.
+        :param scales: A numpy array of shape (N, 3) of cube half sizes.
+        :param colors: A numpy array of shape (N, 4) of RGBA colors.
+        :param side_masks: A numpy array of N side flags telling which sides each cube has.
+        """
+        self.positions = positions
+        self.scales = scales
+        self.colors = colors
+        self.side_masks = side_masks
 
-    return mesh
+    def __len__(self):
+        return len(self.positions)
 
 
 def create_multicolor_cube():
@@ -144,3 +243,6 @@ def create_multicolor_cube():
 
     return mesh
 
+
+# the geometry shared by all cube instances
+CUBE_TEMPLATE = create_cube(None)
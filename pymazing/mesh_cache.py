@@ -0,0 +1,214 @@
+"""An on-disk cache of generated level chunk geometry, loaded with memory mapping."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import hashlib
+import os
+import shutil
+
+import numpy as np
+
+from pymazing import chunk, level_loader, mesh, parallel_meshing
+
+# increase when the generated geometry changes, so that the old cache entries are regenerated
+MESH_CACHE_VERSION = 3
+HASH_BLOCK_SIZE = 1024 * 1024
+
+MESH_FIELDS = ("vertices", "indices", "colors", "normals", "centroids")
+CHUNK_FIELDS = ("grid_shape", "chunk_coordinates", "vertex_offsets", "triangle_offsets", "positions", "bounding_radii", "min_corners", "max_corners")
+LEVEL_FIELDS = ("occupancy", "color_values", "side_masks")
+
+
+def get_cache_key(file_name, chunk_size, greedy):
+    """
+    Hash the level file together with the generator version and options. Native level files are identified by their
+    header, size and modification time, so that a large level is not read just to find its cache entry. The contents
+    of other files (TGA images) are hashed a block at a time.
+    """
+    options = "{0} {1} {2}".format(MESH_CACHE_VERSION, chunk_size, int(greedy))
+    hash_ = hashlib.sha1(options.encode("ascii"))
+
+    with open(file_name, "rb") as file:
+        if level_loader.is_level_file(file_name):
+            file_status = os.fstat(file.fileno())
+            hash_.update(file.read(level_loader.LEVEL_HEADER.size))
+            hash_.update(" {0} {1}".format(file_status.st_size, file_status.st_mtime_ns).encode("ascii"))
+        else:
+            for data in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+                hash_.update(data)
+
+    return hash_.hexdigest()
+
+
+def pack_chunks(chunk_grid):
+    """
+    Concatenate the chunk meshes to flat arrays - the geometry of chunk i is between the offsets i and i + 1.
+
+    :param chunk_grid: A numpy object array of chunks (see level_loader.generate_chunks).
+    :return: A dictionary of numpy arrays.
+    """
+    chunks = [chunk_ for chunk_ in chunk_grid.flat if chunk_ is not None]
+    meshes = [chunk_.mesh.compact() for chunk_ in chunks]
+
+    arrays = dict()
+    arrays["vertices"] = np.concatenate([mesh_.vertices for mesh_ in meshes] + [np.zeros((0, 4), dtype=np.float32)])
+    arrays["indices"] = np.concatenate([mesh_.indices for mesh_ in meshes] + [np.zeros((0, 3), dtype=np.int32)])
+    arrays["colors"] = np.concatenate([mesh_.colors for mesh_ in meshes] + [np.zeros(0, dtype=np.uint32)])
+    arrays["normals"] = np.concatenate([mesh_.normals for mesh_ in meshes] + [np.zeros((0, 3), dtype=np.float32)])
+    arrays["centroids"] = np.concatenate([mesh_.centroids for mesh_ in meshes] + [np.zeros((0, 3), dtype=np.float32)])
+
+    arrays["grid_shape"] = np.array(chunk_grid.shape + (chunks[0].size if chunks else 0,), dtype=np.int64)
+    arrays["chunk_coordinates"] = np.array([(chunk_.x, chunk_.y) for chunk_ in chunks], dtype=np.int32).reshape(-1, 2)
+    arrays["vertex_offsets"] = np.cumsum([0] + [len(mesh_.vertices) for mesh_ in meshes]).astype(np.int64)
+    arrays["triangle_offsets"] = np.cumsum([0] + [len(mesh_.indices) for mesh_ in meshes]).astype(np.int64)
+    arrays["positions"] = np.array([mesh_.position for mesh_ in meshes], dtype=float).reshape(-1, 3)
+    arrays["bounding_radii"] = np.array([mesh_.bounding_radius for mesh_ in meshes], dtype=float)
+    arrays["min_corners"] = np.array([chunk_.min_corner for chunk_ in chunks], dtype=float).reshape(-1, 3)
+    arrays["max_corners"] = np.array([chunk_.max_corner for chunk_ in chunks], dtype=float).reshape(-1, 3)
+
+    return arrays
+
+
+def unpack_chunks(arrays):
+    """
+    Rebuild the chunk grid from the arrays of pack_chunks. The chunk meshes use views of the arrays, so memory mapped
+    arrays are read from the disk only when the meshes are rendered.
+
+    :param arrays: A dictionary of numpy arrays.
+    :return: A numpy object array of shape (chunk rows, chunk columns) containing the chunks (None for empty chunks).
+    """
+    rows, columns, chunk_size = [int(value) for value in arrays["grid_shape"]]
+    chunk_grid = np.empty((rows, columns), dtype=object)
+    vertex_offsets = arrays["vertex_offsets"]
+    triangle_offsets = arrays["triangle_offsets"]
+
+    for i, (x, y) in enumerate(arrays["chunk_coordinates"].tolist()):
+        vertex_start, vertex_end = int(vertex_offsets[i]), int(vertex_offsets[i + 1])
+        triangle_start, triangle_end = int(triangle_offsets[i]), int(triangle_offsets[i + 1])
+
+        mesh_ = mesh.Mesh()
+        mesh_.vertices = arrays["vertices"][vertex_start:vertex_end]
+        mesh_.indices = arrays["indices"][triangle_start:triangle_end]
+        mesh_.colors = arrays["colors"][triangle_start:triangle_end]
+        mesh_.normals = arrays["normals"][triangle_start:triangle_end]
+        mesh_.centroids = arrays["centroids"][triangle_start:triangle_end]
+        mesh_.position = arrays["positions"][i].tolist()
+        mesh_.bounding_radius = float(arrays["bounding_radii"][i])
+
+        chunk_ = chunk.Chunk(x, y, chunk_size)
+        chunk_.mesh = mesh_
+        chunk_.min_corner = np.array(arrays["min_corners"][i])
+        chunk_.max_corner = np.array(arrays["max_corners"][i])
+        chunk_.triangle_count = triangle_end - triangle_start
+        chunk_grid[y, x] = chunk_
+
+    return chunk_grid
+
+
+def save_cache_entry(directory, arrays):
+    """
+    Write the arrays to uncompressed .npy files (which can be memory mapped) in the given directory. The files are
+    written to a temporary directory first, so an interrupted write does not leave a partial entry behind.
+    """
+    temporary_directory = directory + ".tmp"
+
+    if os.path.exists(temporary_directory):
+        shutil.rmtree(temporary_directory)
+
+    os.makedirs(temporary_directory)
+
+    for name, array in arrays.items():
+        np.save(os.path.join(temporary_directory, name + ".npy"), array)
+
+    # an incomplete entry is replaced
+    if os.path.exists(directory):
+        shutil.rmtree(directory)
+
+    os.rename(temporary_directory, directory)
+
+
+def load_cache_entry(directory, names):
+    """
+    Memory map the arrays of a cache entry. The arrays are copy-on-write: they can be modified in memory (for
+    editing the level), but the cache files are not changed.
+
+    :return: A dictionary of numpy arrays or None if the entry is missing or incomplete.
+    """
+    file_names = [os.path.join(directory, name + ".npy") for name in names]
+
+    if not all(os.path.exists(file_name) for file_name in file_names):
+        return None
+
+    return {name: np.load(file_name, mmap_mode="c") for name, file_name in zip(names, file_names)}
+
+
+def evict_stale_entries(cache_directory, cache_key):
+    """
+    Remove all cache entries except the one with the given key. The temporary directories are left alone, they may
+    belong to another process writing its entry at the same time.
+    """
+    for entry in os.listdir(cache_directory):
+        if entry != cache_key and not entry.endswith(".tmp"):
+            shutil.rmtree(os.path.join(cache_directory, entry), ignore_errors=True)
+
+
+def load_or_generate_chunks(file_name, chunk_size=16, greedy=False, process_count=1):
+    """
+    Load the chunk geometry and visibility data cached next to the level file (in <file_name>.mesh/<cache key>/) or
+    generate and cache them if they are missing or stale. Native level files already contain the visibility data, so
+    only the geometry is cached for them and the level arrays are memory mapped from the level file (copy-on-write).
+
+    :param string file_name: The path of the level file.
+    :param int chunk_size: The chunk width and height in blocks.
+    :param bool greedy: Whether to merge coplanar sides of the same color inside each chunk (see greedy_meshing).
+    :param int process_count: The number of processes to generate the chunks with (see parallel_meshing).
+    :return: A tuple of the chunk grid (see level_loader.generate_chunks), the occupancy, the packed colors and the side
+    masks of the level.
+    """
+    cache_key = get_cache_key(file_name, chunk_size, greedy)
+    cache_directory = file_name + ".mesh"
+    entry_directory = os.path.join(cache_directory, cache_key)
+    level_arrays = None
+    names = MESH_FIELDS + CHUNK_FIELDS + LEVEL_FIELDS
+
+    if level_loader.is_level_file(file_name):
+        level_arrays = level_loader.open_level(file_name, "c")
+        names = MESH_FIELDS + CHUNK_FIELDS
+
+    arrays = load_cache_entry(entry_directory, names)
+
+    if arrays is None:
+        if level_arrays is not None:
+            occupancy, color_values, side_masks = level_arrays
+        else:
+            occupancy, color_values = level_loader.load_level_arrays(file_name)
+            side_masks = None
+
+        if process_count > 1:
+            chunk_grid, side_masks = parallel_meshing.generate_chunks_parallel(occupancy, color_values, chunk_size, greedy, process_count)
+        else:
+            if side_masks is None:
+                side_masks = level_loader.generate_side_masks_from_occupancy(occupancy)
+
+            chunk_grid = level_loader.generate_chunks_from_arrays(side_masks, color_values, chunk_size, greedy)
+
+        arrays = pack_chunks(chunk_grid)
+
+        if level_arrays is None:
+            arrays["occupancy"] = occupancy
+            arrays["color_values"] = color_values
+            arrays["side_masks"] = side_masks
+
+        # the cache is optional, the level is used from memory if it cannot be written (e.g. a read-only directory)
+        try:
+            os.makedirs(cache_directory, exist_ok=True)
+            evict_stale_entries(cache_directory, cache_key)
+            save_cache_entry(entry_directory, arrays)
+            arrays = load_cache_entry(entry_directory, names) or arrays
+        except OSError:
+            shutil.rmtree(entry_directory + ".tmp", ignore_errors=True)
+
+    if level_arrays is not None:
+        return (unpack_chunks(arrays),) + level_arrays
+
+    return unpack_chunks(arrays), np.array(arrays["occupancy"]), arrays["color_values"], np.array(arrays["side_masks"])
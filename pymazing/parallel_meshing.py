@@ -0,0 +1,99 @@
+"""Meshing the chunks of large levels in bands of rows in parallel worker processes."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import concurrent.futures
+import os
+
+import numpy as np
+
+from pymazing import level_loader, mesh_cache
+
+
+def get_bands(height, chunk_size, band_count):
+    """
+    Split the block rows to bands of whole chunk rows, as evenly as possible.
+
+    :return: A list of (first row, end row) tuples - the end rows are exclusive.
+    """
+    chunk_rows = (height + chunk_size - 1) // chunk_size
+    band_count = max(min(band_count, chunk_rows), 1)
+    chunk_row_ends = [(chunk_rows * (i + 1)) // band_count for i in range(band_count)]
+    bands = []
+    y0 = 0
+
+    for chunk_row_end in chunk_row_ends:
+        y1 = min(chunk_row_end * chunk_size, height)
+
+        if y1 > y0:
+            bands.append((y0, y1))
+
+        y0 = y1
+
+    return bands
+
+
+def mesh_band(occupancy, color_values, top_overlap, chunk_size, greedy, y0, grid_shape):
+    """
+    Mesh the chunks of one band (run in a worker process).
+
+    :param occupancy: The occupancy of the band rows with one extra row above (if top_overlap) and below (if not at
+    the bottom edge) for the neighbor checks.
+    :param color_values: The packed colors of the band rows.
+    :param int top_overlap: 1 if the occupancy starts one row above the band, otherwise 0.
+    :param int y0: The first block row of the band in the level.
+    :param grid_shape: The shape of the chunk grid of the whole level.
+    :return: A tuple of the side masks of the band rows and the band chunks packed with mesh_cache.pack_chunks, in
+    level coordinates.
+    """
+    height = len(color_values)
+    side_masks = level_loader.generate_side_masks_from_occupancy(occupancy)[top_overlap:top_overlap + height]
+    chunk_grid = level_loader.generate_chunks_from_arrays(side_masks, color_values, chunk_size, greedy)
+    arrays = mesh_cache.pack_chunks(chunk_grid)
+
+    # move the chunks from the band to their place in the level
+    arrays["grid_shape"][:2] = grid_shape
+    arrays["chunk_coordinates"][:, 1] += y0 // chunk_size
+    arrays["positions"][:, 2] -= y0
+    arrays["min_corners"][:, 2] -= y0
+    arrays["max_corners"][:, 2] -= y0
+
+    return side_masks, arrays
+
+
+def generate_chunks_parallel(occupancy, color_values, chunk_size=16, greedy=False, process_count=None):
+    """
+    Mesh the chunks of a level like level_loader.generate_chunks_from_arrays, but split to bands of chunk rows that are
+    meshed in separate processes. The bands overlap by one block row for the neighbor checks of the side masks, but
+    every block belongs to exactly one band, so no side is generated twice.
+
+    :param occupancy: A boolean numpy array of shape (height, width).
+    :param color_values: A numpy array of shape (height, width) of packed block colors.
+    :param int chunk_size: The chunk width and height in blocks.
+    :param bool greedy: Whether to merge coplanar sides of the same color inside each chunk (see greedy_meshing).
+    :param int process_count: The number of worker processes (None for the CPU count).
+    :return: A tuple of the chunk grid and the side masks of the level.
+    """
+    height, width = occupancy.shape
+    process_count = process_count or os.cpu_count() or 1
+    grid_shape = ((height + chunk_size - 1) // chunk_size, (width + chunk_size - 1) // chunk_size)
+    chunk_grid = np.empty(grid_shape, dtype=object)
+    side_masks = np.zeros((height, width), dtype=np.uint8)
+
+    with concurrent.futures.ProcessPoolExecutor(process_count) as executor:
+        futures = []
+
+        for y0, y1 in get_bands(height, chunk_size, process_count):
+            top_overlap = 1 if y0 > 0 else 0
+            band_occupancy = np.array(occupancy[y0 - top_overlap:y1 + 1])
+            futures.append((y0, y1, executor.submit(mesh_band, band_occupancy, np.array(color_values[y0:y1]), top_overlap, chunk_size, greedy, y0, grid_shape)))
+
+        for y0, y1, future in futures:
+            band_side_masks, arrays = future.result()
+            band_chunk_grid = mesh_cache.unpack_chunks(arrays)
+            chunk_rows = slice(y0 // chunk_size, (y1 + chunk_size - 1) // chunk_size)
+
+            side_masks[y0:y1] = band_side_masks
+            chunk_grid[chunk_rows] = band_chunk_grid[chunk_rows]
+
+    return chunk_grid, side_masks
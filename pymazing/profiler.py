@@ -0,0 +1,144 @@
+"""On-demand cProfile capture of a fixed number of frames."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import collections
+import cProfile
+import os
+import pstats
+import time
+
+MAX_STACK_DEPTH = 64
+MIN_STACK_TIME = 1e-6
+
+
+class FrameProfiler:
+    def __init__(self, output_directory):
+        """
+        :param string output_directory: Where the profiling results are written to.
+        """
+        self.output_directory = output_directory
+        self.profile = None
+        self.frames_left = 0
+        self.name = ""
+
+    def start(self, frame_count, name):
+        """
+        Start profiling the next frames (does nothing if a capture is already running).
+
+        :param int frame_count: How many frames to profile.
+        :param string name: A name (e.g. the level name) used as the output file name prefix.
+        """
+        if self.profile is not None:
+            return
+
+        self.frames_left = frame_count
+        self.name = name
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def tick(self):
+        """
+        Record a single profiled frame and stop the capture after the last one.
+
+        This should only be called when a capture is running, so that there is no cost when profiling is not active.
+        """
+        self.frames_left -= 1
+
+        if self.frames_left <= 0:
+            self.stop()
+
+    def stop(self):
+        """
+        Stop the capture and write a pstats file and a collapsed stack file.
+
+        :return: The output file path without the extension.
+        """
+        self.profile.disable()
+
+        os.makedirs(self.output_directory, exist_ok=True)
+        file_name = os.path.join(self.output_directory, self.name + "-" + time.strftime("%Y%m%d-%H%M%S"))
+
+        self.profile.dump_stats(file_name + ".pstats")
+        write_collapsed_stacks(pstats.Stats(self.profile), file_name + ".folded")
+
+        self.profile = None
+
+        return file_name
+
+
+def get_function_label(function):
+    """
+    Convert a pstats function key to a readable name that does not contain stack separators.
+    """
+    file_name, line_number, function_name = function
+
+    if file_name == "~":
+        label = function_name
+    else:
+        label = "{0} ({1}:{2})".format(function_name, os.path.basename(file_name), line_number)
+
+    return label.replace(";", ",")
+
+
+def generate_collapsed_stacks(stats):
+    """
+    Reconstruct call stacks from the caller/callee data of the pstats statistics.
+
+    The profiler only records single caller-callee edges, so the time of a function called from several places is
+    divided between its callers in proportion to the time spent through each edge.
+
+    :param stats: A pstats.Stats instance.
+    :return: A dictionary of semicolon separated stacks mapped to their self time in seconds.
+    """
+    callees = collections.defaultdict(dict)
+    roots = []
+
+    for function, (_, _, _, _, callers) in stats.stats.items():
+        for caller, (_, _, edge_self_time, edge_cumulative_time) in callers.items():
+            callees[caller][function] = (edge_self_time, edge_cumulative_time)
+
+        if not any(caller in stats.stats for caller in callers):
+            roots.append(function)
+
+    stacks = collections.defaultdict(float)
+
+    def walk(function, stack, cumulative_time, self_time):
+        stack = stack + [function]
+        stacks[";".join(get_function_label(f) for f in stack)] += self_time
+        total_cumulative_time = stats.stats[function][3]
+
+        if len(stack) >= MAX_STACK_DEPTH or total_cumulative_time <= 0.0:
+            return
+
+        fraction = min(cumulative_time / total_cumulative_time, 1.0)
+
+        for callee, (edge_self_time, edge_cumulative_time) in callees[function].items():
+            # recursive calls are already included in the cumulative time of the outer call
+            if callee in stack or edge_cumulative_time * fraction < MIN_STACK_TIME:
+                continue
+
+            walk(callee, stack, edge_cumulative_time * fraction, edge_self_time * fraction)
+
+    for root in roots:
+        _, _, root_self_time, root_cumulative_time, _ = stats.stats[root]
+        walk(root, [], root_cumulative_time, root_self_time)
+
+    return stacks
+
+
+def write_collapsed_stacks(stats, file_name):
+    """
+    Write the statistics in the collapsed stack format ("a;b;c microseconds" per line) used by flamegraph tools.
+
+    :param stats: A pstats.Stats instance.
+    :param string file_name: The output file path.
+    """
+    stacks = generate_collapsed_stacks(stats)
+
+    with open(file_name, "w") as file:
+        for stack, self_time in sorted(stacks.items()):
+            microseconds = int(self_time * 1000000.0 + 0.5)
+
+            if microseconds > 0:
+                file.write("{0} {1}\n".format(stack, microseconds))
@@ -0,0 +1,220 @@
+"""Precomputed potentially visible sets (PVS) of block clusters for each empty cell of a level."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+from math import *
+import hashlib
+import os
+
+import numpy as np
+
+from pymazing import visibility
+
+PVS_VERSION = 1
+DEFAULT_SAMPLE_COUNT = 3
+DEFAULT_RAY_COUNT = 256
+CELL_BATCH_SIZE = 64
+DEFAULT_MAX_MEMORY = 256 * 1024 * 1024
+
+
+class PotentiallyVisibleSets:
+    def __init__(self, shape, cluster_size, cell_indices, bitsets):
+        """
+        :param shape: The level grid shape (height, width).
+        :param int cluster_size: Blocks are grouped into square clusters of this size (1 means single blocks).
+        :param cell_indices: A numpy array of the level shape mapping empty cells to bitset rows (-1 for blocks).
+        :param bitsets: A numpy array of packed bits, one row per empty cell and one bit per cluster.
+        """
+        self.shape = tuple(shape)
+        self.cluster_size = cluster_size
+        self.cell_indices = cell_indices
+        self.bitsets = bitsets
+
+        height, width = self.shape
+        self.cluster_columns = (width + cluster_size - 1) // cluster_size
+        self.cluster_count = self.cluster_columns * ((height + cluster_size - 1) // cluster_size)
+
+    def get_block_clusters(self, x, y):
+        """
+        Get the cluster indices of blocks (the bit positions in the bitsets).
+        """
+        return (y // self.cluster_size) * self.cluster_columns + (x // self.cluster_size)
+
+    def find_visible_clusters(self, camera, max_distance=float("inf")):
+        """
+        Get the clusters that may be visible from the cell the camera is in and are not farther away than the given
+        distance in the horizontal plane.
+
+        :param float max_distance: Clusters farther away are left out (e.g. the far plane of the camera).
+        :return: A tuple of cluster column and row arrays or None if the camera is not in an empty cell of the level.
+        """
+        height, width = self.shape
+        x = int(floor(camera.position[0]))
+        y = int(floor(-camera.position[2]))
+
+        if not (0 <= x < width and 0 <= y < height) or self.cell_indices[y, x] < 0:
+            return None
+
+        cluster_indices = np.flatnonzero(np.unpackbits(self.bitsets[self.cell_indices[y, x]])[:self.cluster_count])
+        cluster_y, cluster_x = np.divmod(cluster_indices, self.cluster_columns)
+
+        # the distance from the camera to the nearest point of each cluster
+        distance_x = np.maximum(np.maximum(cluster_x * self.cluster_size - camera.position[0], camera.position[0] - (cluster_x + 1) * self.cluster_size), 0.0)
+        distance_y = np.maximum(np.maximum(cluster_y * self.cluster_size + camera.position[2], -camera.position[2] - (cluster_y + 1) * self.cluster_size), 0.0)
+        near = distance_x * distance_x + distance_y * distance_y <= max_distance * max_distance
+
+        return cluster_x[near], cluster_y[near]
+
+    def find_visible_blocks(self, camera, max_distance=float("inf")):
+        """
+        Get the grid cells of the clusters that may be visible from the cell the camera is in (see
+        find_visible_clusters). The cells can be empty.
+
+        :return: A tuple of block column and row arrays or None if the camera is not in an empty cell of the level.
+        """
+        visible_clusters = self.find_visible_clusters(camera, max_distance)
+
+        if visible_clusters is None:
+            return None
+
+        height, width = self.shape
+        offset_y, offset_x = [offsets.ravel() for offsets in np.indices((self.cluster_size, self.cluster_size))]
+        x = (visible_clusters[0][:, np.newaxis] * self.cluster_size + offset_x).ravel()
+        y = (visible_clusters[1][:, np.newaxis] * self.cluster_size + offset_y).ravel()
+        inside = (x < width) & (y < height)
+
+        return x[inside], y[inside]
+
+
+def get_sample_offsets(sample_count):
+    """
+    Evenly spaced sample positions inside a unit cell.
+
+    :return: A numpy array of shape (sample_count * sample_count, 2).
+    """
+    offsets = (np.arange(sample_count) + 0.5) / sample_count
+    x, y = np.meshgrid(offsets, offsets)
+
+    return np.column_stack((x.ravel(), y.ravel()))
+
+
+def get_bitset_memory_size(occupancy, cluster_size):
+    """
+    Count the bytes of the PVS bitsets of a level: one row per empty cell and one bit per cluster.
+    """
+    height, width = occupancy.shape
+    cluster_count = ((width + cluster_size - 1) // cluster_size) * ((height + cluster_size - 1) // cluster_size)
+
+    return int(np.count_nonzero(~occupancy)) * ((cluster_count + 7) // 8)
+
+
+def choose_cluster_size(occupancy, max_memory=DEFAULT_MAX_MEMORY):
+    """
+    Find the smallest power of two cluster size whose bitsets fit in the memory limit. The bitset size grows with the
+    square of the level area for single block clusters, so large levels need large clusters.
+    """
+    cluster_size = 1
+
+    while get_bitset_memory_size(occupancy, cluster_size) > max_memory and cluster_size < max(occupancy.shape):
+        cluster_size *= 2
+
+    return cluster_size
+
+
+def generate_pvs(occupancy, cluster_size=1, sample_count=DEFAULT_SAMPLE_COUNT, ray_count=DEFAULT_RAY_COUNT, max_memory=DEFAULT_MAX_MEMORY):
+    """
+    Find for every empty cell the block clusters that can be seen from it, by casting rays to all directions from
+    several points inside the cell.
+
+    The result is sampled, so a block seen only through a very narrow gap can be missed.
+
+    :param occupancy: A boolean numpy array of shape (height, width).
+    :param int cluster_size: Blocks are grouped into square clusters of this size (0 chooses it from the memory limit).
+    :param int sample_count: The number of sample points per cell along each axis.
+    :param int ray_count: The number of rays cast from each sample point.
+    :param int max_memory: The number of bytes the bitsets may take, checked before anything is allocated.
+    :return: A PotentiallyVisibleSets instance.
+    """
+    height, width = occupancy.shape
+
+    if cluster_size == 0:
+        cluster_size = choose_cluster_size(occupancy, max_memory)
+
+    memory_size = get_bitset_memory_size(occupancy, cluster_size)
+
+    if memory_size > max_memory:
+        raise Exception("The PVS of a {0}x{1} level with a cluster size of {2} would take {3:.1f} MiB (the limit is {4:.1f} MiB), use a cluster size of at least {5}".format(width, height, cluster_size, memory_size / 1048576.0, max_memory / 1048576.0, choose_cluster_size(occupancy, max_memory)))
+
+    empty_cells = np.argwhere(~occupancy)
+    cell_indices = np.full(occupancy.shape, -1, dtype=np.int32)
+    cell_indices[empty_cells[:, 0], empty_cells[:, 1]] = np.arange(len(empty_cells))
+
+    pvs = PotentiallyVisibleSets(occupancy.shape, cluster_size, cell_indices, None)
+    bitsets = np.zeros((len(empty_cells), (pvs.cluster_count + 7) // 8), dtype=np.uint8)
+
+    angles = (np.arange(ray_count) + 0.5) * (2.0 * pi / ray_count)
+    ray_directions = np.column_stack((np.sin(angles), np.cos(angles)))
+    sample_offsets = get_sample_offsets(sample_count)
+    rays_per_cell = len(sample_offsets) * ray_count
+
+    for batch_start in range(0, len(empty_cells), CELL_BATCH_SIZE):
+        cells = empty_cells[batch_start:batch_start + CELL_BATCH_SIZE]
+
+        # every sample point of every cell in the batch casts every ray direction
+        cell_origins = cells[:, np.newaxis, ::-1] + sample_offsets[np.newaxis, :, :]
+        origins = np.repeat(cell_origins.reshape(-1, 2), ray_count, axis=0)
+        directions = np.tile(ray_directions, (len(cells) * len(sample_offsets), 1))
+
+        hit_ray, hit_x, hit_y, _ = visibility.cast_rays(occupancy, origins, directions, float("inf"))
+
+        visible = np.zeros((len(cells), pvs.cluster_count), dtype=bool)
+        visible[hit_ray // rays_per_cell, pvs.get_block_clusters(hit_x, hit_y)] = True
+        bitsets[batch_start:batch_start + len(cells)] = np.packbits(visible, axis=1)
+
+    pvs.bitsets = bitsets
+
+    return pvs
+
+
+def get_cache_key(level_data, cluster_size, sample_count, ray_count):
+    """
+    Hash the level file contents together with the generation options.
+    """
+    options = "{0} {1} {2} {3}".format(PVS_VERSION, cluster_size, sample_count, ray_count)
+
+    return hashlib.sha1(level_data + options.encode("ascii")).hexdigest()
+
+
+def load_or_generate_pvs(file_name, occupancy, cluster_size=1, sample_count=DEFAULT_SAMPLE_COUNT, ray_count=DEFAULT_RAY_COUNT, max_memory=DEFAULT_MAX_MEMORY):
+    """
+    Load the PVS cached next to the level file (<file_name>.pvs.npz) or generate and cache it if it is missing or stale.
+
+    :param string file_name: The path of the level file the occupancy was loaded from.
+    :param int cluster_size: Blocks are grouped into square clusters of this size (0 chooses it from the memory limit).
+    :return: A PotentiallyVisibleSets instance.
+    """
+    if cluster_size == 0:
+        cluster_size = choose_cluster_size(occupancy, max_memory)
+
+    with open(file_name, "rb") as file:
+        cache_key = get_cache_key(file.read(), cluster_size, sample_count, ray_count)
+
+    cache_file_name = file_name + ".pvs.npz"
+
+    if os.path.exists(cache_file_name):
+        with np.load(cache_file_name) as data:
+            if str(data["cache_key"]) == cache_key:
+                return PotentiallyVisibleSets(occupancy.shape, cluster_size, data["cell_indices"], data["bitsets"])
+
+    pvs = generate_pvs(occupancy, cluster_size, sample_count, ray_count, max_memory)
+
+    # the cache is optional, the generated PVS is used from memory if it cannot be written (e.g. a read-only directory)
+    try:
+        with open(cache_file_name, "wb") as file:
+            np.savez_compressed(file, cache_key=np.array(cache_key), cell_indices=pvs.cell_indices, bitsets=pvs.bitsets)
+    except OSError:
+        # a partially written file would fail to load the next time
+        if os.path.exists(cache_file_name):
+            os.remove(cache_file_name)
+
+    return pvs
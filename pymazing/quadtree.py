@@ -0,0 +1,190 @@
+"""Quadtree over static meshes for hierarchical view frustum culling."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import numpy as np
+
+from pymazing import frustum as frustum_
+
+MAX_LEAF_SIZE = 16
+MAX_DEPTH = 16
+
+
+class QuadTreeNode:
+    def __init__(self, start, end, min_corner, max_corner):
+        """
+        :param int start: Index of the first item of the node in the item order of the tree.
+        :param int end: Index after the last item of the node.
+        :param min_corner: The minimum corner of the node bounding box.
+        :param max_corner: The maximum corner of the node bounding box.
+        """
+        self.start = start
+        self.end = end
+        self.min_corner = min_corner
+        self.max_corner = max_corner
+        self.children = []
+
+
+class QuadTree:
+    def __init__(self, meshes, max_leaf_size=MAX_LEAF_SIZE):
+        """
+        Build the tree from the mesh bounding spheres. The meshes are assumed not to move afterwards.
+
+        The meshes are split on the horizontal (x, z) plane which suits the block grid of the levels.
+
+        :param meshes: A list of meshes.
+        :param int max_leaf_size: Nodes with at most this many meshes are not split further.
+        """
+        self.meshes = meshes
+        self.max_leaf_size = max_leaf_size
+
+        for mesh in meshes:
+            mesh.calculate_bounding_radius()
+
+        centers = np.array([mesh.position for mesh in meshes], dtype=float).reshape(-1, 3)
+        radii = np.array([mesh.bounding_radius for mesh in meshes], dtype=float)
+
+        # items are reordered so that every node covers a contiguous range of them
+        self.order = np.arange(len(meshes))
+        self.centers = centers
+        self.radii = radii
+        self.root = self.build_node(0, len(meshes), 0)
+
+        self.centers = centers[self.order]
+        self.radii = radii[self.order]
+
+        # for replacing meshes: the tree position of each mesh, and the meshes added afterwards (tested one by one)
+        self.mesh_indices = {id(mesh): i for i, mesh in enumerate(meshes)}
+        self.item_positions = np.empty(len(meshes), dtype=int)
+        self.item_positions[self.order] = np.arange(len(meshes))
+        self.added_indices = []
+
+    def build_node(self, start, end, depth):
+        """
+        Recursively create a node for the item range and split it to four children around the center of the items.
+        """
+        indices = self.order[start:end]
+        centers = self.centers[indices]
+        radii = self.radii[indices][:, np.newaxis]
+
+        if len(indices) == 0:
+            node = QuadTreeNode(start, end, np.zeros(3), np.zeros(3))
+        else:
+            node = QuadTreeNode(start, end, np.min(centers - radii, axis=0), np.max(centers + radii, axis=0))
+
+        if (end - start) <= self.max_leaf_size or depth >= MAX_DEPTH:
+            return node
+
+        split_x = (node.min_corner[0] + node.max_corner[0]) / 2.0
+        split_z = (node.min_corner[2] + node.max_corner[2]) / 2.0
+        quadrants = (centers[:, 0] >= split_x).astype(int) + 2 * (centers[:, 2] >= split_z).astype(int)
+
+        # all items on the same spot cannot be split
+        if np.all(quadrants == quadrants[0]):
+            return node
+
+        sort_order = np.argsort(quadrants, kind="stable")
+        self.order[start:end] = indices[sort_order]
+        quadrant_ends = np.searchsorted(quadrants[sort_order], [0, 1, 2, 3], side="right")
+        child_start = start
+
+        for quadrant_end in quadrant_ends:
+            child_end = start + quadrant_end
+
+            if child_end > child_start:
+                node.children.append(self.build_node(child_start, child_end, depth + 1))
+
+            child_start = child_end
+
+        return node
+
+    def find_visible(self, frustum):
+        """
+        Find the meshes whose bounding spheres are at least partially inside the frustum.
+
+        Whole subtrees outside the frustum are rejected with one test, subtrees completely inside are accepted without
+        further tests, and children only test the planes their parent was crossing.
+
+        :return: A list of meshes in their original order (added meshes last).
+        """
+        visible_indices = []
+
+        if len(self.order) > 0:
+            self.collect_visible(self.root, frustum, frustum_.ALL_PLANES, visible_indices)
+
+        visible_indices = [self.order[indices] for indices in visible_indices]
+
+        if len(self.added_indices) > 0:
+            added_indices = np.array(self.added_indices)
+            centers = np.array([self.meshes[i].position for i in added_indices], dtype=float)
+            radii = np.array([self.meshes[i].bounding_radius for i in added_indices], dtype=float)
+            visible_indices.append(added_indices[frustum.spheres_are_inside(centers, radii)])
+
+        if len(visible_indices) == 0:
+            return []
+
+        visible_order = np.sort(np.concatenate(visible_indices))
+
+        return [self.meshes[i] for i in visible_order if self.meshes[i] is not None]
+
+    def replace_mesh(self, old_mesh, new_mesh):
+        """
+        Replace a mesh of the tree without rebuilding it, for example with a rebuilt chunk mesh. The bounding boxes of
+        the nodes above the mesh only grow, so the tree gets looser after many edits.
+
+        :param old_mesh: A mesh of the tree or None to add the new mesh.
+        :param new_mesh: The replacing mesh or None to remove the old mesh.
+        """
+        if old_mesh is None and new_mesh is None:
+            return
+
+        if old_mesh is None:
+            index = len(self.meshes)
+            self.meshes.append(None)
+            self.added_indices.append(index)
+        else:
+            index = self.mesh_indices.pop(id(old_mesh))
+
+        self.meshes[index] = new_mesh
+
+        if new_mesh is None:
+            # the removed item of the tree itself is skipped in find_visible, but an added one has no item to skip
+            if index in self.added_indices:
+                self.added_indices.remove(index)
+
+            return
+
+        self.mesh_indices[id(new_mesh)] = index
+        new_mesh.calculate_bounding_radius()
+
+        if index >= len(self.item_positions):
+            return
+
+        position = self.item_positions[index]
+        center = np.array(new_mesh.position, dtype=float)
+        self.centers[position] = center
+        self.radii[position] = new_mesh.bounding_radius
+        node = self.root
+
+        while node is not None:
+            node.min_corner = np.minimum(node.min_corner, center - new_mesh.bounding_radius)
+            node.max_corner = np.maximum(node.max_corner, center + new_mesh.bounding_radius)
+            node = next((child for child in node.children if child.start <= position < child.end), None)
+
+    def collect_visible(self, node, frustum, plane_mask, visible_indices):
+        result, plane_mask = frustum.box_is_inside(node.min_corner, node.max_corner, plane_mask)
+
+        if result == frustum_.OUTSIDE:
+            return
+
+        if result == frustum_.INSIDE:
+            visible_indices.append(np.arange(node.start, node.end))
+            return
+
+        if len(node.children) == 0:
+            is_visible = frustum.spheres_are_inside(self.centers[node.start:node.end], self.radii[node.start:node.end], plane_mask)
+            visible_indices.append(node.start + np.flatnonzero(is_visible))
+            return
+
+        for child in node.children:
+            self.collect_visible(child, frustum, plane_mask, visible_indices)
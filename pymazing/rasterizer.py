@@ -2,6 +2,19 @@
 # Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
 # License: MIT, see the LICENSE file.
 
+import numbers
+
+
+def get_color_value(color):
+    """
+    Get the packed 32 bit value of a color instance or of an already packed value.
+    """
+    if isinstance(color, numbers.Integral):
+        return color
+
+    return color.get_uint32_value()
+
+
 def draw_point(framebuffer, x, y, color):
     """
     Draw a single pixel of given color at the specified coordinates.
@@ -9,9 +22,9 @@ def draw_point(framebuffer, x, y, color):
     :param framebuffer: An instance of the framebuffer class.
     :param int x: The X-coordinate.
     :param int y: The Y-coordinate.
-    :param color: An instance of the color class.
+    :param color: An instance of the color class or a packed color value (see Color.get_uint32_value).
     """
-    framebuffer.pixel_data[y * framebuffer.width + x] = color.get_value()
+    framebuffer.pixel_data[y * framebuffer.width + x] = get_color_value(color)
 
 
 def draw_line(framebuffer, x0, y0, x1, y1, color):
@@ -21,7 +34,7 @@ def draw_line(framebuffer, x0, y0, x1, y1, color):
     :param framebuffer: An instance of the framebuffer class.
     :param int x0/1: The X-coordinates.
     :param int y0/1: The Y-coordinates.
-    :param color: An instance of the color class.
+    :param color: An instance of the color class or a packed color value (see Color.get_uint32_value).
     """
     steep = (abs(y1 - y0) > abs(x1 - x0))
 
@@ -39,7 +52,7 @@ def draw_line(framebuffer, x0, y0, x1, y1, color):
     step_y = 1 if (y0 < y1) else -1
     y = y0
     width = framebuffer.width
-    color_value = color.get_uint32_value()
+    color_value = get_color_value(color)
     pixel_data = framebuffer.pixel_data
 
     for x in range(x0, x1 + 1):
@@ -62,7 +75,7 @@ def draw_triangle(framebuffer, x0, y0, x1, y1, x2, y2, color):
     :param framebuffer: An instance of the framebuffer class.
     :param int x0/1/2: The X-coordinates.
     :param int y0/1/2: The Y-coordinates.
-    :param color: An instance of the color class.
+    :param color: An instance of the color class or a packed color value (see Color.get_uint32_value).
     """
     if y0 > y1:
         x0, x1 = x1, x0
@@ -77,7 +90,7 @@ def draw_triangle(framebuffer, x0, y0, x1, y1, x2, y2, color):
         y1, y2 = y2, y1
 
     width = framebuffer.width
-    color_value = color.get_uint32_value()
+    color_value = get_color_value(color)
     pixel_data = framebuffer.pixel_data
     middle_line_drawn = False
 
@@ -133,7 +146,7 @@ def draw_triangle_z_buffer(framebuffer, x0, y0, z0, x1, y1, z1, x2, y2, z2, colo
     :param int x0/1/2: The X-coordinates.
     :param int y0/1/2: The Y-coordinates.
     :param float z0/1/2: The Z-coordinates.
-    :param color: An instance of the color class.
+    :param color: An instance of the color class or a packed color value (see Color.get_uint32_value).
     """
     if y0 > y1:
         x0, x1 = x1, x0
@@ -151,7 +164,7 @@ def draw_triangle_z_buffer(framebuffer, x0, y0, z0, x1, y1, z1, x2, y2, z2, colo
         z1, z2 = z2, z1
 
     width = framebuffer.width
-    color_value = color.get_uint32_value()
+    color_value = get_color_value(color)
     pixel_data = framebuffer.pixel_data
     depth_data = framebuffer.depth_data
     middle_line_drawn = False
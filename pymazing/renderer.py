@@ -4,29 +4,41 @@
 
 import numpy as np
 
-from pymazing import color, rasterizer, clipper
+from pymazing import color, rasterizer, clipper, mesh as mesh_
 
 
-def render_meshes(meshes, world, camera, framebuffer, do_frustum_culling=True, do_backface_culling=True, render_wireframe=False):
+def render_meshes(meshes, world, camera, framebuffer, do_frustum_culling=True, do_backface_culling=True, render_wireframe=False, do_block_side_culling=True, do_fog=True):
     """
-    Transform the meshes, cull them, do lighting and then rasterize resulting shapes to the screen.
+    Transform the meshes, cull them, do lighting and fog and then rasterize resulting shapes to the screen.
 
     :param bool do_frustum_culling: Whether to cull meshes that are outside the view frustum.
     :param bool do_backface_culling: Whether to cull triangles that are facing away from the camera.
     :param bool render_wireframe: Whether to render meshes as wireframe or solid.
+    :param bool do_block_side_culling: Whether to backface cull cube meshes by their position instead of triangle normals.
+    :param bool do_fog: Whether to apply the world fog (the colors are per triangle, so large triangles fog badly).
     """
     view_space_lines = []
     view_space_triangles = []
 
-    for mesh in meshes:
-        if do_frustum_culling:
-            mesh.calculate_bounding_radius()
+    if do_frustum_culling and len(meshes) > 0:
+        meshes = cull_meshes(meshes, camera.frustum)
 
-            if not camera.frustum.sphere_is_inside(mesh.position, mesh.bounding_radius):
-                continue
+    if do_backface_culling and do_block_side_culling:
+        visible_block_sides = find_visible_block_sides(meshes, camera.position)
+    else:
+        visible_block_sides = np.full(len(meshes), -1)
+
+    for mesh, visible_sides in zip(meshes, visible_block_sides):
+        if visible_sides == 0:
+            continue
 
         mesh.calculate_world_matrix()
+        mesh.calculate_normal_matrix()
         world_matrix = mesh.world_matrix
+        world_normals = mesh.get_world_normals()
+
+        # compact meshes have packed colors
+        color_vectors = color.from_uint32_values(mesh.colors) if isinstance(mesh.colors, np.ndarray) else None
         view_matrix = camera.view_matrix.dot(world_matrix)
 
         world_space_vertices = []
@@ -37,22 +49,27 @@ def render_meshes(meshes, world, camera, framebuffer, do_frustum_culling=True, d
             view_space_vertices.append(view_matrix.dot(vertex))
 
         for i, index in enumerate(mesh.indices):
-            v0 = world_space_vertices[index[0]]
-            v1 = world_space_vertices[index[1]]
-            v2 = world_space_vertices[index[2]]
-
-            triangle_position = v0[:3]
+            if visible_sides > 0 and (mesh.triangle_sides[i] & visible_sides) == 0:
+                continue
 
-            triangle_normal = np.cross([v1[0] - v0[0], v1[1] - v0[1], v1[2] - v0[2]], [v2[0] - v0[0], v2[1] - v0[1], v2[2] - v0[2]])
-            triangle_normal /= np.linalg.norm(triangle_normal)
+            triangle_position = world_space_vertices[index[0]][:3]
+            triangle_normal = world_normals[i]
 
             triangle_to_camera = camera.position - triangle_position
-            triangle_to_camera /= np.linalg.norm(triangle_to_camera)
+            triangle_distance = np.linalg.norm(triangle_to_camera)
+            triangle_to_camera /= triangle_distance
 
-            if do_backface_culling and np.dot(triangle_to_camera, triangle_normal) < 0.0:
+            if visible_sides < 0 and do_backface_culling and np.dot(triangle_to_camera, triangle_normal) < 0.0:
                 continue
 
-            triangle_color = calculate_triangle_color(world, triangle_position, triangle_normal, triangle_to_camera, mesh.colors[i])
+            original_color = mesh.colors[i].get_vector() if color_vectors is None else color_vectors[i]
+            light_color = calculate_light_color(world, triangle_position, triangle_normal, triangle_to_camera)
+            triangle_color_vector = np.clip(original_color * light_color, 0.0, 1.0)
+
+            if do_fog:
+                triangle_color_vector = apply_fog(world, triangle_color_vector, triangle_distance)
+
+            triangle_color = color.to_uint32_value(triangle_color_vector)
 
             v0 = view_space_vertices[index[0]]
             v1 = view_space_vertices[index[1]]
@@ -71,6 +88,132 @@ def render_meshes(meshes, world, camera, framebuffer, do_frustum_culling=True, d
         render_triangles(view_space_triangles, camera, framebuffer)
 
 
+def find_visible_block_sides(meshes, camera_position):
+    """
+    Find the sides of the unrotated cube meshes that face the camera for all of them at once - a side faces the camera
+    when the camera is on the outer side of its plane, so at most three sides of a cube are visible.
+
+    :return: A numpy array of visible side flags per mesh (-1 for meshes that need the generic backface test).
+    """
+    visible_sides = np.full(len(meshes), -1)
+    block_indices = [i for i, mesh in enumerate(meshes) if mesh.triangle_sides is not None and not any(mesh.rotation)]
+
+    if len(block_indices) == 0:
+        return visible_sides
+
+    positions = np.array([meshes[i].position for i in block_indices], dtype=float)
+    scales = np.array([meshes[i].scale for i in block_indices], dtype=float)
+    visible_sides[block_indices] = find_facing_sides(positions, scales, camera_position)
+
+    return visible_sides
+
+
+def find_facing_sides(positions, scales, camera_position):
+    """
+    Find the sides of axis-aligned cubes the camera is on the outer side of.
+
+    :param positions: A numpy array of shape (N, 3) of cube centers.
+    :param scales: A numpy array of shape (N, 3) of cube half sizes.
+    :return: A numpy array of N side flags.
+    """
+    min_corners = positions - np.abs(scales)
+    max_corners = positions + np.abs(scales)
+    sides = np.zeros(len(positions), dtype=int)
+
+    for axis, min_side, max_side in ((0, mesh_.LEFT, mesh_.RIGHT), (1, mesh_.BOTTOM, mesh_.TOP), (2, mesh_.BACK, mesh_.FRONT)):
+        sides |= np.where(camera_position[axis] <= min_corners[:, axis], min_side, 0)
+        sides |= np.where(camera_position[axis] >= max_corners[:, axis], max_side, 0)
+
+    return sides
+
+
+def render_cube_instances(instances, world, camera, framebuffer, do_frustum_culling=True, do_backface_culling=True, render_wireframe=False, do_fog=True):
+    """
+    Render cube instances like render_meshes would render them as separate meshes, but cull, expand and transform all
+    of them at once.
+
+    :param instances: A CubeInstances instance.
+    :param bool do_fog: Whether to apply the world fog.
+    """
+    view_space_lines = []
+    view_space_triangles = []
+    template = mesh_.CUBE_TEMPLATE
+
+    sides = instances.side_masks.astype(int)
+    is_visible = sides != 0
+
+    if do_frustum_culling and len(instances) > 0:
+        is_visible &= camera.frustum.spheres_are_inside(instances.positions, np.linalg.norm(instances.scales, axis=1))
+
+    if do_backface_culling:
+        sides &= find_facing_sides(instances.positions, instances.scales, camera.position)
+        is_visible &= sides != 0
+
+    visible_indices = np.flatnonzero(is_visible)
+    positions = instances.positions[visible_indices]
+    scales = instances.scales[visible_indices]
+
+    template_vertices = np.asarray(template.vertices)
+    world_space_vertices = template_vertices[np.newaxis, :, :3] * scales[:, np.newaxis, :] + positions[:, np.newaxis, :]
+    world_space_vertices = np.concatenate((world_space_vertices, np.ones(world_space_vertices.shape[:2] + (1,))), axis=2)
+    view_space_vertices = world_space_vertices.dot(camera.view_matrix.T)
+
+    # the normal matrix of a scaled cube divides by the scale
+    world_normals = template.normals[np.newaxis, :, :] / scales[:, np.newaxis, :]
+    world_normals /= np.linalg.norm(world_normals, axis=2)[:, :, np.newaxis]
+
+    triangle_mask = (sides[visible_indices, np.newaxis] & np.asarray(template.triangle_sides)) != 0
+
+    for i, t in zip(*np.nonzero(triangle_mask)):
+        index = template.indices[t]
+        triangle_position = world_space_vertices[i, index[0], :3]
+        triangle_normal = world_normals[i, t]
+
+        triangle_to_camera = camera.position - triangle_position
+        triangle_distance = np.linalg.norm(triangle_to_camera)
+        triangle_to_camera /= triangle_distance
+
+        light_color = calculate_light_color(world, triangle_position, triangle_normal, triangle_to_camera)
+        triangle_color_vector = np.clip(instances.colors[visible_indices[i]] * light_color, 0.0, 1.0)
+
+        if do_fog:
+            triangle_color_vector = apply_fog(world, triangle_color_vector, triangle_distance)
+
+        triangle_color = color.to_uint32_value(triangle_color_vector)
+
+        v0 = view_space_vertices[i, index[0]]
+        v1 = view_space_vertices[i, index[1]]
+        v2 = view_space_vertices[i, index[2]]
+
+        if render_wireframe:
+            view_space_lines.append((v0, v1, triangle_color))
+            view_space_lines.append((v1, v2, triangle_color))
+            view_space_lines.append((v2, v0, triangle_color))
+        else:
+            view_space_triangles.append((v0, v1, v2, triangle_color))
+
+    if render_wireframe:
+        render_lines(view_space_lines, camera, framebuffer)
+    else:
+        render_triangles(view_space_triangles, camera, framebuffer)
+
+
+def cull_meshes(meshes, frustum):
+    """
+    Remove the meshes whose bounding spheres are completely outside the view frustum.
+
+    :return: A new list of the remaining meshes.
+    """
+    for mesh in meshes:
+        mesh.calculate_bounding_radius()
+
+    centers = np.array([mesh.position for mesh in meshes], dtype=float)
+    radii = np.array([mesh.bounding_radius for mesh in meshes])
+    visible = frustum.spheres_are_inside(centers, radii)
+
+    return [mesh for mesh, is_visible in zip(meshes, visible) if is_visible]
+
+
 def render_lines(view_space_lines, camera, framebuffer, clip_far=True, depth_sort=True):
     """
     Clip view space lines, transform to screen space, clip again, sort by depth and then draw to screen.
@@ -197,6 +340,19 @@ def calculate_triangle_color(world, triangle_position, triangle_normal, triangle
     :param triangle_to_camera: Triangle to camera vector.
     :param triangle_original_color: The color of the triangle.
     """
+    combined_light_color = calculate_light_color(world, triangle_position, triangle_normal, triangle_to_camera)
+    final_triangle_color = triangle_original_color.get_vector() * combined_light_color
+    final_triangle_color = np.clip(final_triangle_color, 0.0, 1.0)
+
+    return color.from_vector(final_triangle_color)
+
+
+def calculate_light_color(world, triangle_position, triangle_normal, triangle_to_camera):
+    """
+    Sum the ambient, diffuse and specular light reaching the triangle.
+
+    :return: A numpy vector of the RGBA light color.
+    """
     combined_light_color = np.array([0.0, 0.0, 0.0, 1.0])
 
     if world.ambient_light_enabled:
@@ -223,7 +379,18 @@ def calculate_triangle_color(world, triangle_position, triangle_normal, triangle
                 specular_amount = pow(specular_amount, specular_light.shininess)
                 combined_light_color += specular_light.color.get_vector() * specular_light.intensity * specular_amount
 
-    final_triangle_color = triangle_original_color.get_vector() * combined_light_color
-    final_triangle_color = np.clip(final_triangle_color, 0.0, 1.0)
+    return combined_light_color
 
-    return color.from_vector(final_triangle_color)
+
+def apply_fog(world, color_vector, distance):
+    """
+    Blend a lit triangle color toward the fog color of the world by its distance from the camera (if the fog is enabled).
+
+    :param color_vector: A numpy vector of the RGBA color.
+    :param float distance: The distance from the camera to the triangle.
+    :return: A numpy vector of the RGBA color.
+    """
+    if not world.fog_enabled:
+        return color_vector
+
+    return world.fog.apply(color_vector, distance)
@@ -0,0 +1,80 @@
+"""Automatic framebuffer scaling to hold a frame time target."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import numpy as np
+
+
+class ResolutionGovernor:
+    def __init__(self, target_frame_time, scale, min_scale=0.25, max_scale=1.0, step=0.05, tolerance=0.1, sample_count=30):
+        """
+        Lower the framebuffer scale when the recent frames are slower than the target and raise it when they are
+        faster. The scale moves one step at a time and only after a full window of frames at the current scale, and
+        frame times within the tolerance around the target do not change it, so the framebuffer is not resized back
+        and forth every frame.
+
+        The scales are multiples of the step, so only a few framebuffer sizes are ever used.
+
+        :param float target_frame_time: The frame time target in seconds.
+        :param float scale: The initial framebuffer scale.
+        :param float min_scale: The smallest allowed scale.
+        :param float max_scale: The largest allowed scale.
+        :param float step: The scale change per adjustment.
+        :param float tolerance: The relative frame time difference from the target that is accepted.
+        :param int sample_count: How many frames are averaged before the scale can change.
+        """
+        self.target_frame_time = target_frame_time
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self.step = step
+        self.tolerance = tolerance
+        self.frame_times = np.zeros(sample_count)
+        self.frame_time_count = 0
+        self.scale = self.quantize(scale)
+
+    def quantize(self, scale):
+        """
+        Round a scale to the nearest step and clamp it to the allowed range.
+        """
+        scale = round(scale / self.step) * self.step
+
+        return min(max(scale, self.min_scale), self.max_scale)
+
+    def set_scale(self, scale):
+        """
+        Change the scale from outside (e.g. manually) and start collecting frame times again.
+
+        :return: The quantized scale.
+        """
+        self.scale = self.quantize(scale)
+        self.frame_time_count = 0
+
+        return self.scale
+
+    def update(self, frame_time):
+        """
+        Record a frame time and adjust the scale when a full window of frames has been recorded.
+
+        :param float frame_time: The time spent updating and rendering the latest frame in seconds, without waiting for
+        the vertical sync (which would keep the frames from ever getting faster than the refresh rate).
+        :return: The new scale or None if it did not change.
+        """
+        self.frame_times[self.frame_time_count % len(self.frame_times)] = frame_time
+        self.frame_time_count += 1
+
+        if self.frame_time_count < len(self.frame_times):
+            return None
+
+        # the median ignores the occasional hitches (e.g. loading chunks)
+        frame_time = np.median(self.frame_times)
+        scale = self.scale
+
+        if frame_time > self.target_frame_time * (1.0 + self.tolerance):
+            scale = self.quantize(scale - self.step)
+        elif frame_time < self.target_frame_time * (1.0 - self.tolerance):
+            scale = self.quantize(scale + self.step)
+
+        if scale == self.scale:
+            return None
+
+        return self.set_scale(scale)
@@ -0,0 +1,126 @@
+"""Pixel by pixel comparison of alternative rendering paths against the reference renderer."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import os
+
+import numpy as np
+
+from pymazing import benchmark, framebuffer, level_generator, level_loader, renderer
+
+FRAMEBUFFER_WIDTH = 160
+FRAMEBUFFER_HEIGHT = 100
+
+
+class Scene:
+    def __init__(self, name, mesh_groups, world, camera):
+        """
+        :param string name: A descriptive name used in the reports.
+        :param mesh_groups: A list of mesh lists, each rendered with a separate call (like the game states do).
+        """
+        self.name = name
+        self.mesh_groups = mesh_groups
+        self.world = world
+        self.camera = camera
+
+
+class ComparisonResult:
+    def __init__(self, mismatch_count, first_mismatch, reference_value=None, candidate_value=None):
+        """
+        :param int mismatch_count: The number of differing pixels.
+        :param first_mismatch: The (x, y) position of the first differing pixel (in memory order) or None.
+        """
+        self.mismatch_count = mismatch_count
+        self.first_mismatch = first_mismatch
+        self.reference_value = reference_value
+        self.candidate_value = candidate_value
+
+    def __str__(self):
+        if self.first_mismatch is None:
+            return "0 mismatching pixels"
+
+        return "{0} mismatching pixels, first at {1} (0x{2:08x} != 0x{3:08x})".format(self.mismatch_count, self.first_mismatch, self.reference_value, self.candidate_value)
+
+
+def generate_maze_blocks(size, seed):
+    """
+    Generate the block data of a maze level without going through a file.
+    """
+    return level_loader.generate_blocks_from_pixels(level_generator.generate_maze_pixels(size, size, seed))
+
+
+def create_scenes(level_file_names=()):
+    """
+    Create the standard validation scenes: the given levels and a generated maze, each from a few fixed camera poses
+    and with two lighting configurations - the game defaults and all the lights on.
+
+    :param level_file_names: Paths to additional TGA level files.
+    :return: A list of scenes.
+    """
+    levels = [(os.path.splitext(os.path.basename(file_name))[0], level_loader.generate_blocks_from_tga(file_name)) for file_name in level_file_names]
+    levels.append(("maze16", generate_maze_blocks(16, 16)))
+
+    scenes = []
+    worlds = [("", benchmark.create_world()), (",lit", benchmark.create_world(specular_lights_enabled=True))]
+
+    for level_name, blocks in levels:
+        meshes = level_loader.generate_partial_meshes(blocks)
+        poses = benchmark.get_camera_poses(len(blocks[0]), len(blocks))
+        poses["start"] = ([4.0, 3.0, 6.0], 0.0, 0.0)
+
+        for pose_name, (position, pitch, yaw) in sorted(poses.items()):
+            for world_name, world in worlds:
+                camera = benchmark.create_camera(position, pitch, yaw, FRAMEBUFFER_WIDTH / FRAMEBUFFER_HEIGHT)
+                scenes.append(Scene("{0}[{1}{2}]".format(level_name, pose_name, world_name), [meshes[:1], meshes[1:]], world, camera))
+
+    return scenes
+
+
+def render_scene(render_function, scene, width=FRAMEBUFFER_WIDTH, height=FRAMEBUFFER_HEIGHT, **options):
+    """
+    Render a scene to a new headless framebuffer.
+
+    :param render_function: A function with the same signature as renderer.render_meshes.
+    :param options: Passed on to the render function (e.g. render_wireframe).
+    :return: The framebuffer.
+    """
+    framebuffer_ = framebuffer.FrameBuffer(headless=True)
+    framebuffer_.resize(width, height)
+    framebuffer_.depth_data.fill(framebuffer_.depth_clear_value)
+
+    for meshes in scene.mesh_groups:
+        render_function(meshes, scene.world, scene.camera, framebuffer_, **options)
+
+    return framebuffer_
+
+
+def compare_framebuffers(reference, candidate):
+    """
+    Compare the pixels of two framebuffers of the same size.
+
+    :return: A ComparisonResult instance.
+    """
+    assert reference.width == candidate.width and reference.height == candidate.height
+
+    mismatches = np.flatnonzero(reference.pixel_data != candidate.pixel_data)
+
+    if len(mismatches) == 0:
+        return ComparisonResult(0, None)
+
+    index = mismatches[0]
+    first_mismatch = (int(index % reference.width), int(index // reference.width))
+
+    return ComparisonResult(len(mismatches), first_mismatch, int(reference.pixel_data[index]), int(candidate.pixel_data[index]))
+
+
+def compare_renderers(candidate_function, scene, reference_function=renderer.render_meshes, **options):
+    """
+    Render a scene with both the reference and the candidate function and compare the results.
+
+    :param options: Passed on to both render functions.
+    :return: A ComparisonResult instance.
+    """
+    reference = render_scene(reference_function, scene, **options)
+    candidate = render_scene(candidate_function, scene, **options)
+
+    return compare_framebuffers(reference, candidate)
@@ -0,0 +1,248 @@
+"""Block visibility by casting rays through the level grid (DDA)."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+from math import *
+
+import numpy as np
+
+from pymazing import level_loader, mesh
+
+WALL_HEIGHT = 1.0
+DEFAULT_RAY_COUNT = 1024
+MAX_HALF_FOV = 80.0 * pi / 180.0
+
+
+def cast_rays(occupancy, origins, directions, max_distance):
+    """
+    Walk rays cell by cell through the block grid until they hit a block (Amanatides & Woo DDA for all rays at once).
+
+    Grid coordinates are (x, y) = (world x, -world z), i.e. block (x, y) covers [x, x + 1] x [y, y + 1].
+
+    :param occupancy: A boolean numpy array of shape (height, width).
+    :param origins: The ray origins in grid coordinates (inside the grid), shape (2,) for a shared origin or (N, 2).
+    :param directions: A numpy array of shape (N, 2) of ray directions in grid coordinates.
+    :param float max_distance: Rays stop after this distance.
+    :return: A tuple of ray index, hit block x, hit block y and hit side (mesh side flag, zero if the origin is inside a block) arrays.
+    """
+    height, width = occupancy.shape
+    ray_count = len(directions)
+    origins = np.broadcast_to(origins, (ray_count, 2))
+    origin_x = origins[:, 0]
+    origin_y = origins[:, 1]
+    cell_x = np.floor(origin_x).astype(int)
+    cell_y = np.floor(origin_y).astype(int)
+
+    direction_x = directions[:, 0]
+    direction_y = directions[:, 1]
+    step_x = np.where(direction_x > 0.0, 1, -1)
+    step_y = np.where(direction_y > 0.0, 1, -1)
+
+    with np.errstate(divide="ignore"):
+        delta_x = np.abs(1.0 / direction_x)
+        delta_y = np.abs(1.0 / direction_y)
+
+    # distances along the rays to the next vertical and horizontal cell boundaries
+    next_x = np.where(direction_x > 0.0, cell_x + 1.0 - origin_x, origin_x - cell_x)
+    next_y = np.where(direction_y > 0.0, cell_y + 1.0 - origin_y, origin_y - cell_y)
+    next_x = np.where(direction_x == 0.0, np.inf, next_x * np.where(direction_x == 0.0, 0.0, delta_x))
+    next_y = np.where(direction_y == 0.0, np.inf, next_y * np.where(direction_y == 0.0, 0.0, delta_y))
+
+    # a ray stepping to +x enters the next block through its left side etc.
+    side_x = np.where(step_x > 0, mesh.LEFT, mesh.RIGHT).astype(np.uint8)
+    side_y = np.where(step_y > 0, mesh.FRONT, mesh.BACK).astype(np.uint8)
+
+    # rays starting inside a block hit it immediately
+    inside = occupancy[cell_y, cell_x]
+    hit_ray = [np.flatnonzero(inside)]
+    hit_x = [cell_x[inside]]
+    hit_y = [cell_y[inside]]
+    hit_side = [np.zeros(np.count_nonzero(inside), dtype=np.uint8)]
+    active = np.flatnonzero(~inside)
+
+    while len(active) > 0:
+        move_x = next_x[active] < next_y[active]
+        distance = np.where(move_x, next_x[active], next_y[active])
+
+        cell_x[active] += np.where(move_x, step_x[active], 0)
+        cell_y[active] += np.where(move_x, 0, step_y[active])
+        next_x[active] += np.where(move_x, delta_x[active], 0.0)
+        next_y[active] += np.where(move_x, 0.0, delta_y[active])
+
+        x = cell_x[active]
+        y = cell_y[active]
+        outside = (x < 0) | (x >= width) | (y < 0) | (y >= height) | (distance > max_distance)
+        hit = ~outside
+        hit[hit] = occupancy[y[hit], x[hit]]
+
+        hit_ray.append(active[hit])
+        hit_x.append(x[hit])
+        hit_y.append(y[hit])
+        hit_side.append(np.where(move_x[hit], side_x[active[hit]], side_y[active[hit]]))
+
+        active = active[~(outside | hit)]
+
+    return np.concatenate(hit_ray), np.concatenate(hit_x), np.concatenate(hit_y), np.concatenate(hit_side)
+
+
+def get_ray_angles(camera, ray_count):
+    """
+    Calculate evenly spaced horizontal ray angles (in grid coordinates) that cover the camera view.
+
+    The horizontal extent is taken from the frustum corner directions so that pitching the camera widens it. If the
+    view is too steep for that, rays are cast to every direction.
+
+    :return: A numpy array of angles in radians.
+    """
+    tangent = tan(camera.vertical_fov * pi / 180.0 / 2.0)
+    up = camera.up_vector * tangent
+    right = camera.right_vector * tangent * camera.aspect_ratio
+    forward_angle = atan2(camera.forward_vector[0], -camera.forward_vector[2])
+    half_fov = 0.0
+
+    for corner in (camera.forward_vector + up + right, camera.forward_vector + up - right, camera.forward_vector - up + right, camera.forward_vector - up - right):
+        if (corner[0] * camera.forward_vector[0] + corner[2] * camera.forward_vector[2]) <= 0.0:
+            half_fov = pi
+            break
+
+        angle_difference = atan2(corner[0], -corner[2]) - forward_angle
+        angle_difference = (angle_difference + pi) % (2.0 * pi) - pi
+        half_fov = max(half_fov, abs(angle_difference))
+
+    if half_fov > MAX_HALF_FOV:
+        return np.linspace(-pi, pi, ray_count, endpoint=False)
+
+    # widen by one ray spacing so that the view edges are always covered
+    half_fov += 2.0 * half_fov / ray_count
+
+    return forward_angle + np.linspace(-half_fov, half_fov, ray_count)
+
+
+def merge_cells(x, y, sides, side_masks):
+    """
+    Combine the side flags of the same cells and drop the sides that do not exist.
+
+    :param x: A numpy array of cell columns.
+    :param y: A numpy array of cell rows.
+    :param sides: A numpy array of side flags of the cells (the same cell can appear many times).
+    :param side_masks: A numpy array of shape (height, width) of the existing side flags.
+    :return: A tuple of unique cell column, row and side flag arrays, sorted in row-major order.
+    """
+    width = side_masks.shape[1]
+    cells, inverse = np.unique(y * width + x, return_inverse=True)
+    merged_sides = np.zeros(len(cells), dtype=np.uint8)
+    np.bitwise_or.at(merged_sides, inverse, sides)
+
+    y, x = np.divmod(cells, width)
+    merged_sides &= side_masks[y, x]
+    visible = merged_sides != 0
+
+    return x[visible], y[visible], merged_sides[visible]
+
+
+def expand_along_walls(x, y, sides, side_masks, iterations):
+    """
+    Mark the same side of the neighboring blocks of a wall visible - rays hitting a long wall at a grazing angle can
+    skip blocks between them.
+
+    :param x: A numpy array of visible cell columns.
+    :param y: A numpy array of visible cell rows.
+    :param sides: A numpy array of visible side flags of the cells.
+    :param side_masks: A numpy array of shape (height, width) of the existing side flags.
+    :param int iterations: How many blocks to expand to.
+    :return: A tuple of cell column, row and side flag arrays (see merge_cells).
+    """
+    height, width = side_masks.shape
+    x, y, sides = merge_cells(x, y, sides, side_masks)
+
+    for _ in range(iterations):
+        # left and right sides form walls along the y axis, front and back sides along the x axis
+        wall_y = sides & (mesh.LEFT | mesh.RIGHT)
+        wall_x = sides & (mesh.FRONT | mesh.BACK)
+
+        all_y = np.concatenate((y, y - 1, y + 1, y, y))
+        all_x = np.concatenate((x, x, x, x - 1, x + 1))
+        all_sides = np.concatenate((sides, wall_y, wall_y, wall_x, wall_x))
+        inside = (all_y >= 0) & (all_y < height) & (all_x >= 0) & (all_x < width)
+
+        x, y, sides = merge_cells(all_x[inside], all_y[inside], all_sides[inside], side_masks)
+
+    return x, y, sides
+
+
+class GridVisibility:
+    def __init__(self, blocks, ray_count=DEFAULT_RAY_COUNT, wall_expansion=1, occupancy=None, side_masks=None):
+        """
+        :param blocks: A two dimensional array of colors. Can be None if the occupancy and side masks are given, but
+        find_visible_meshes needs the blocks.
+        :param int ray_count: How many rays are cast across the view.
+        :param int wall_expansion: How many blocks along a wall around each ray hit are also marked visible.
+        :param occupancy: A boolean numpy array of shape (height, width) or None to generate it from the blocks.
+        :param side_masks: A numpy array of shape (height, width) of side flags or None to generate it from the occupancy.
+        """
+        self.blocks = blocks
+        self.occupancy = occupancy if occupancy is not None else level_loader.generate_occupancy(blocks)
+        self.side_masks = side_masks if side_masks is not None else level_loader.generate_side_masks_from_occupancy(self.occupancy)
+        self.ray_count = ray_count
+        self.wall_expansion = wall_expansion
+        self.mesh_cache = dict()
+
+    def find_visible_sides(self, camera):
+        """
+        Cast rays over the horizontal field of view of the camera and mark the block sides they hit first.
+
+        Walls are single height and reach the floor, so a block hidden in the horizontal plane of the eye is hidden
+        everywhere. This only holds when the camera is inside the level and below the tops of the walls.
+
+        Only the cells the rays reach (up to the far plane of the camera) are handled, so the work does not grow with the
+        level size.
+
+        :return: A tuple of visible cell column, row and side flag arrays (in row-major order) or None if the camera is
+        not in the maze.
+        """
+        height, width = self.occupancy.shape
+        origin = np.array([camera.position[0], -camera.position[2]])
+
+        if not (0.0 < camera.position[1] < WALL_HEIGHT) or not (0.0 <= origin[0] < width and 0.0 <= origin[1] < height):
+            return None
+
+        angles = get_ray_angles(camera, self.ray_count)
+        directions = np.column_stack((np.sin(angles), np.cos(angles)))
+        _, hit_x, hit_y, hit_side = cast_rays(self.occupancy, origin, directions, camera.far_z)
+
+        # a camera inside a block sees all of its sides
+        hit_side = np.where(hit_side == 0, self.side_masks[hit_y, hit_x], hit_side)
+
+        return expand_along_walls(hit_x, hit_y, hit_side, self.side_masks, self.wall_expansion)
+
+    def clear_mesh_cache(self, x, y):
+        """
+        Forget the cached meshes of a block after it has been edited.
+        """
+        for sides in range(64):
+            self.mesh_cache.pop((y, x, sides), None)
+
+    def find_visible_meshes(self, camera):
+        """
+        Get the meshes of the visible block sides (the top sides are never visible from below).
+
+        :return: A list of meshes in the same order as generate_partial_meshes or None if the camera is not in the maze.
+        """
+        visible_cells = self.find_visible_sides(camera)
+
+        if visible_cells is None:
+            return None
+
+        meshes = []
+
+        for x, y, sides in zip(*[array.tolist() for array in visible_cells]):
+            key = (y, x, sides)
+            mesh_ = self.mesh_cache.get(key)
+
+            if mesh_ is None:
+                mesh_ = level_loader.create_block_mesh(self.blocks[y][x], sides, x, y)
+                self.mesh_cache[key] = mesh_
+
+            meshes.append(mesh_)
+
+        return meshes
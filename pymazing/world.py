@@ -2,7 +2,7 @@
 # Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
 # License: MIT, see the LICENSE file.
 
-from pymazing import light
+from pymazing import light, fog
 
 
 class World:
@@ -13,3 +13,5 @@ class World:
         self.ambient_light_enabled = True
         self.diffuse_lights_enabled = True
         self.specular_lights_enabled = False
+        self.fog = fog.Fog()
+        self.fog_enabled = False
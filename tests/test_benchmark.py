@@ -0,0 +1,46 @@
+"""Benchmark suite, the timed part only runs when the PYMAZING_BENCHMARK environment variable is set.
+
+The timings depend on the machine, so no baseline is committed. Create one on the machine that runs the suite with:
+python -m pymazing.benchmark --sizes 16 32 64 --save
+"""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import os
+
+import pytest
+
+from pymazing import benchmark_baseline
+
+
+def test_compare_to_baseline():
+    baseline = {"16x16": {"generate_partial_meshes": 0.010, "render_meshes_solid[inside]": 0.020}}
+    results = {"16x16": {"generate_partial_meshes": 0.011, "render_meshes_solid[inside]": 0.030, "new_stage": 1.0}}
+    regressions = benchmark_baseline.compare_to_baseline(results, baseline, threshold=0.25)
+
+    assert regressions == [("16x16", "render_meshes_solid[inside]", 0.020, 0.030)]
+
+
+def test_report_memory():
+    pytest.importorskip("sfml")
+    from pymazing import benchmark
+
+    results = benchmark.report_memory([8])
+
+    assert results["8x8"]["cube_instances"] < results["8x8"]["chunks"] < results["8x8"]["partial_meshes"]
+
+
+@pytest.mark.skipif("PYMAZING_BENCHMARK" not in os.environ, reason="benchmarks are not enabled")
+def test_benchmark_regressions():
+    pytest.importorskip("sfml")
+    from pymazing import benchmark
+
+    if not os.path.exists(benchmark_baseline.DEFAULT_BASELINE_FILE):
+        pytest.skip("no benchmark baseline in {0}, create it with: python -m pymazing.benchmark --sizes 16 32 64 --save".format(benchmark_baseline.DEFAULT_BASELINE_FILE))
+
+    sizes = [int(size) for size in os.environ.get("PYMAZING_BENCHMARK_SIZES", "16,32,64").split(",")]
+    threshold = float(os.environ.get("PYMAZING_BENCHMARK_THRESHOLD", benchmark_baseline.DEFAULT_THRESHOLD))
+    results = benchmark.run_benchmarks(sizes)
+    regressions = benchmark_baseline.compare_to_baseline(results, benchmark_baseline.load_baseline(benchmark_baseline.DEFAULT_BASELINE_FILE), threshold)
+
+    assert regressions == []
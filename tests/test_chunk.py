@@ -0,0 +1,108 @@
+"""Chunk unit tests."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import numpy as np
+
+from pymazing import chunk, greedy_meshing, level_loader, color
+
+
+def create_blocks(size, seed):
+    random_state = np.random.RandomState(seed)
+    colors = [color.from_int(255, 0, 0), color.from_int(0, 255, 0)]
+
+    return [[colors[random_state.randint(2)] if random_state.rand() < 0.5 else None for _ in range(size)] for _ in range(size)]
+
+
+def get_world_triangles(meshes):
+    triangles = []
+
+    for mesh in meshes:
+        vertices = np.asarray(mesh.vertices)[:, :3] * mesh.scale + mesh.position
+
+        colors = mesh.colors if isinstance(mesh.colors, np.ndarray) else [color_.get_uint32_value() for color_ in mesh.colors]
+
+        for i, index in enumerate(mesh.indices):
+            triangles.append((tuple(np.round(vertices[list(index)], 6).ravel() + 0.0), int(colors[i])))
+
+    return triangles
+
+
+def test_generate_chunks():
+    blocks = create_blocks(20, 0)
+    meshes = level_loader.generate_partial_meshes(blocks)[1:]
+    chunk_grid = level_loader.generate_chunks(blocks, 8)
+
+    assert chunk_grid.shape == (3, 3)
+
+    chunks = [chunk_ for chunk_ in chunk_grid.flat if chunk_ is not None]
+    chunk_triangles = get_world_triangles([chunk_.mesh for chunk_ in chunks])
+
+    assert sorted(chunk_triangles, key=str) == sorted(get_world_triangles(meshes), key=str)
+    assert sum(chunk_.triangle_count for chunk_ in chunks) == len(chunk_triangles)
+
+    for chunk_ in chunks:
+        vertices = chunk_.mesh.vertices[:, :3] + chunk_.mesh.position
+
+        assert np.all(vertices >= chunk_.min_corner) and np.all(vertices <= chunk_.max_corner)
+        assert np.all(chunk_.min_corner[[0, 2]] >= [chunk_.x * 8, -(chunk_.y + 1) * 8])
+        assert np.all(chunk_.max_corner[[0, 2]] <= [(chunk_.x + 1) * 8, -chunk_.y * 8])
+
+
+def test_build_chunk_grid():
+    blocks = create_blocks(21, 2)
+    side_masks = level_loader.generate_side_masks(blocks)
+    color_values = level_loader.generate_color_values(blocks)
+    chunk_grid = chunk.build_chunk_grid(side_masks, color_values, 8)
+
+    for y, x in np.ndindex(chunk_grid.shape):
+        single_chunk = chunk.Chunk(x, y, 8)
+        single_chunk.build_mesh(side_masks, color_values)
+
+        if single_chunk.mesh is None:
+            assert chunk_grid[y, x] is None
+            continue
+
+        grid_chunk = chunk_grid[y, x]
+
+        assert grid_chunk.triangle_count == single_chunk.triangle_count
+        assert np.array_equal(grid_chunk.min_corner, single_chunk.min_corner)
+        assert np.array_equal(grid_chunk.max_corner, single_chunk.max_corner)
+        assert np.array_equal(grid_chunk.mesh.position, single_chunk.mesh.position)
+
+        for name in ("vertices", "indices", "colors", "normals", "centroids"):
+            assert np.array_equal(getattr(grid_chunk.mesh, name), getattr(single_chunk.mesh, name))
+
+
+def test_generate_chunks_empty():
+    chunk_grid = level_loader.generate_chunks([[None] * 5] * 3, 4)
+
+    assert chunk_grid.shape == (1, 2)
+    assert np.all(chunk_grid == None)
+
+
+def test_get_chunk_coordinates():
+    chunk_y, chunk_x = chunk.get_chunk_coordinates(np.array([8, 1, 2]), np.array([4, 0, 0]), 4, (2, 3))
+
+    assert list(chunk_y) == [0, 1] and list(chunk_x) == [0, 2]
+
+    # areas larger than the chunks cover several chunks, the ones outside the grid are left out
+    chunk_y, chunk_x = chunk.get_chunk_coordinates(np.array([1]), np.array([0]), 4, (2, 3), 10)
+
+    assert list(zip(chunk_y, chunk_x)) == [(0, 2), (1, 2)]
+
+    # smaller areas share chunks
+    chunk_y, chunk_x = chunk.get_chunk_coordinates(np.array([0, 1, 2]), np.array([0, 0, 0]), 4, (2, 3), 2)
+
+    assert list(zip(chunk_y, chunk_x)) == [(0, 0), (0, 1)]
+
+
+def test_generate_greedy_chunks():
+    blocks = create_blocks(20, 1)
+    chunk_grid = level_loader.generate_chunks(blocks, 32, True)
+    _, greedy_count = greedy_meshing.get_triangle_counts(blocks)
+
+    assert chunk_grid.shape == (1, 1)
+    assert chunk_grid[0, 0].triangle_count == greedy_count
+    assert np.array_equal(chunk_grid[0, 0].min_corner, [0.0, 0.0, -20.0])
+    assert np.array_equal(chunk_grid[0, 0].max_corner, [20.0, 1.0, 0.0])
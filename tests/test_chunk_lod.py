@@ -0,0 +1,101 @@
+"""ChunkLod unit tests."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import numpy as np
+
+from pymazing import chunk_lod, greedy_meshing, level_generator, level_loader
+
+
+def create_level():
+    blocks = level_loader.generate_blocks_from_pixels(level_generator.generate_maze_pixels(37, 29, seed=3))
+    occupancy = level_loader.generate_occupancy(blocks)
+    color_values = level_loader.generate_color_values(blocks)
+    side_masks = level_loader.generate_side_masks(blocks)
+
+    return occupancy, color_values, side_masks
+
+
+def test_downsample_blocks():
+    occupancy = np.array([[1, 1, 0, 0], [1, 0, 1, 0]], dtype=bool)
+    color_values = np.array([[5, 7, 0, 0], [7, 0, 9, 0]], dtype=np.uint32)
+    cell_occupancy, cell_colors = chunk_lod.downsample_blocks(occupancy, color_values, 2)
+
+    assert np.array_equal(cell_occupancy, [[True, False]])
+    assert np.array_equal(cell_colors, [[7, 0]])
+
+
+def test_build_lod_mesh():
+    occupancy, color_values, side_masks = create_level()
+    chunk_grid = level_loader.generate_chunks_from_arrays(side_masks, color_values, 8, greedy=True)
+
+    for chunk_ in chunk_grid.flat:
+        if chunk_ is None:
+            continue
+
+        # without merging cells the coarse mesh is the greedy mesh of the chunk
+        lod_mesh = chunk_lod.build_lod_mesh(occupancy, color_values, chunk_.x, chunk_.y, 8, 1)
+        assert len(lod_mesh.indices) == chunk_.triangle_count
+        assert np.allclose(lod_mesh.position, chunk_.mesh.position)
+
+        triangle_count = len(lod_mesh.indices)
+
+        for factor in (2, 4, 8):
+            lod_mesh = chunk_lod.build_lod_mesh(occupancy, color_values, chunk_.x, chunk_.y, 8, factor)
+
+            if lod_mesh is None:
+                continue
+
+            # the coarse faces stay inside the chunk and the level
+            vertices = lod_mesh.vertices[:, :3] + lod_mesh.position
+            assert np.all(vertices[:, 0] >= chunk_.x * 8) and np.all(vertices[:, 0] <= min((chunk_.x + 1) * 8, 37))
+            assert np.all(-vertices[:, 2] >= chunk_.y * 8) and np.all(-vertices[:, 2] <= min((chunk_.y + 1) * 8, 29))
+            assert len(lod_mesh.indices) <= triangle_count
+
+
+def test_get_level():
+    occupancy, color_values, _ = create_level()
+    lod = chunk_lod.ChunkLod(occupancy, color_values, 8, [10.0, 20.0], hysteresis=2.0)
+
+    # coarser only past the distance and the hysteresis, finer only back under the distance minus the hysteresis
+    assert [lod.get_level(0, 0, distance) for distance in (5.0, 11.0, 12.5, 9.0, 7.5, 30.0, 19.0, 17.5)] == [0, 0, 1, 1, 0, 2, 2, 1]
+    assert lod.get_level(1, 0, 30.0) == 2
+
+
+def test_select_meshes():
+    occupancy, color_values, side_masks = create_level()
+    chunk_grid = level_loader.generate_chunks_from_arrays(side_masks, color_values, 8)
+    meshes = [chunk_.mesh for chunk_ in chunk_grid.flat if chunk_ is not None]
+    lod = chunk_lod.ChunkLod(occupancy, color_values, 8, [4.0, 8.0, 16.0, 32.0], hysteresis=1.0)
+
+    near_meshes = lod.select_meshes(meshes, np.array([18.0, 0.5, -14.0, 1.0]))
+    far_meshes = lod.select_meshes(meshes, np.array([500.0, 0.5, -500.0, 1.0]))
+
+    assert len(near_meshes) <= len(meshes)
+    assert sum(len(mesh_.indices) for mesh_ in far_meshes) < sum(len(mesh_.indices) for mesh_ in near_meshes) < sum(len(mesh_.indices) for mesh_ in meshes)
+    assert all(level == 3 for level in lod.levels.values())
+
+    # the coarse meshes are reused until the full chunk mesh is replaced
+    assert lod.select_meshes(meshes, np.array([500.0, 0.5, -500.0, 1.0])) == far_meshes
+    occupancy[:] = False
+    empty_meshes = [greedy_meshing.create_face_mesh(np.array([1]), np.array([[0, 0, 1, 1]]), np.array([1]))] + meshes[1:]
+    assert len(lod.select_meshes(empty_meshes, np.array([500.0, 0.5, -500.0, 1.0]))) == len(far_meshes) - 1
+
+
+def test_prune():
+    occupancy, color_values, side_masks = create_level()
+    chunk_grid = level_loader.generate_chunks_from_arrays(side_masks, color_values, 8)
+    meshes = [chunk_.mesh for chunk_ in chunk_grid.flat if chunk_ is not None]
+    lod = chunk_lod.ChunkLod(occupancy, color_values, 8, [4.0], hysteresis=1.0)
+    lod.select_meshes(meshes, np.array([500.0, 0.5, -500.0, 1.0]))
+    lod.prune(chunk_grid)
+
+    assert len(lod.meshes) == len(meshes)
+
+    # dropped chunks and replaced meshes are forgotten
+    chunk_grid[0, 0] = None
+    chunk_grid[0, 1].mesh = greedy_meshing.create_face_mesh(np.array([1]), np.array([[8, 0, 9, 1]]), np.array([1]))
+    lod.prune(chunk_grid)
+
+    assert (0, 0) not in lod.levels and (0, 0, 1) not in lod.meshes and (1, 0, 1) not in lod.meshes
+    assert len(lod.meshes) == len(meshes) - 2
@@ -0,0 +1,103 @@
+"""ChunkStreamer unit tests."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import time
+
+import numpy as np
+
+from pymazing import chunk_streamer, level_generator, level_loader
+
+
+def create_streamer(load_distance, memory_budget=chunk_streamer.DEFAULT_MEMORY_BUDGET):
+    blocks = level_loader.generate_blocks_from_pixels(level_generator.generate_maze_pixels(64, 64, seed=5))
+    streamer = chunk_streamer.ChunkStreamer(level_loader.generate_side_masks(blocks), level_loader.generate_color_values(blocks), 8, False, load_distance, memory_budget)
+
+    return streamer, level_loader.generate_chunks(blocks, 8)
+
+
+def test_build_requests():
+    streamer, chunk_grid = create_streamer(12.0)
+    streamer.update([4.0, 0.5, -4.0])
+
+    # the nearest chunk is requested first
+    assert streamer.requests[0] == (0, 0)
+
+    streamer.build_requests()
+
+    assert np.array_equal(np.argwhere(streamer.loaded), [[0, 0], [0, 1], [0, 2], [1, 0], [1, 1], [2, 0]])
+    assert streamer.memory_size == sum(chunk_streamer.get_mesh_memory_size(mesh) for mesh in streamer.get_meshes())
+
+    for y, x in np.argwhere(streamer.loaded):
+        assert streamer.chunk_grid[y, x].triangle_count == chunk_grid[y, x].triangle_count
+        assert np.array_equal(streamer.chunk_grid[y, x].mesh.vertices, chunk_grid[y, x].mesh.vertices)
+
+
+def test_memory_budget():
+    streamer, _ = create_streamer(4.0, 1)
+
+    # over the budget only one chunk is built
+    streamer.update([4.0, 0.5, -4.0])
+    streamer.build_requests()
+
+    assert np.count_nonzero(streamer.loaded) == 1
+
+    # the chunks within the load distance are kept, the far ones are dropped
+    streamer.update([4.0, 0.5, -8.0])
+
+    assert streamer.loaded[0, 0]
+
+    streamer.update([60.0, 0.5, -60.0])
+    streamer.build_requests()
+
+    assert np.argwhere(streamer.loaded).tolist() == [[7, 7]]
+    assert streamer.memory_size == streamer.memory_sizes[7, 7]
+
+
+def test_invalidate_chunk():
+    streamer, _ = create_streamer(4.0)
+    streamer.update([4.0, 0.5, -4.0])
+    streamer.build_requests()
+    old_chunk = streamer.chunk_grid[0, 0]
+
+    # the old chunk is shown until the rebuilt one replaces it
+    streamer.side_masks[0, 0] = 0
+    streamer.invalidate_chunk(0, 0)
+
+    assert streamer.chunk_grid[0, 0] is old_chunk
+    assert streamer.requests == [(0, 0)]
+
+    streamer.build_requests()
+
+    assert streamer.chunk_grid[0, 0].triangle_count < old_chunk.triangle_count
+    assert streamer.memory_size == sum(chunk_streamer.get_mesh_memory_size(mesh) for mesh in streamer.get_meshes())
+
+    # a build that started before an edit is discarded
+    streamer.invalidate_chunk(0, 0)
+    streamer.requests = []
+    version = streamer.versions[0, 0]
+    streamer.versions[0, 0] += 1
+    streamer.build_chunk(0, 0)
+    streamer.versions[0, 0] = version
+
+    assert streamer.built_versions[0, 0] != version
+
+
+def test_worker_thread():
+    streamer, _ = create_streamer(15.0)
+    y, x = np.mgrid[0:8, 0:8]
+    expected_loaded = streamer.get_chunk_distances(x, y, [32.0, 0.5, -32.0]) <= 15.0
+
+    streamer.start()
+    streamer.update([32.0, 0.5, -32.0])
+
+    for _ in range(500):
+        if np.array_equal(streamer.loaded, expected_loaded):
+            break
+
+        time.sleep(0.01)
+
+    streamer.stop()
+
+    assert np.array_equal(streamer.loaded, expected_loaded)
+    assert len(streamer.requests) == 0
@@ -2,6 +2,8 @@
 # Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
 # License: MIT, see the LICENSE file.
 
+import numpy as np
+
 from pymazing import color
 
 
@@ -9,3 +11,34 @@ def test_get_uint32_value():
     my_color = color.from_int(0xaa, 0xbb, 0xcc, 0xff)
     value = my_color.get_uint32_value()
     assert value == 0xffccbbaa
+
+
+def test_from_uint32_values():
+    vectors = color.from_uint32_values([0xffccbbaa, 0x00000000])
+
+    assert vectors.shape == (2, 4)
+    assert list(vectors[0] * 255.0) == [0xaa, 0xbb, 0xcc, 0xff]
+    assert list(vectors[1]) == [0.0, 0.0, 0.0, 0.0]
+
+
+def test_get_uint32_value_cached():
+    my_color = color.from_int(1, 2, 3)
+
+    assert my_color.get_uint32_value() is my_color.get_uint32_value()
+
+
+def test_to_uint32_values():
+    values = np.array([0xffccbbaa, 0x80010203, 0x00000000], dtype=np.uint32)
+
+    assert list(color.to_uint32_values(color.from_uint32_values(values))) == list(values)
+    assert color.to_uint32_value(color.from_int(0xaa, 0xbb, 0xcc).get_vector()) == 0xffccbbaa
+
+
+def test_palette():
+    palette = color.Palette()
+    red = palette.get_color(0xff0000ff)
+
+    assert palette.get_index(0xff00ff00) == 1
+    assert palette.get_color(0xff0000ff) is red
+    assert len(palette) == 2
+    assert red.get_vector().tolist() == [1.0, 0.0, 0.0, 1.0]
@@ -0,0 +1,64 @@
+"""Fog unit tests."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import numpy as np
+
+from pymazing import fog, world, renderer, color
+
+
+def test_get_amount():
+    my_fog = fog.Fog()
+    my_fog.start = 10.0
+    my_fog.end = 30.0
+
+    assert np.allclose(my_fog.get_amount(np.array([0.0, 10.0, 20.0, 30.0, 50.0])), [0.0, 0.0, 0.5, 1.0, 1.0])
+
+
+def test_apply():
+    my_fog = fog.Fog()
+    my_fog.color = color.from_int(255, 255, 255)
+    my_fog.start = 10.0
+    my_fog.end = 30.0
+    color_vector = np.array([0.0, 0.5, 1.0, 0.5])
+
+    assert np.allclose(my_fog.apply(color_vector, 5.0), color_vector)
+    assert np.allclose(my_fog.apply(color_vector, 20.0), [0.5, 0.75, 1.0, 0.5])
+    assert np.allclose(my_fog.apply(color_vector, 40.0), [1.0, 1.0, 1.0, 0.5])
+
+
+def test_apply_fog():
+    my_world = world.World()
+    color_vector = np.array([0.2, 0.4, 0.6, 1.0])
+
+    assert renderer.apply_fog(my_world, color_vector, 1000.0) is color_vector
+
+    my_world.fog_enabled = True
+    assert np.allclose(renderer.apply_fog(my_world, color_vector, 1000.0), [0.0, 0.0, 0.0, 1.0])
+
+
+def test_fog_governor():
+    my_fog = fog.Fog()
+    my_fog.start = 40.0
+    my_fog.end = 100.0
+    governor = fog.FogGovernor(my_fog, 0.02, 30.0, 100.0, step=5.0, smoothing=1.0)
+
+    # too slow frames bring the fog closer, down to the minimum
+    assert governor.update(0.04)
+    assert my_fog.end == 95.0 and np.isclose(my_fog.start, 38.0)
+
+    for _ in range(20):
+        governor.update(0.04)
+
+    assert my_fog.end == 30.0
+    assert not governor.update(0.04)
+
+    # frame times near the target keep the distance
+    assert not governor.update(0.021)
+    assert not governor.update(0.019)
+
+    # fast frames move it back, up to the maximum
+    for _ in range(20):
+        governor.update(0.01)
+
+    assert my_fog.end == 100.0 and np.isclose(my_fog.start, 40.0)
@@ -0,0 +1,51 @@
+"""FpsCounter unit tests."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import json
+
+from pymazing import fps_counter
+
+
+def test_record_frame_time():
+    counter = fps_counter.FpsCounter(4)
+
+    for frame_time in [0.1, 0.2, 0.3, 0.4, 0.5, 0.6]:
+        counter.record_frame_time(frame_time)
+
+    frame_times = counter.get_frame_times()
+
+    assert len(frame_times) == 4
+    assert frame_times[0] == 0.3
+    assert frame_times[3] == 0.6
+
+
+def test_get_percentiles():
+    counter = fps_counter.FpsCounter(100)
+
+    for i in range(100):
+        counter.record_frame_time(0.010)
+
+    counter.record_frame_time(0.100)
+    percentiles = counter.get_percentiles()
+
+    assert abs(percentiles["p50"] - 10.0) < 1e-9
+    assert abs(percentiles["p95"] - 10.0) < 1e-9
+    assert abs(percentiles["max"] - 100.0) < 1e-9
+
+
+def test_export_json(tmp_path):
+    counter = fps_counter.FpsCounter(10)
+
+    for frame_time in [0.01, 0.02, 0.03]:
+        counter.record_frame_time(frame_time)
+
+    file_name = str(tmp_path / "frame_times.json")
+    counter.export_json(file_name)
+
+    with open(file_name) as file:
+        data = json.load(file)
+
+    assert data["sample_count"] == 3
+    assert sum(data["histogram"]["counts"]) == 3
+    assert abs(data["percentiles_ms"]["max"] - 30.0) < 1e-9
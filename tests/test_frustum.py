@@ -0,0 +1,35 @@
+"""Frustum unit tests."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import types
+
+import numpy as np
+
+from pymazing import frustum
+
+
+def create_frustum():
+    camera = types.SimpleNamespace(position=np.array([1.0, 2.0, 3.0]),
+                                   forward_vector=np.array([0.0, 0.0, -1.0]),
+                                   up_vector=np.array([0.0, 1.0, 0.0]),
+                                   right_vector=np.array([1.0, 0.0, 0.0]),
+                                   vertical_fov=70.0, aspect_ratio=1.6, near_z=0.1, far_z=100.0)
+
+    my_frustum = frustum.Frustum()
+    my_frustum.setup_from_camera(camera)
+
+    return my_frustum
+
+
+def test_spheres_are_inside():
+    my_frustum = create_frustum()
+    random_state = np.random.RandomState(0)
+    centers = random_state.uniform(-120.0, 120.0, size=(500, 3))
+    radii = random_state.uniform(0.0, 10.0, size=500)
+    visible = my_frustum.spheres_are_inside(centers, radii)
+
+    assert visible.any() and not visible.all()
+
+    for center, radius, is_visible in zip(centers, radii, visible):
+        assert is_visible == my_frustum.sphere_is_inside(center, radius)
@@ -0,0 +1,60 @@
+"""Greedy meshing unit tests."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import numpy as np
+
+from pymazing import greedy_meshing, level_generator, level_loader, mesh
+
+SIDE_NORMALS = {mesh.FRONT: [0, 0, 1], mesh.BACK: [0, 0, -1], mesh.LEFT: [-1, 0, 0], mesh.RIGHT: [1, 0, 0], mesh.TOP: [0, 1, 0]}
+
+
+def test_find_runs():
+    keys = np.array([[1, 1, 2, 0, 2],
+                     [0, 0, 0, 0, 0],
+                     [3, 3, 3, 3, 3]])
+    rows, starts, ends, run_keys = greedy_meshing.find_runs(keys)
+
+    assert list(zip(rows, starts, ends, run_keys)) == [(0, 0, 2, 1), (0, 2, 3, 2), (0, 4, 5, 2), (2, 0, 5, 3)]
+
+
+def test_find_rectangles():
+    random_state = np.random.RandomState(0)
+    keys = random_state.randint(0, 3, (40, 30)) * random_state.randint(0, 2, (40, 1))
+    keys[10:20, 5:25] = 7
+    covered = np.zeros(keys.shape, dtype=int)
+
+    for x0, y0, x1, y1 in greedy_meshing.find_rectangles(keys):
+        assert np.all(keys[y0:y1, x0:x1] == keys[y0, x0])
+        covered[y0:y1, x0:x1] += 1
+
+    assert np.array_equal(covered, (keys != 0).astype(int))
+    assert len(greedy_meshing.find_rectangles(np.zeros((3, 3), dtype=int))) == 0
+
+
+def test_generate_greedy_meshes():
+    blocks = level_loader.generate_blocks_from_pixels(level_generator.generate_maze_pixels(24, 24, 3))
+    side_masks = level_loader.generate_side_masks(blocks)
+    meshes = greedy_meshing.generate_greedy_meshes(blocks)
+    mesh_ = meshes[1]
+
+    assert len(meshes) == 2
+
+    vertices = mesh_.vertices[:, :3] + mesh_.position
+    sides, rectangles = greedy_meshing.generate_faces(level_loader.generate_color_values(blocks), side_masks)
+    area = 0.0
+
+    for i, side in enumerate(sides):
+        v0, v1, v2 = vertices[mesh_.indices[2 * i]]
+        normal = np.cross(v1 - v0, v2 - v0)
+        area += np.linalg.norm(normal)
+
+        # the faces point out of the blocks like the cube sides
+        assert np.allclose(normal / np.linalg.norm(normal), SIDE_NORMALS[side])
+
+    # every visible unit side is covered exactly once
+    assert np.isclose(area, np.sum(np.unpackbits(side_masks[:, :, np.newaxis], axis=2)))
+
+    partial_count, greedy_count = greedy_meshing.get_triangle_counts(blocks)
+
+    assert greedy_count == len(mesh_.indices) < partial_count
@@ -0,0 +1,110 @@
+"""LevelEditor unit tests."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import types
+
+import numpy as np
+
+from pymazing import level_editor, level_generator, level_loader, color, quadtree, frustum, renderer
+
+EDITS = [(0, 0, 0xff0000ff), (7, 3, 0), (8, 3, 0xff00ff00), (19, 12, 0xff00ff00), (19, 12, 0), (5, 5, 0xffff0000)]
+
+
+def create_editor(chunk_size=8, mesh_grid=False):
+    blocks = level_loader.generate_blocks_from_pixels(level_generator.generate_maze_pixels(20, 13, seed=7))
+    occupancy = level_loader.generate_occupancy(blocks)
+    color_values = level_loader.generate_color_values(blocks)
+    side_masks = level_loader.generate_side_masks(blocks)
+
+    if mesh_grid:
+        grid = level_loader.generate_mesh_grid(blocks, level_loader.generate_partial_meshes(blocks))
+        return level_editor.LevelEditor(occupancy, color_values, side_masks, blocks=blocks, mesh_grid=grid), blocks
+
+    chunk_grid = level_loader.generate_chunks(blocks, chunk_size)
+
+    return level_editor.LevelEditor(occupancy, color_values, side_masks, chunk_grid, chunk_size), blocks
+
+
+def edit_blocks(blocks, x, y, color_value):
+    blocks[y][x] = color.from_uint32_value(color_value) if color_value != 0 else None
+
+
+def test_update_side_masks():
+    editor, blocks = create_editor()
+
+    for x, y, color_value in EDITS:
+        editor.set_block(x, y, color_value)
+        edit_blocks(blocks, x, y, color_value)
+
+        assert np.array_equal(editor.occupancy, level_loader.generate_occupancy(blocks))
+        assert np.array_equal(editor.color_values, level_loader.generate_color_values(blocks))
+        assert np.array_equal(editor.side_masks, level_loader.generate_side_masks(blocks))
+
+
+def test_set_block_chunks():
+    editor, blocks = create_editor()
+
+    # a block on the edge of a chunk changes the neighboring chunk too
+    assert editor.get_affected_chunks(8, 3) == [(0, 0), (1, 0)]
+    assert editor.get_affected_chunks(19, 12) == [(2, 1)]
+
+    for x, y, color_value in EDITS:
+        old_chunk_grid = editor.chunk_grid.copy()
+        changed_meshes = editor.set_block(x, y, color_value)
+        edit_blocks(blocks, x, y, color_value)
+        chunk_grid = level_loader.generate_chunks(blocks, 8)
+        affected_chunks = editor.get_affected_chunks(x, y)
+
+        assert len(changed_meshes) == len(affected_chunks)
+
+        for (chunk_y, chunk_x), chunk_ in np.ndenumerate(editor.chunk_grid):
+            if (chunk_x, chunk_y) not in affected_chunks:
+                assert chunk_ is old_chunk_grid[chunk_y, chunk_x]
+
+            assert (chunk_ is None) == (chunk_grid[chunk_y, chunk_x] is None)
+
+            if chunk_ is not None:
+                assert chunk_.triangle_count == chunk_grid[chunk_y, chunk_x].triangle_count
+                assert np.array_equal(chunk_.mesh.vertices, chunk_grid[chunk_y, chunk_x].mesh.vertices)
+                assert np.array_equal(chunk_.mesh.colors, chunk_grid[chunk_y, chunk_x].mesh.colors)
+
+
+def test_set_block_meshes():
+    editor, blocks = create_editor(mesh_grid=True)
+
+    for x, y, color_value in EDITS:
+        changed_meshes = editor.set_block(x, y, color_value)
+        mesh_grid = level_loader.generate_mesh_grid(blocks, level_loader.generate_partial_meshes(blocks))
+
+        assert len(changed_meshes) == len(level_editor.get_neighborhood(x, y, 20, 13))
+
+        for (cell_y, cell_x), mesh in np.ndenumerate(editor.mesh_grid):
+            assert (mesh is None) == (mesh_grid[cell_y, cell_x] is None)
+
+            if mesh is not None:
+                assert mesh.position == mesh_grid[cell_y, cell_x].position
+                assert np.array_equal(mesh.indices, mesh_grid[cell_y, cell_x].indices)
+                assert mesh.colors[0].get_uint32_value() == mesh_grid[cell_y, cell_x].colors[0].get_uint32_value()
+
+
+def test_set_block_quadtree():
+    editor, blocks = create_editor(mesh_grid=True)
+    tree = quadtree.QuadTree([mesh for mesh in editor.mesh_grid.flat if mesh is not None])
+
+    camera = types.SimpleNamespace(position=np.array([10.0, 10.0, 5.0]), forward_vector=np.array([0.0, -0.5, -1.0]) / np.sqrt(1.25),
+                                   up_vector=np.array([0.0, 1.0, -0.5]) / np.sqrt(1.25), right_vector=np.array([1.0, 0.0, 0.0]),
+                                   vertical_fov=70.0, aspect_ratio=1.6, near_z=0.1, far_z=30.0)
+    my_frustum = frustum.Frustum()
+    my_frustum.setup_from_camera(camera)
+
+    # a block added to an empty cell and removed again, as GameStateLoadedLevel.edit_block does it
+    for color_value in [0xff0000ff, 0]:
+        for old_mesh, new_mesh in editor.set_block(1, 1, color_value):
+            tree.replace_mesh(old_mesh, new_mesh)
+
+        current_meshes = [mesh for mesh in editor.mesh_grid.flat if mesh is not None]
+        visible_meshes = tree.find_visible(my_frustum)
+
+        assert len(visible_meshes) > 0
+        assert sorted(map(id, visible_meshes)) == sorted(map(id, renderer.cull_meshes(current_meshes, my_frustum)))
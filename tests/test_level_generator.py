@@ -0,0 +1,34 @@
+"""LevelGenerator unit tests."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import numpy as np
+
+from pymazing import level_generator, level_loader
+
+
+def test_generate_maze_pixels():
+    pixels = level_generator.generate_maze_pixels(17, 9, seed=1)
+    walls = pixels[:, :, 3] > 0
+
+    assert pixels.shape == (9, 17, 4)
+    assert walls[0, :].all() and walls[-1, :].all()
+    assert walls[:, 0].all() and walls[:, -1].all()
+    assert not walls[1, 1]
+    assert np.array_equal(pixels, level_generator.generate_maze_pixels(17, 9, seed=1))
+
+
+def test_write_tga(tmp_path):
+    pixels = level_generator.generate_maze_pixels(11, 7, seed=2)
+    file_name = str(tmp_path / "maze.tga")
+    level_generator.write_tga(pixels, file_name)
+    blocks = level_loader.generate_blocks_from_tga(file_name)
+
+    assert len(blocks) == 7
+    assert len(blocks[0]) == 11
+
+    for y in range(7):
+        for x in range(11):
+            assert (blocks[y][x] is not None) == (pixels[y, x, 3] > 0)
+
+    assert blocks[0][0].r == pixels[0, 0, 0] / 255.0
@@ -2,7 +2,10 @@
 # Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
 # License: MIT, see the LICENSE file.
 
-from pymazing import level_loader, color
+import numpy as np
+import pytest
+
+from pymazing import level_loader, level_generator, color, mesh
 
 
 def test_generate_blocks_from_tga():
@@ -38,8 +41,149 @@ def test_generate_full_meshes():
 
     assert len(meshes) == 5
 
+def test_create_floor_tiles():
+    # the whole floor of a small level is covered by the tiles, the last ones are cut to the floor
+    tiles = level_loader.create_floor_tiles(20, 10, 10.0, 5.0, 100.0, tile_size=8)
+    areas = 4.0 * tiles.scales[:, 0] * tiles.scales[:, 2]
+
+    assert len(tiles) == 6
+    assert np.isclose(np.sum(areas), 24.0 * 14.0)
+    assert np.all(tiles.side_masks == mesh.TOP)
+    assert np.allclose(tiles.positions[:, 1] + tiles.scales[:, 1], 0.0)
+    assert np.isclose(np.min(tiles.positions[:, 0] - tiles.scales[:, 0]), -2.0)
+    assert np.isclose(np.max(tiles.positions[:, 0] + tiles.scales[:, 0]), 22.0)
+
+    # far tiles are left out and the rest stay aligned to the floor corner
+    tiles = level_loader.create_floor_tiles(1000, 1000, 500.0, 500.0, 20.0, tile_size=8)
+    tile_x0 = tiles.positions[:, 0] - tiles.scales[:, 0]
+
+    assert 0 < len(tiles) < 40
+    assert np.allclose((tile_x0 + 2.0) % 8.0, 0.0)
+
+
 def test_generate_partial_meshes():
     blocks = level_loader.generate_blocks_from_tga("data/level_simple.tga")
     meshes = level_loader.generate_partial_meshes(blocks)
 
     assert len(meshes) == 5
+
+def test_generate_cube_instances():
+    blocks = level_loader.generate_blocks_from_tga("data/level_simple.tga")
+    meshes = level_loader.generate_partial_meshes(blocks)
+    instances = level_loader.generate_cube_instances(blocks)
+
+    assert len(instances) == len(meshes) - 1
+
+    for i, mesh in enumerate(meshes[1:]):
+        assert list(instances.positions[i]) == mesh.position
+        assert list(instances.scales[i]) == mesh.scale
+        assert list(instances.colors[i]) == list(mesh.colors[0].get_vector())
+        assert len(mesh.indices) == 2 * bin(instances.side_masks[i]).count("1")
+
+def test_generate_blocks_from_tga_palette():
+    palette = color.Palette()
+    blocks = level_loader.generate_blocks_from_tga("data/level_simple.tga", palette)
+    reference_blocks = level_loader.generate_blocks_from_tga("data/level_simple.tga")
+
+    assert len(palette) == 4
+
+    for row, reference_row in zip(blocks, reference_blocks):
+        for block, reference_block in zip(row, reference_row):
+            assert (block is None) == (reference_block is None)
+            assert block is None or block.get_uint32_value() == reference_block.get_uint32_value()
+
+@pytest.mark.parametrize("depth", [24, 32])
+@pytest.mark.parametrize("rle", [False, True])
+def test_read_tga(tmp_path, depth, rle):
+    pixels = level_generator.generate_maze_pixels(150, 9, seed=4)
+    pixels[pixels[:, :, 3] == 0] = 0
+    pixels[1, 1:140] = [1, 2, 3, 255]
+    file_name = str(tmp_path / "level.tga")
+    level_generator.write_tga(pixels, file_name, depth, rle)
+
+    assert np.array_equal(level_loader.read_tga(file_name), pixels)
+
+def test_read_tga_invalid(tmp_path):
+    pixels = level_generator.generate_maze_pixels(5, 5)
+    file_name = str(tmp_path / "level.tga")
+
+    for rle in (False, True):
+        level_generator.write_tga(pixels, file_name, rle=rle)
+
+        with open(file_name, "rb") as file:
+            data = file.read()
+
+        with open(file_name, "wb") as file:
+            file.write(data[:-3])
+
+        with pytest.raises(Exception):
+            level_loader.read_tga(file_name)
+
+def test_load_level_arrays():
+    occupancy, colors = level_loader.load_level_arrays("data/level_simple.tga")
+    blocks = level_loader.generate_blocks_from_tga("data/level_simple.tga")
+
+    assert occupancy.shape == (4, 4)
+    assert colors.dtype == np.uint32
+
+    for y in range(4):
+        for x in range(4):
+            assert occupancy[y, x] == (blocks[y][x] is not None)
+            assert colors[y, x] == (0 if blocks[y][x] is None else blocks[y][x].get_uint32_value())
+
+def test_generate_side_masks_from_occupancy():
+    occupancy = np.array([[True, True, False],
+                          [False, True, False]])
+    side_masks = level_loader.generate_side_masks_from_occupancy(occupancy)
+    all_sides = mesh.TOP | mesh.LEFT | mesh.RIGHT | mesh.FRONT | mesh.BACK
+
+    # the level edges count as empty
+    assert side_masks[0, 0] == all_sides & ~mesh.RIGHT
+    assert side_masks[0, 1] == all_sides & ~mesh.LEFT & ~mesh.BACK
+    assert side_masks[1, 1] == all_sides & ~mesh.FRONT
+    assert side_masks[0, 2] == 0
+    assert side_masks[1, 0] == 0
+
+def test_generate_color_values():
+    blocks = level_loader.generate_blocks_from_tga("data/level_simple.tga")
+    color_values = level_loader.generate_color_values(blocks)
+
+    assert color_values.shape == (4, 4)
+    assert color_values.dtype == np.uint32
+    assert color_values[0, 0] == blocks[0][0].get_uint32_value()
+    assert color_values[0, 1] == 0
+
+
+def test_convert_tga_level(tmp_path):
+    level_file_name = str(tmp_path / "level.lvl")
+    level_loader.convert_tga_level("data/level_simple.tga", level_file_name)
+    occupancy, color_values, side_masks = level_loader.open_level(level_file_name)
+    blocks = level_loader.generate_blocks_from_tga("data/level_simple.tga")
+
+    assert level_loader.is_level_file(level_file_name)
+    assert not level_loader.is_level_file("data/level_simple.tga")
+    assert isinstance(color_values, np.memmap)
+    assert np.array_equal(occupancy, level_loader.generate_occupancy(blocks))
+    assert np.array_equal(color_values, level_loader.generate_color_values(blocks))
+    assert np.array_equal(side_masks, level_loader.generate_side_masks(blocks))
+
+    level_blocks = level_loader.generate_blocks_from_tga(level_file_name)
+
+    for row, level_row in zip(blocks, level_blocks):
+        for block, level_block in zip(row, level_row):
+            assert (block is None) == (level_block is None)
+            assert block is None or block.get_uint32_value() == level_block.get_uint32_value()
+
+def test_open_level_invalid(tmp_path):
+    file_name = str(tmp_path / "level.lvl")
+    level_loader.write_level(file_name, np.ones((3, 5), dtype=np.uint32))
+
+    with open(file_name, "rb") as file:
+        data = file.read()
+
+    for invalid_data in (data[:-1], data[:8], b"TGA" + data[3:]):
+        with open(file_name, "wb") as file:
+            file.write(invalid_data)
+
+        with pytest.raises(Exception):
+            level_loader.open_level(file_name)
@@ -0,0 +1,57 @@
+"""Mesh unit tests."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import numpy as np
+
+from pymazing import mesh, color
+
+SIDE_NORMALS = {mesh.FRONT: [0, 0, 1], mesh.BACK: [0, 0, -1], mesh.LEFT: [-1, 0, 0], mesh.RIGHT: [1, 0, 0], mesh.TOP: [0, 1, 0], mesh.BOTTOM: [0, -1, 0]}
+
+
+def test_calculate_triangle_data():
+    cube = mesh.create_partial_cube(color.from_int(255, 0, 0), mesh.TOP | mesh.LEFT)
+
+    assert cube.normals.shape == (4, 3)
+    assert np.allclose(cube.normals, [SIDE_NORMALS[side] for side in cube.triangle_sides])
+    assert np.allclose(cube.centroids[0], [-1.0, -1.0 / 3.0, -1.0 / 3.0])
+
+
+def test_get_world_normals():
+    cube = mesh.create_cube(color.from_int(255, 0, 0))
+    cube.calculate_world_matrix()
+    cube.calculate_normal_matrix()
+
+    assert cube.normal_matrix is None
+    assert cube.get_world_normals() is cube.normals
+
+    cube.scale = [0.5, 2.0, 3.0]
+    cube.rotation = [0.3, -1.2, 0.7]
+    cube.calculate_world_matrix()
+    cube.calculate_normal_matrix()
+
+    world_vertices = np.dot(cube.vertices, cube.world_matrix.T)[:, :3]
+    triangles = world_vertices[np.array(cube.indices)]
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+
+    assert np.allclose(cube.get_world_normals(), normals / np.linalg.norm(normals, axis=1)[:, np.newaxis])
+
+    normal_matrix = cube.normal_matrix
+    cube.position = [1.0, 2.0, 3.0]
+    cube.calculate_world_matrix()
+    cube.calculate_normal_matrix()
+
+    assert cube.normal_matrix is normal_matrix
+
+
+def test_compact():
+    cube = mesh.create_partial_cube(color.from_int(10, 20, 30), mesh.TOP | mesh.FRONT)
+    indices = cube.indices
+    compact_cube = cube.compact()
+
+    assert compact_cube is cube
+    assert cube.vertices.dtype == np.float32 and cube.vertices.shape == (8, 4)
+    assert cube.indices.dtype == np.int32 and cube.indices.tolist() == indices
+    assert cube.colors.dtype == np.uint32 and list(cube.colors) == [0xff1e140a] * 4
+    assert list(cube.triangle_sides) == [mesh.FRONT, mesh.FRONT, mesh.TOP, mesh.TOP]
+    assert not hasattr(cube, "__dict__")
@@ -0,0 +1,113 @@
+"""Mesh cache unit tests."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import os
+
+import numpy as np
+
+from pymazing import mesh_cache, level_generator, level_loader
+
+
+def assert_chunk_grids_equal(chunk_grid, other_chunk_grid):
+    assert chunk_grid.shape == other_chunk_grid.shape
+
+    for chunk_, other_chunk in zip(chunk_grid.flat, other_chunk_grid.flat):
+        assert (chunk_ is None) == (other_chunk is None)
+
+        if chunk_ is None:
+            continue
+
+        assert (chunk_.x, chunk_.y, chunk_.size, chunk_.triangle_count) == (other_chunk.x, other_chunk.y, other_chunk.size, other_chunk.triangle_count)
+        assert np.array_equal(chunk_.min_corner, other_chunk.min_corner)
+        assert np.array_equal(chunk_.max_corner, other_chunk.max_corner)
+        assert chunk_.mesh.position == other_chunk.mesh.position
+        assert chunk_.mesh.bounding_radius == other_chunk.mesh.bounding_radius
+
+        for name in mesh_cache.MESH_FIELDS:
+            assert np.array_equal(getattr(chunk_.mesh, name), getattr(other_chunk.mesh, name))
+
+
+def test_pack_chunks():
+    blocks = level_loader.generate_blocks_from_pixels(level_generator.generate_maze_pixels(21, 13, seed=2))
+    chunk_grid = level_loader.generate_chunks(blocks, 8)
+
+    assert_chunk_grids_equal(mesh_cache.unpack_chunks(mesh_cache.pack_chunks(chunk_grid)), chunk_grid)
+
+    empty_chunk_grid = level_loader.generate_chunks([[None] * 5] * 3, 4)
+
+    assert_chunk_grids_equal(mesh_cache.unpack_chunks(mesh_cache.pack_chunks(empty_chunk_grid)), empty_chunk_grid)
+
+
+def test_load_or_generate_chunks(tmp_path):
+    file_name = str(tmp_path / "level.tga")
+    level_generator.write_tga(level_generator.generate_maze_pixels(21, 13, seed=2), file_name)
+    blocks = level_loader.generate_blocks_from_tga(file_name)
+
+    chunk_grid, _, _, _ = mesh_cache.load_or_generate_chunks(file_name, 8)
+    cached_chunk_grid, cached_occupancy, cached_color_values, cached_side_masks = mesh_cache.load_or_generate_chunks(file_name, 8)
+
+    assert_chunk_grids_equal(chunk_grid, level_loader.generate_chunks(blocks, 8))
+    assert_chunk_grids_equal(cached_chunk_grid, chunk_grid)
+    assert isinstance(cached_chunk_grid[0, 0].mesh.vertices, np.memmap)
+    assert np.array_equal(cached_occupancy, level_loader.generate_occupancy(blocks))
+    assert np.array_equal(cached_color_values, level_loader.generate_color_values(blocks))
+    assert np.array_equal(cached_side_masks, level_loader.generate_side_masks(blocks))
+    assert len(os.listdir(file_name + ".mesh")) == 1
+
+    # changing the options or the level replaces the old entry
+    mesh_cache.load_or_generate_chunks(file_name, 8, True)
+    level_generator.write_tga(level_generator.generate_maze_pixels(21, 13, seed=3), file_name)
+    chunk_grid, _, _, _ = mesh_cache.load_or_generate_chunks(file_name, 8)
+
+    assert len(os.listdir(file_name + ".mesh")) == 1
+    assert_chunk_grids_equal(chunk_grid, level_loader.generate_chunks(level_loader.generate_blocks_from_tga(file_name), 8))
+
+
+def test_load_or_generate_chunks_without_cache(tmp_path, monkeypatch):
+    file_name = str(tmp_path / "level.tga")
+    level_generator.write_tga(level_generator.generate_maze_pixels(21, 13, seed=2), file_name)
+
+    def fail(*args, **kwargs):
+        raise PermissionError("read-only")
+
+    # a cache that cannot be written falls back to the generated arrays
+    monkeypatch.setattr(mesh_cache, "save_cache_entry", fail)
+    chunk_grid, _, _, _ = mesh_cache.load_or_generate_chunks(file_name, 8)
+
+    assert_chunk_grids_equal(chunk_grid, level_loader.generate_chunks(level_loader.generate_blocks_from_tga(file_name), 8))
+    assert not isinstance(chunk_grid[0, 0].mesh.vertices, np.memmap)
+
+
+def test_evict_stale_entries(tmp_path):
+    for entry in ("old", "new", "other.tmp"):
+        (tmp_path / entry).mkdir()
+
+    mesh_cache.evict_stale_entries(str(tmp_path), "new")
+
+    assert sorted(os.listdir(str(tmp_path))) == ["new", "other.tmp"]
+
+
+def test_load_or_generate_chunks_native(tmp_path):
+    file_name = str(tmp_path / "level.lvl")
+    blocks = level_loader.generate_blocks_from_pixels(level_generator.generate_maze_pixels(21, 13, seed=2))
+    level_loader.write_level(file_name, level_loader.generate_color_values(blocks))
+
+    mesh_cache.load_or_generate_chunks(file_name, 8)
+    chunk_grid, occupancy, color_values, side_masks = mesh_cache.load_or_generate_chunks(file_name, 8)
+    entry_directory = os.path.join(file_name + ".mesh", os.listdir(file_name + ".mesh")[0])
+
+    # the level arrays are not duplicated in the cache, they are mapped from the level file
+    assert_chunk_grids_equal(chunk_grid, level_loader.generate_chunks(blocks, 8))
+    assert not os.path.exists(os.path.join(entry_directory, "occupancy.npy"))
+    assert isinstance(occupancy, np.memmap) and isinstance(side_masks, np.memmap)
+    assert np.array_equal(color_values, level_loader.generate_color_values(blocks))
+
+    # a rewritten level file gets a new key
+    cache_key = mesh_cache.get_cache_key(file_name, 8, False)
+    blocks = level_loader.generate_blocks_from_pixels(level_generator.generate_maze_pixels(21, 13, seed=3))
+    level_loader.write_level(file_name, level_loader.generate_color_values(blocks))
+    os.utime(file_name, ns=(0, os.stat(file_name).st_mtime_ns + 1000000000))
+
+    assert mesh_cache.get_cache_key(file_name, 8, False) != cache_key
+    assert_chunk_grids_equal(mesh_cache.load_or_generate_chunks(file_name, 8)[0], level_loader.generate_chunks(blocks, 8))
@@ -0,0 +1,42 @@
+"""Parallel meshing unit tests."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import numpy as np
+import pytest
+
+from pymazing import parallel_meshing, level_generator, level_loader, mesh_cache
+
+
+def test_get_bands():
+    assert parallel_meshing.get_bands(40, 8, 2) == [(0, 16), (16, 40)]
+    assert parallel_meshing.get_bands(40, 8, 3) == [(0, 8), (8, 24), (24, 40)]
+    assert parallel_meshing.get_bands(10, 16, 4) == [(0, 10)]
+
+
+@pytest.mark.parametrize("greedy", [False, True])
+def test_generate_chunks_parallel(greedy):
+    blocks = level_loader.generate_blocks_from_pixels(level_generator.generate_maze_pixels(37, 45, seed=8))
+    occupancy = level_loader.generate_occupancy(blocks)
+    color_values = level_loader.generate_color_values(blocks)
+    side_masks = level_loader.generate_side_masks(blocks)
+
+    chunk_grid, parallel_side_masks = parallel_meshing.generate_chunks_parallel(occupancy, color_values, 8, greedy, 3)
+    serial_chunk_grid = level_loader.generate_chunks_from_arrays(side_masks, color_values, 8, greedy)
+
+    assert np.array_equal(parallel_side_masks, side_masks)
+    assert chunk_grid.shape == serial_chunk_grid.shape
+
+    for chunk_, serial_chunk in zip(chunk_grid.flat, serial_chunk_grid.flat):
+        assert (chunk_.x, chunk_.y, chunk_.triangle_count) == (serial_chunk.x, serial_chunk.y, serial_chunk.triangle_count)
+        assert np.array_equal(chunk_.min_corner, serial_chunk.min_corner)
+        assert np.array_equal(chunk_.max_corner, serial_chunk.max_corner)
+        assert chunk_.mesh.position == serial_chunk.mesh.position
+
+        for name in mesh_cache.MESH_FIELDS:
+            assert np.array_equal(getattr(chunk_.mesh, name), getattr(serial_chunk.mesh, name))
+
+    if not greedy:
+        partial_meshes = level_loader.generate_partial_meshes(blocks)[1:]
+
+        assert sum(chunk_.triangle_count for chunk_ in chunk_grid.flat) == sum(len(mesh.indices) for mesh in partial_meshes)
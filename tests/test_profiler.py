@@ -0,0 +1,38 @@
+"""Profiler unit tests."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import os
+
+from pymazing import profiler
+
+
+def busy_leaf():
+    return sum(i * i for i in range(20000))
+
+
+def busy_root():
+    return busy_leaf() + busy_leaf()
+
+
+def test_frame_profiler(tmp_path):
+    frame_profiler = profiler.FrameProfiler(str(tmp_path))
+    frame_profiler.start(2, "level")
+
+    for _ in range(2):
+        busy_root()
+        frame_profiler.tick()
+
+    assert frame_profiler.profile is None
+
+    file_names = sorted(os.listdir(str(tmp_path)))
+
+    assert len(file_names) == 2
+    assert file_names[0].startswith("level-")
+    assert file_names[0].endswith(".folded")
+    assert file_names[1].endswith(".pstats")
+
+    with open(os.path.join(str(tmp_path), file_names[0])) as file:
+        stacks = [line.rsplit(" ", 1)[0] for line in file]
+
+    assert any("busy_root (test_profiler.py:14);busy_leaf (test_profiler.py:10)" in stack for stack in stacks)
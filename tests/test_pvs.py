@@ -0,0 +1,87 @@
+"""PVS unit tests."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import os
+import types
+
+import numpy as np
+import pytest
+
+from pymazing import pvs
+
+
+def create_occupancy():
+    # two rooms separated by a wall, the left room has a pillar
+    occupancy = np.zeros((5, 9), dtype=bool)
+    occupancy[:, 4] = True
+    occupancy[2, 1] = True
+    occupancy[2, 7] = True
+
+    return occupancy
+
+
+def test_generate_pvs():
+    my_pvs = pvs.generate_pvs(create_occupancy(), ray_count=64)
+    camera = types.SimpleNamespace(position=np.array([0.5, 0.5, -0.5]))
+    visible_blocks = set(zip(*my_pvs.find_visible_blocks(camera)))
+
+    assert (1, 2) in visible_blocks
+    assert (4, 0) in visible_blocks
+    assert (7, 2) not in visible_blocks
+
+    # the clusters beyond the distance are left out
+    visible_x, _ = my_pvs.find_visible_clusters(camera, 3.0)
+
+    assert 1 in visible_x and 4 not in visible_x
+
+    camera.position = np.array([1.5, 0.5, -2.5])
+
+    assert my_pvs.find_visible_blocks(camera) is None
+
+
+def test_load_or_generate_pvs(tmp_path):
+    file_name = str(tmp_path / "level.tga")
+
+    with open(file_name, "wb") as file:
+        file.write(b"level data")
+
+    occupancy = create_occupancy()
+    my_pvs = pvs.load_or_generate_pvs(file_name, occupancy, cluster_size=2, ray_count=64)
+    cached_pvs = pvs.load_or_generate_pvs(file_name, occupancy, cluster_size=2, ray_count=64)
+
+    assert my_pvs.cluster_count == 15
+    assert np.array_equal(my_pvs.bitsets, cached_pvs.bitsets)
+    assert np.array_equal(my_pvs.cell_indices, cached_pvs.cell_indices)
+
+
+def test_load_or_generate_pvs_without_cache(tmp_path, monkeypatch):
+    file_name = str(tmp_path / "level.tga")
+
+    with open(file_name, "wb") as file:
+        file.write(b"level data")
+
+    def fail(*args, **kwargs):
+        raise PermissionError("read-only")
+
+    # a cache that cannot be written falls back to the generated PVS
+    occupancy = create_occupancy()
+    monkeypatch.setattr(pvs.np, "savez_compressed", fail)
+    my_pvs = pvs.load_or_generate_pvs(file_name, occupancy, cluster_size=2, ray_count=64)
+
+    assert my_pvs.cluster_count == 15
+    assert not os.path.exists(file_name + ".pvs.npz")
+
+
+def test_memory_limit():
+    occupancy = np.zeros((64, 64), dtype=bool)
+
+    # 4096 empty cells with 4096 single block clusters each
+    assert pvs.get_bitset_memory_size(occupancy, 1) == 4096 * 512
+    assert pvs.choose_cluster_size(occupancy, max_memory=4096 * 8) == 8
+
+    with pytest.raises(Exception, match="cluster size of at least 8"):
+        pvs.generate_pvs(occupancy, max_memory=4096 * 8)
+
+    my_pvs = pvs.generate_pvs(create_occupancy(), cluster_size=0, ray_count=16, max_memory=40 * 2)
+    assert my_pvs.cluster_size == 2
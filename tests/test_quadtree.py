@@ -0,0 +1,101 @@
+"""QuadTree unit tests."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import types
+
+import numpy as np
+
+from pymazing import quadtree, frustum, level_loader, color, renderer
+
+
+def create_frustum(position, forward_vector):
+    forward_vector = np.array(forward_vector) / np.linalg.norm(forward_vector)
+    right_vector = np.cross(forward_vector, [0.0, 1.0, 0.0])
+    right_vector /= np.linalg.norm(right_vector)
+    up_vector = np.cross(right_vector, forward_vector)
+
+    camera = types.SimpleNamespace(position=np.array(position), forward_vector=forward_vector, up_vector=up_vector, right_vector=right_vector,
+                                   vertical_fov=70.0, aspect_ratio=1.6, near_z=0.1, far_z=30.0)
+
+    my_frustum = frustum.Frustum()
+    my_frustum.setup_from_camera(camera)
+
+    return my_frustum
+
+
+def test_find_visible():
+    random_state = np.random.RandomState(0)
+    blocks = [[color.from_int(255, 0, 0) if random_state.rand() < 0.5 else None for _ in range(64)] for _ in range(64)]
+    meshes = level_loader.generate_partial_meshes(blocks)[1:]
+    tree = quadtree.QuadTree(meshes)
+
+    for position, forward_vector in [([1.0, 0.5, -1.0], [1.0, 0.0, -1.0]), ([32.0, 10.0, 5.0], [0.0, -0.5, -1.0]), ([32.0, 0.5, -32.0], [-1.0, 0.0, 0.2])]:
+        my_frustum = create_frustum(position, forward_vector)
+        visible_meshes = tree.find_visible(my_frustum)
+
+        assert 0 < len(visible_meshes) < len(meshes)
+        assert visible_meshes == renderer.cull_meshes(meshes, my_frustum)
+
+
+def test_replace_mesh():
+    random_state = np.random.RandomState(1)
+    blocks = [[color.from_int(255, 0, 0) if random_state.rand() < 0.5 else None for _ in range(32)] for _ in range(32)]
+    meshes = level_loader.generate_partial_meshes(blocks)[1:]
+    tree = quadtree.QuadTree(list(meshes))
+
+    # move a mesh, remove one and add one far from the others
+    moved_mesh = level_loader.create_block_mesh(color.from_int(0, 255, 0), 63, 40, 40)
+    added_mesh = level_loader.create_block_mesh(color.from_int(0, 0, 255), 63, -20, 10)
+    tree.replace_mesh(meshes[0], moved_mesh)
+    tree.replace_mesh(meshes[1], None)
+    tree.replace_mesh(None, added_mesh)
+    tree.replace_mesh(None, None)
+    current_meshes = [moved_mesh] + meshes[2:] + [added_mesh]
+
+    for position, forward_vector in [([40.0, 0.5, -30.0], [0.0, 0.0, -1.0]), ([-20.0, 0.5, 0.0], [0.0, 0.0, -1.0]), ([16.0, 10.0, 5.0], [0.0, -0.5, -1.0])]:
+        my_frustum = create_frustum(position, forward_vector)
+
+        assert tree.find_visible(my_frustum) == renderer.cull_meshes(current_meshes, my_frustum)
+
+    assert moved_mesh in tree.find_visible(create_frustum([40.0, 0.5, -30.0], [0.0, 0.0, -1.0]))
+    assert added_mesh in tree.find_visible(create_frustum([-20.0, 0.5, 0.0], [0.0, 0.0, -1.0]))
+
+
+def test_add_and_remove_mesh():
+    random_state = np.random.RandomState(2)
+    blocks = [[color.from_int(255, 0, 0) if random_state.rand() < 0.5 else None for _ in range(32)] for _ in range(32)]
+    meshes = level_loader.generate_partial_meshes(blocks)[1:]
+    tree = quadtree.QuadTree(list(meshes))
+
+    # a mesh added after the build and removed again must not be tested anymore
+    added_mesh = level_loader.create_block_mesh(color.from_int(0, 0, 255), 63, 10, 10)
+    tree.replace_mesh(None, added_mesh)
+    tree.replace_mesh(added_mesh, None)
+    my_frustum = create_frustum([16.0, 10.0, 5.0], [0.0, -0.5, -1.0])
+
+    assert tree.added_indices == []
+    assert tree.find_visible(my_frustum) == renderer.cull_meshes(meshes, my_frustum)
+
+    # a mesh replacing an added mesh is removed the same way
+    other_mesh = level_loader.create_block_mesh(color.from_int(0, 255, 0), 63, 12, 10)
+    tree.replace_mesh(None, added_mesh)
+    tree.replace_mesh(added_mesh, other_mesh)
+
+    assert other_mesh in tree.find_visible(my_frustum)
+
+    tree.replace_mesh(other_mesh, None)
+
+    assert tree.find_visible(my_frustum) == renderer.cull_meshes(meshes, my_frustum)
+
+
+def test_box_is_inside():
+    my_frustum = create_frustum([0.0, 0.0, 0.0], [0.0, 0.0, -1.0])
+
+    assert my_frustum.box_is_inside(np.array([-1.0, -1.0, -6.0]), np.array([1.0, 1.0, -4.0]))[0] == frustum.INSIDE
+    assert my_frustum.box_is_inside(np.array([-1.0, -1.0, 4.0]), np.array([1.0, 1.0, 6.0]))[0] == frustum.OUTSIDE
+
+    result, plane_mask = my_frustum.box_is_inside(np.array([-1.0, -1.0, -35.0]), np.array([1.0, 1.0, -25.0]))
+
+    assert result == frustum.INTERSECTING
+    assert plane_mask == 1 << frustum.FAR
@@ -0,0 +1,21 @@
+"""Renderer unit tests."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import numpy as np
+
+from pymazing import renderer, mesh, color, level_loader
+
+
+def test_find_visible_block_sides():
+    block = level_loader.create_block_mesh(color.from_int(255, 0, 0), mesh.TOP | mesh.LEFT | mesh.FRONT, 2, 3)
+    rotated_cube = mesh.create_cube(color.from_int(0, 255, 0))
+    rotated_cube.rotation[1] = 0.5
+    merged_mesh = mesh.Mesh()
+
+    # the block covers x from 2 to 3, y from 0 to 1 and z from -4 to -3
+    visible_sides = renderer.find_visible_block_sides([block, rotated_cube, merged_mesh], np.array([1.0, 0.5, -2.0]))
+
+    assert list(visible_sides) == [mesh.LEFT | mesh.FRONT, -1, -1]
+    assert renderer.find_visible_block_sides([block], np.array([2.5, 2.0, -3.5]))[0] == mesh.TOP
+    assert renderer.find_visible_block_sides([block], np.array([2.5, 0.5, -3.5]))[0] == 0
@@ -0,0 +1,84 @@
+"""ResolutionGovernor unit tests."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+from pymazing import resolution_governor, framebuffer
+
+
+def run_frames(governor, frame_time, frame_count):
+    return [governor.update(frame_time) for _ in range(frame_count)]
+
+
+def test_quantize():
+    governor = resolution_governor.ResolutionGovernor(0.0166, 0.52, min_scale=0.25, max_scale=1.0, step=0.05)
+
+    assert abs(governor.scale - 0.5) < 1e-9
+    assert abs(governor.quantize(0.1) - 0.25) < 1e-9
+    assert abs(governor.quantize(1.3) - 1.0) < 1e-9
+
+
+def test_update():
+    governor = resolution_governor.ResolutionGovernor(0.0166, 0.5, step=0.05, sample_count=10)
+
+    # nothing changes before a full window of slow frames, then one step down
+    scales = run_frames(governor, 0.03, 10)
+    assert scales[:9] == [None] * 9
+    assert abs(scales[9] - 0.45) < 1e-9
+
+    # frame times within the tolerance keep the scale
+    assert run_frames(governor, 0.017, 30) == [None] * 30
+    assert abs(governor.scale - 0.45) < 1e-9
+
+    # a few hitches do not change the median
+    assert run_frames(governor, 0.0166, 7) + run_frames(governor, 0.1, 3) == [None] * 10
+
+    # fast frames raise the scale up to the maximum
+    scales = [scale for scale in run_frames(governor, 0.005, 200) if scale is not None]
+    assert len(scales) == 11
+    assert abs(scales[-1] - 1.0) < 1e-9
+
+
+def test_update_with_vsync():
+    # a slowdown lowers the scale, after it the work takes 8 ms but the vertical sync holds every frame at 16.7 ms
+    refresh_time = 1.0 / 60.0
+    governor = resolution_governor.ResolutionGovernor(0.0166, 1.0, sample_count=10)
+    run_frames(governor, 0.03, 50)
+
+    assert governor.scale < 1.0
+
+    # the whole frame times are not faster than the target, so they would keep the lowered scale
+    clamped_governor = resolution_governor.ResolutionGovernor(0.0166, governor.scale, sample_count=10)
+    assert run_frames(clamped_governor, max(0.008, refresh_time), 100) == [None] * 100
+
+    # the work times raise it back
+    run_frames(governor, 0.008, 100)
+    assert abs(governor.scale - 1.0) < 1e-9
+
+
+def test_set_scale():
+    governor = resolution_governor.ResolutionGovernor(0.0166, 0.5, sample_count=10)
+    run_frames(governor, 0.03, 9)
+
+    # a manual change starts a new window
+    assert abs(governor.set_scale(0.8) - 0.8) < 1e-9
+    assert run_frames(governor, 0.03, 9) == [None] * 9
+
+
+def test_framebuffer_buffer_cache():
+    framebuffer_ = framebuffer.FrameBuffer(headless=True)
+    framebuffer_.resize(64, 40)
+    pixel_data = framebuffer_.pixel_data
+    framebuffer_.resize(32, 20)
+
+    assert len(framebuffer_.pixel_data) == 32 * 20
+
+    # switching back reuses the arrays
+    framebuffer_.resize(64, 40)
+    assert framebuffer_.pixel_data is pixel_data
+
+    for width in range(1, framebuffer.MAX_CACHED_BUFFERS + 2):
+        framebuffer_.resize(width, 1)
+
+    assert len(framebuffer_.buffer_cache) == framebuffer.MAX_CACHED_BUFFERS
+    framebuffer_.resize(64, 40)
+    assert framebuffer_.pixel_data is not pixel_data
@@ -0,0 +1,154 @@
+"""Validation harness tests, later fast rendering paths are checked against the reference renderer here."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import pytest
+
+pytest.importorskip("sfml")
+
+from pymazing import validation, renderer, benchmark, level_loader, level_generator, visibility, mesh, mesh_cache
+
+
+@pytest.fixture(scope="module")
+def scenes():
+    return validation.create_scenes(["data/level_simple.tga"])
+
+
+def test_compare_framebuffers(scenes):
+    reference = validation.render_scene(renderer.render_meshes, scenes[0])
+    candidate = validation.render_scene(renderer.render_meshes, scenes[0])
+    candidate.pixel_data[2 * candidate.width + 3] ^= 0xffffffff
+    candidate.pixel_data[5 * candidate.width + 1] ^= 0xffffffff
+    result = validation.compare_framebuffers(reference, candidate)
+
+    assert result.mismatch_count == 2
+    assert result.first_mismatch == (3, 2)
+
+
+@pytest.mark.parametrize("render_wireframe", [False, True])
+def test_reference_renderer(scenes, render_wireframe):
+    for scene in scenes:
+        result = validation.compare_renderers(renderer.render_meshes, scene, render_wireframe=render_wireframe)
+
+        assert result.mismatch_count == 0, scene.name + ": " + str(result)
+
+
+def test_lit_scenes(scenes):
+    # the specular path changes at least some pixels, so the comparisons of the lit scenes cover it
+    mismatch_count = 0
+
+    for scene in scenes:
+        if scene.world.specular_lights_enabled:
+            unlit_scene = validation.Scene(scene.name, scene.mesh_groups, benchmark.create_world(), scene.camera)
+            reference = validation.render_scene(renderer.render_meshes, unlit_scene)
+            mismatch_count += validation.compare_framebuffers(reference, validation.render_scene(renderer.render_meshes, scene)).mismatch_count
+
+    assert mismatch_count > 0
+
+
+def test_frustum_culling(scenes):
+    for scene in scenes:
+        reference = validation.render_scene(renderer.render_meshes, scene, do_frustum_culling=False)
+        candidate = validation.render_scene(renderer.render_meshes, scene, do_frustum_culling=True)
+        result = validation.compare_framebuffers(reference, candidate)
+
+        assert result.mismatch_count == 0, scene.name + ": " + str(result)
+
+
+def test_raycast_visibility():
+    blocks = validation.generate_maze_blocks(32, 5)
+    meshes = level_loader.generate_partial_meshes(blocks)
+    grid_visibility = visibility.GridVisibility(blocks)
+    world = benchmark.create_world()
+
+    for yaw in range(0, 360, 45):
+        camera = benchmark.create_camera([9.5, 0.3, -21.5], -30.0, float(yaw), validation.FRAMEBUFFER_WIDTH / validation.FRAMEBUFFER_HEIGHT)
+        reference = validation.render_scene(renderer.render_meshes, validation.Scene("reference", [meshes[:1], meshes[1:]], world, camera))
+        candidate = validation.render_scene(renderer.render_meshes, validation.Scene("raycast", [meshes[:1], grid_visibility.find_visible_meshes(camera)], world, camera))
+        result = validation.compare_framebuffers(reference, candidate)
+
+        assert result.mismatch_count == 0, str(yaw) + ": " + str(result)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 16])
+def test_chunks(scenes, chunk_size):
+    blocks = validation.generate_maze_blocks(16, 16)
+    chunk_meshes = [chunk_.mesh for chunk_ in level_loader.generate_chunks(blocks, chunk_size).flat if chunk_ is not None]
+
+    for scene in scenes:
+        if not scene.name.startswith("maze16"):
+            continue
+
+        candidate_scene = validation.Scene("chunks", [scene.mesh_groups[0], chunk_meshes], scene.world, scene.camera)
+        reference = validation.render_scene(renderer.render_meshes, scene)
+        candidate = validation.render_scene(renderer.render_meshes, candidate_scene)
+        result = validation.compare_framebuffers(reference, candidate)
+
+        # the chunk vertices are relative to a different origin, the rounding can flip a few depth sort ties
+        assert result.mismatch_count <= 8, scene.name + ": " + str(result)
+
+
+def test_mesh_cache(scenes, tmp_path):
+    file_name = str(tmp_path / "maze16.tga")
+    level_generator.write_tga(level_generator.generate_maze_pixels(16, 16, 16), file_name)
+    chunk_meshes = [chunk_.mesh for chunk_ in level_loader.generate_chunks(validation.generate_maze_blocks(16, 16), 4).flat if chunk_ is not None]
+
+    # load twice, the second time from the memory mapped cache
+    for _ in range(2):
+        chunk_grid, _, _, _ = mesh_cache.load_or_generate_chunks(file_name, 4)
+        cached_meshes = [chunk_.mesh for chunk_ in chunk_grid.flat if chunk_ is not None]
+
+        for scene in scenes:
+            if not scene.name.startswith("maze16"):
+                continue
+
+            reference = validation.render_scene(renderer.render_meshes, validation.Scene("chunks", [scene.mesh_groups[0], chunk_meshes], scene.world, scene.camera))
+            candidate = validation.render_scene(renderer.render_meshes, validation.Scene("cached", [scene.mesh_groups[0], cached_meshes], scene.world, scene.camera))
+            result = validation.compare_framebuffers(reference, candidate)
+
+            assert result.mismatch_count == 0, scene.name + ": " + str(result)
+
+
+@pytest.mark.parametrize("render_wireframe", [False, True])
+def test_block_side_culling(scenes, render_wireframe):
+    for scene in scenes:
+        reference = validation.render_scene(renderer.render_meshes, scene, render_wireframe=render_wireframe, do_block_side_culling=False)
+        candidate = validation.render_scene(renderer.render_meshes, scene, render_wireframe=render_wireframe, do_block_side_culling=True)
+        result = validation.compare_framebuffers(reference, candidate)
+
+        assert result.mismatch_count == 0, scene.name + ": " + str(result)
+
+
+@pytest.mark.parametrize("render_wireframe", [False, True])
+def test_cube_instances(scenes, render_wireframe):
+    def render_function(meshes, world, camera, framebuffer, **options):
+        if isinstance(meshes, mesh.CubeInstances):
+            renderer.render_cube_instances(meshes, world, camera, framebuffer, **options)
+        else:
+            renderer.render_meshes(meshes, world, camera, framebuffer, **options)
+
+    for blocks in (level_loader.generate_blocks_from_tga("../data/levels/level2.tga"), validation.generate_maze_blocks(32, 3)):
+        meshes = level_loader.generate_partial_meshes(blocks)
+        instances = level_loader.generate_cube_instances(blocks)
+
+        for scene in scenes:
+            reference = validation.render_scene(renderer.render_meshes, validation.Scene("meshes", [meshes[:1], meshes[1:]], scene.world, scene.camera), render_wireframe=render_wireframe)
+            candidate = validation.render_scene(render_function, validation.Scene("instances", [meshes[:1], instances], scene.world, scene.camera), render_wireframe=render_wireframe)
+            result = validation.compare_framebuffers(reference, candidate)
+
+            # the vertices are transformed in a different order, the rounding can flip a few depth sort ties
+            assert result.mismatch_count <= 16, scene.name + ": " + str(result)
+
+
+@pytest.mark.parametrize("render_wireframe", [False, True])
+def test_compact_meshes(scenes, render_wireframe):
+    for blocks in (level_loader.generate_blocks_from_tga("../data/levels/level2.tga"), validation.generate_maze_blocks(32, 3)):
+        meshes = level_loader.generate_partial_meshes(blocks)
+        compact_meshes = [mesh_.compact() for mesh_ in level_loader.generate_partial_meshes(blocks)]
+
+        for scene in scenes:
+            reference = validation.render_scene(renderer.render_meshes, validation.Scene("meshes", [meshes[:1], meshes[1:]], scene.world, scene.camera), render_wireframe=render_wireframe)
+            candidate = validation.render_scene(renderer.render_meshes, validation.Scene("compact", [compact_meshes[:1], compact_meshes[1:]], scene.world, scene.camera), render_wireframe=render_wireframe)
+            result = validation.compare_framebuffers(reference, candidate)
+
+            assert result.mismatch_count == 0, scene.name + ": " + str(result)
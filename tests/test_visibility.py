@@ -0,0 +1,63 @@
+"""Visibility unit tests."""
+# Copyright © 2014 Mikko Ronkainen <firstname@mikkoronkainen.com>
+# License: MIT, see the LICENSE file.
+
+import types
+
+import numpy as np
+
+from pymazing import visibility, color, mesh
+
+
+def create_camera(position, forward_vector):
+    forward_vector = np.array(forward_vector, dtype=float)
+    right_vector = np.cross(forward_vector, [0.0, 1.0, 0.0])
+    up_vector = np.cross(right_vector, forward_vector)
+
+    return types.SimpleNamespace(position=np.array(position, dtype=float), forward_vector=forward_vector, up_vector=up_vector, right_vector=right_vector,
+                                 vertical_fov=70.0, aspect_ratio=1.6, far_z=100.0)
+
+
+def test_cast_rays():
+    occupancy = np.zeros((3, 5), dtype=bool)
+    occupancy[1, 3] = True
+    hit_ray, hit_x, hit_y, hit_side = visibility.cast_rays(occupancy, np.array([0.5, 1.5]), np.array([[1.0, 0.0], [-1.0, 0.0], [0.0, -1.0]]), 100.0)
+
+    assert list(hit_ray) == [0]
+    assert list(hit_x) == [3]
+    assert list(hit_y) == [1]
+    assert list(hit_side) == [mesh.LEFT]
+
+
+def test_find_visible_sides():
+    white = color.from_int(255, 255, 255)
+    blocks = [[None] * 6 for _ in range(3)]
+    blocks[1][2] = white
+    blocks[1][4] = white
+    grid_visibility = visibility.GridVisibility(blocks, ray_count=64)
+
+    visible_x, visible_y, visible_sides = grid_visibility.find_visible_sides(create_camera([0.5, 0.5, -1.5], [1.0, 0.0, 0.0]))
+
+    assert list(visible_x) == [2] and list(visible_y) == [1] and list(visible_sides) == [mesh.LEFT]
+    assert len(grid_visibility.find_visible_meshes(create_camera([0.5, 0.5, -1.5], [1.0, 0.0, 0.0]))) == 1
+
+    assert grid_visibility.find_visible_sides(create_camera([0.5, 3.0, -1.5], [1.0, 0.0, 0.0])) is None
+
+
+def test_find_visible_sides_far_plane():
+    white = color.from_int(255, 255, 255)
+    blocks = [[None] * 40 for _ in range(3)]
+    blocks[1][10] = white
+    blocks[1][30] = white
+    blocks[1][31] = white
+    grid_visibility = visibility.GridVisibility(blocks, ray_count=64)
+    camera = create_camera([20.5, 0.5, -1.5], [1.0, 0.0, 0.0])
+    camera.far_z = 5.0
+
+    assert len(grid_visibility.find_visible_sides(camera)[0]) == 0
+
+    # the rays reach the near wall and the expansion stays on existing sides
+    camera.far_z = 100.0
+    visible_x, visible_y, visible_sides = grid_visibility.find_visible_sides(camera)
+
+    assert list(visible_x) == [30] and list(visible_y) == [1] and list(visible_sides) == [mesh.LEFT]